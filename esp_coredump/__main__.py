@@ -6,9 +6,12 @@
 
 import logging
 import os.path
+import sys
 
 from esp_coredump import CoreDump, __version__
 from esp_coredump.cli_ext import parser
+from esp_coredump.corefile.cache import elf_file_cache
+from esp_coredump.corefile.symbols import format_symbol, parse_addresses
 
 
 def main():
@@ -32,6 +35,8 @@ def main():
 
     kwargs.pop('debug', None)
     kwargs.pop('operation', None)
+    addresses = kwargs.pop('addresses', None)
+    output = kwargs.pop('output', None)
 
     espcoredump = CoreDump(**kwargs)
     temp_core_files = None
@@ -41,9 +46,16 @@ def main():
             temp_core_files = espcoredump.info_corefile()
         elif args.operation == 'dbg_corefile':
             temp_core_files = espcoredump.dbg_corefile()
+        elif args.operation == 'symbolize':
+            addrs = parse_addresses(' '.join(addresses) if addresses else sys.stdin.read())
+            for addr, symbol in zip(addrs, espcoredump.symbolize(addrs)):
+                print(format_symbol(addr, symbol))
+        elif args.operation == 'bundle':
+            print(f'Analysis bundle written to "{espcoredump.create_bundle(output)}"')
     finally:
         if temp_core_files:
             for f in temp_core_files:
+                elf_file_cache.discard(f)
                 try:
                     os.remove(f)
                 except OSError:
@@ -48,14 +48,16 @@ parser.add_argument(
 )
 parser.add_argument('--version', action='version', version=f'espcoredump.py v{__version__}')
 
-common_args = argparse.ArgumentParser(add_help=False)
-common_args.add_argument('--debug', '-d', type=int, default=3, help='Log level (0..3)')  # TODO: move this option to global args in next major release
+debug_args = argparse.ArgumentParser(add_help=False)
+debug_args.add_argument('--debug', '-d', type=int, default=3, help='Log level (0..3)')  # TODO: move this option to global args in next major release
+
+common_args = argparse.ArgumentParser(add_help=False, parents=[debug_args])
 common_args.add_argument('--gdb', '-g', help='Path to gdb')
 common_args.add_argument('--extra-gdbinit-file', '-ex', help='Path to additional gdbinit file')
 common_args.add_argument(
     '--core',
     '-c',
-    help='Path to core dump file (if skipped core dump will be read from flash)',
+    help='Path to core dump file, "-" to read it from stdin (if skipped core dump will be read from flash)',
 )
 common_args.add_argument(
     '--core-format',
@@ -81,6 +83,11 @@ common_args.add_argument(
     '-r',
     help='Path to ROM ELF file. Will use "<target>_rom.elf" if not specified',
 )
+common_args.add_argument(
+    '--optimize-layout',
+    action='store_true',
+    help='Sort and merge memory segments of the created core ELF and align them to pages. Does not apply to ELF core files given with "-c"',
+)
 common_args.add_argument('prog', help="Path to program's ELF binary")
 
 operations = parser.add_subparsers(dest='operation', required=True, description='Operation to perform')
@@ -93,3 +100,41 @@ operations.add_parser(
 
 info_coredump = operations.add_parser('info_corefile', parents=[common_args], help='Print core dump info from file')
 info_coredump.add_argument('--print-mem', '-m', action='store_true', help='Print memory dump')
+info_coredump.add_argument(
+    '--no-gdb',
+    action='store_true',
+    help='Print a summary with the functions and source lines of the tasks from the debug information of the app, GDB is not needed',
+)
+info_coredump.add_argument(
+    '--jobs',
+    '-j',
+    type=int,
+    default=1,
+    help='Number of GDB processes decoding the threads in parallel, the output is the same as with one',
+)
+
+symbolize = operations.add_parser('symbolize', parents=[debug_args], help='Print functions and variables at addresses, neither core dump nor GDB is needed')
+symbolize.add_argument(
+    '--rom-elf',
+    '-r',
+    help='Path to ROM ELF file. Will use "<target>_rom.elf" if not specified and "--chip" is given',
+)
+symbolize.add_argument('prog', help="Path to program's ELF binary")
+symbolize.add_argument(
+    'addresses',
+    nargs='*',
+    help='Hexadecimal addresses with "0x" prefix, or text containing them (e.g. a backtrace). Read from stdin if not specified',
+)
+
+bundle = operations.add_parser(
+    'bundle',
+    parents=[debug_args],
+    help='Create an analysis bundle, a smaller ELF file with only the sections needed to decode core dumps. It can be used in place of the program ELF',
+)
+bundle.add_argument(
+    '--rom-elf',
+    '-r',
+    help='Path to ROM ELF file whose symbols are added to the bundle. Will use "<target>_rom.elf" if not specified and "--chip" is given',
+)
+bundle.add_argument('--output', '-o', help='Path of the bundle, "<prog>.bundle" by default')
+bundle.add_argument('prog', help="Path to program's ELF binary")
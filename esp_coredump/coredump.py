@@ -11,10 +11,12 @@ from __future__ import annotations
 import os
 import subprocess
 import sys
+import tempfile
 import textwrap
+from concurrent.futures import Future, ThreadPoolExecutor  # noqa: F401
 from contextlib import contextmanager
-from shutil import copyfile, which
-from typing import Optional, Tuple  # noqa: F401
+from shutil import copyfile, copyfileobj, rmtree, which
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple, Union  # noqa: F401
 
 import serial
 
@@ -30,24 +32,32 @@ except (AttributeError, ModuleNotFoundError):
 
     detect_chip = ESPLoader.detect_chip
 
-from construct import Container, GreedyRange, Int32ul, ListContainer, Struct  # noqa: F401
+from construct import Container, ListContainer  # noqa: F401
 
 from .corefile import RISCV_TARGETS, SUPPORTED_TARGETS, XTENSA_TARGETS, xtensa
+from .corefile.address_space import AddressSpace
+from .corefile.bundle import get_rom_symbol_table, write_bundle
+from .corefile.cache import get_elf_file, get_elf_sha256
+from .corefile.codec import parse_uint32_array
+from .corefile.dwarf import DwarfInfo, StructLayout, format_source_locations, get_dwarf_info  # noqa: F401
 from .corefile.elf import (
     TASK_STATUS_CORRECT,
-    ElfFile,
-    ElfSegment,
     ESPCoreDumpElfFile,
-    EspTaskStatus,
+    Note,  # noqa: F401
+    TaskTable,  # noqa: F401
 )
-from .corefile.gdb import DEFAULT_GDB_TIMEOUT_SEC, EspGDB
+from .corefile.gdb import DEFAULT_GDB_TIMEOUT_SEC, EspGDB, EspGDBPool
+from .corefile.gdb_index import get_indexed_elf_path, needs_gdb_index, store_gdb_index
 from .corefile.loader import (
     ESPCoreDumpFileLoader,
     ESPCoreDumpFlashLoader,
     ESPCoreDumpLoaderError,
+    EspCoreDumpSource,
     EspCoreDumpVersion,
-    get_core_file_format,
 )
+from .corefile.riscv import PRSTATUS_OFFSET_PR_PID, PRSTATUS_OFFSET_PR_REG
+from .corefile.streams import STDIN_PATH, is_compressed_file, open_decompressed
+from .corefile.symbols import Symbol, SymbolTable, format_symbol, get_symbol_table  # noqa: F401
 
 IDF_PATH = os.getenv('IDF_PATH', '')
 ESP_ROM_ELF_DIR = os.getenv('ESP_ROM_ELF_DIR')
@@ -67,6 +77,12 @@ RETRY_ATTEMPTS = 3
 XTENSA_ISR_CTX_IDX = 37
 RISCV_ISR_CTX_IDX = 1
 
+# types whose layouts are extracted from the DWARF info of the app in one pass: FreeRTOS tasks and lists,
+# the heaps registered by heap_caps and the structures of the multi_heap and TLSF allocators
+STRUCT_LAYOUT_TYPES = ('TCB_t', 'List_t', 'ListItem_t', 'MiniListItem_t', 'heap_t_', 'multi_heap_info', 'control_t', 'block_header_t')
+# TCB fields shown in the threads info
+TCB_STACK_FIELDS = ('pxEndOfStack', 'pxTopOfStack', 'pxStack', 'uxPriority', 'uxBasePriority')
+
 if os.name == 'nt':
     CLOSE_FDS = False
 else:
@@ -91,6 +107,10 @@ class CoreDump:
         print_mem: str | None = None,
         rom_elf: str | None = None,
         save_core: str | None = None,
+        optimize_layout: bool = False,
+        no_gdb: bool = False,
+        gdb_pool: EspGDBPool | None = None,
+        jobs: int = 1,
     ):
         if prog is None:
             raise ValueError("Path to program's ELF binary is not provided")
@@ -99,7 +119,9 @@ class CoreDump:
         self.chip = chip
         self.core = core
         self.chip_rev = chip_rev
-        self.core_format = get_core_file_format(core) if core and core_format == 'auto' else core_format
+        self.core_format = core_format
+        # the standard input can be read by one command only
+        self._core_stdin_read = False
         self.gdb = gdb
         self.gdb_timeout_sec = gdb_timeout_sec
         self.extra_gdbinit_file = extra_gdbinit_file
@@ -110,6 +132,17 @@ class CoreDump:
         self.print_mem = print_mem
         self.rom_elf = rom_elf
         self.save_core = save_core
+        self.optimize_layout = optimize_layout
+        self.no_gdb = no_gdb
+        # GDB sessions of the pool are reused for the core dumps of the same app, GDB is started for each one otherwise
+        self.gdb_pool = gdb_pool
+        # GDB processes decoding the threads in parallel, ``gdb_esp`` and the workers (not used with ``gdb_pool``)
+        self.jobs = jobs
+        self._gdb_workers = []  # type: list[Future[EspGDB]]
+        self._address_space = None  # type: Optional[AddressSpace]
+        self._symbol_table = None  # type: Optional[SymbolTable]
+        # loader of the core dump of the running command, closed at its end
+        self._loader = None  # type: Union[ESPCoreDumpFlashLoader, ESPCoreDumpFileLoader, None]
 
     @staticmethod
     def load_aux_elf(elf_path):  # type: (str) -> str
@@ -118,31 +151,46 @@ class CoreDump:
         """
         sym_cmd = ''
         if os.path.exists(elf_path):
-            elf = ElfFile(elf_path)
+            text = get_elf_file(elf_path).get_section('.text')
             if os.name == 'nt':
                 elf_path = elf_path.replace('\\', '/')
-            for s in elf.sections:
-                if s.name == '.text':
-                    sym_cmd = f'add-symbol-file {elf_path} {s.addr:#x}'
-                    break
+            if text:
+                sym_cmd = f'add-symbol-file {elf_path} {text.addr:#x}'
         return sym_cmd
 
-    def extract_chip_rev_from_elf(self):
-        if not os.path.exists(self.core):
-            raise FileNotFoundError(f"Provided ELF file {self.core} is not found or doesn't exist")
-        elf = ElfFile(elf_path=self.core)
-        chip_rev = None
-        for s in elf.note_segments:
-            for n in s.note_secs:
-                if b'ESP_CHIP_REV' in n.name:
-                    chip_rev = int.from_bytes(n.desc, 'little')
-                    break
-
-        return chip_rev
+    @staticmethod
+    def get_uncompressed_elf_path(elf_path, temp_files):  # type: (str, list[str]) -> str
+        """
+        GDB can't read compressed ELF files, they are decompressed into a temporary file added to ``temp_files``
+        """
+        if not is_compressed_file(elf_path):
+            return elf_path
+        with tempfile.NamedTemporaryFile('wb', delete=False) as fw, open_decompressed(elf_path) as fr:
+            copyfileobj(fr, fw)
+        temp_files.append(fw.name)
+        return fw.name
+
+    def _open_core_source(self):  # type: () -> EspCoreDumpSource
+        """
+        Opens the core file for a command, the prefix read for the format detection is passed to the loader
+        """
+        if self.core == STDIN_PATH:
+            if self._core_stdin_read:
+                raise ESPCoreDumpLoaderError('The core dump was already read from the standard input, it can be loaded only once')
+            self._core_stdin_read = True
+        return EspCoreDumpSource(self.core, self.core_format)  # type: ignore
+
+    def extract_chip_rev_from_elf(self, elf_path=None):  # type: (Optional[str]) -> Optional[int]
+        elf_path = elf_path or self.core
+        if not elf_path or not os.path.exists(elf_path):
+            raise FileNotFoundError(f"Provided ELF file {elf_path} is not found or doesn't exist")
+        core_elf = get_elf_file(elf_path, ESPCoreDumpElfFile)  # type: ESPCoreDumpElfFile
+        return core_elf.chip_rev
 
     def get_core_header_info_dict(self, e_machine=ESPCoreDumpElfFile.EM_XTENSA):
         loader = None  # type: Union[ESPCoreDumpFlashLoader, ESPCoreDumpFileLoader, None]
         core_dump_info_map = {
+            'core_elf': None,
             'core_elf_path': None,
             'target': None,
             'temp_files': None,
@@ -159,28 +207,43 @@ class CoreDump:
                 port=self.port,
                 baud=self.baud,
                 part_table_offset=self.parttable_off,
+                optimize_layout=self.optimize_layout,
             )
-        elif self.core_format != 'elf':
-            # Core file specified, but not yet in ELF format. Convert it from raw or
-            # base64 into ELF.
-            loader = ESPCoreDumpFileLoader(self.core, self.core_format == 'b64')
         else:
-            # Core file is already in the ELF format
-            core_dump_info_map['core_elf_path'] = self.core
-            chip_rev = self.extract_chip_rev_from_elf()
-
-            if self.chip_rev is not None and chip_rev != self.chip_rev:
-                print(
-                    'Provided chip revision does not match the one extracted from the provided coredump elf file.',
-                    file=sys.stderr,
-                )
-                exit(1)
-
-            core_dump_info_map['chip_rev'] = chip_rev
+            core_source = self._open_core_source()
+            if core_source.format != 'elf':
+                # Core file specified, but not yet in ELF format. Convert it from raw or
+                # base64 into ELF. The loader closes the core file.
+                loader = ESPCoreDumpFileLoader(core_source, core_source.format == 'b64', optimize_layout=self.optimize_layout)
+            else:
+                # Core file is already in the ELF format
+                core_elf_path = self.core
+                try:
+                    if not core_source.path or core_source.compression:
+                        # GDB needs the path of uncompressed core file
+                        with tempfile.NamedTemporaryFile('wb', delete=False) as fw:
+                            core_source.copy_to(fw)
+                        core_elf_path = fw.name
+                        core_dump_info_map['temp_files'] = [core_elf_path]
+                finally:
+                    core_source.close()
+                core_dump_info_map['core_elf_path'] = core_elf_path
+                chip_rev = self.extract_chip_rev_from_elf(core_elf_path)
+
+                if self.chip_rev is not None and chip_rev != self.chip_rev:
+                    print(
+                        'Provided chip revision does not match the one extracted from the provided coredump elf file.',
+                        file=sys.stderr,
+                    )
+                    exit(1)
+
+                core_dump_info_map['chip_rev'] = chip_rev
 
         # Load/convert the core file
         if loader:
+            self._loader = loader
             loader.create_corefile(exe_name=self.prog, e_machine=e_machine)
+            core_dump_info_map['core_elf'] = loader.core_elf
             core_dump_info_map['core_elf_path'] = loader.core_elf_file
             if self.save_core:
                 # We got asked to save the core file, make a copy
@@ -192,12 +255,11 @@ class CoreDump:
         return core_dump_info_map
 
     def get_chip_version(self):  # type: () -> Optional[int]
-        for segment in self.core_elf.note_segments:
-            for sec in segment.note_secs:
-                if sec.type == ESPCoreDumpElfFile.PT_ESP_INFO:
-                    ver_bytes = sec.desc[:4]
-                    return int((ver_bytes[3] << 8) | ver_bytes[2])
-        return None
+        sec = self.core_elf.get_note(ESPCoreDumpElfFile.PT_ESP_INFO)
+        if sec is None:
+            return None
+        ver_bytes = sec.desc[:4]
+        return int((ver_bytes[3] << 8) | ver_bytes[2])
 
     def get_target(self):  # type: () -> str
         if self.chip != 'auto':
@@ -278,7 +340,10 @@ class CoreDump:
 
         return gdb_path
 
-    def get_gdb_args(self, target, core_elf_path, chip_rev, is_dbg_mode=False):
+    def get_gdb_args(self, target, core_elf_path, chip_rev, is_dbg_mode=False, prog=None):
+        """
+        :param prog: program ELF file loaded by GDB, ``self.prog`` by default (e.g. its uncompressed copy)
+        """
         gdb_tool = self.get_gdb_path(target)
         if not gdb_tool:
             print(GDB_NOT_FOUND_ERROR)
@@ -301,10 +366,12 @@ class CoreDump:
             gdb_args.append('--quiet')  # inhibit dumping info at start-up
             gdb_args.append('--interpreter=mi2')  # use GDB/MI v2
 
-        gdb_args.append('--core={}'.format(core_elf_path))  # core file
+        if core_elf_path:
+            gdb_args.append('--core={}'.format(core_elf_path))  # core file
         if rom_sym_cmd:
             gdb_args += ['-ex', rom_sym_cmd]
-        gdb_args.append(self.prog)
+        # GDB loads the copy of the app with the index faster, see ``_cache_gdb_index``
+        gdb_args.append(get_indexed_elf_path(self.prog) or prog or self.prog)  # type: ignore
 
         return gdb_args
 
@@ -348,37 +415,206 @@ class CoreDump:
 
         return rom_file_path
 
-    def get_task_info_extra_note_tuple(self):  # type: () -> Tuple[Optional[list[str]], Optional[Container]]
-        extra_note = None
-        task_info = []
-        for note_seg in self.core_elf.note_segments:
-            for note_sec in note_seg.note_secs:
-                if note_sec.type == ESPCoreDumpElfFile.PT_ESP_EXTRA_INFO:
-                    extra_note = note_sec
-                if note_sec.type == ESPCoreDumpElfFile.PT_ESP_TASK_INFO:
-                    task_info_struct = EspTaskStatus.parse(note_sec.desc)
-                    task_info.append(task_info_struct)
-        return task_info, extra_note
+    @property
+    def symbol_table(self):  # type: () -> SymbolTable
+        """
+        Symbols of the app and of the ROM ELF file (if it is given or found for ``chip`` and ``chip_rev``).
+        ROM symbols stored in an analysis bundle are used if there is no ROM ELF file.
+        """
+        if self._symbol_table is None:
+            tables = [get_symbol_table(self.prog)]  # type: ignore
+            rom_elf_path = self.get_rom_elf_path(self.chip_rev, self.chip) if self.rom_elf or self.chip != 'auto' else ''
+            if rom_elf_path and os.path.exists(rom_elf_path):
+                tables.append(get_symbol_table(rom_elf_path))
+            else:
+                rom_table = get_rom_symbol_table(get_elf_file(self.prog))  # type: ignore
+                if rom_table is not None:
+                    tables.append(rom_table)
+            self._symbol_table = SymbolTable.combine(tables)
+        return self._symbol_table
+
+    def symbolize(self, addrs):  # type: (Iterable[int]) -> list[Optional[Symbol]]
+        """
+        Find symbols at the addresses without GDB
+        """
+        return self.symbol_table.symbolize(addrs)
+
+    def create_bundle(self, output=None):  # type: (Optional[str]) -> str
+        """
+        Write the analysis bundle of the program ELF file, with the symbols of the ROM ELF file if it is given or found
+        for ``chip`` and ``chip_rev``. The bundle can be used in place of the program ELF file.
+        :param output: bundle file path, "<prog>.bundle" by default
+        :return: path of the bundle
+        """
+        output = output or f'{self.prog}.bundle'
+        rom_elf_path = self.get_rom_elf_path(self.chip_rev, self.chip) if self.rom_elf or self.chip != 'auto' else ''
+        write_bundle(self.prog, output, rom_elf_path if rom_elf_path and os.path.exists(rom_elf_path) else None)  # type: ignore
+        return output
+
+    @property
+    def dwarf_info(self):  # type: () -> DwarfInfo
+        return get_dwarf_info(self.prog)  # type: ignore
+
+    def get_struct_layout(self, type_name):  # type: (str) -> Optional[StructLayout]
+        """
+        Layout of a struct type of the app, None if it is not in the DWARF info.
+        Layouts are cached by the SHA256 of the app ELF file.
+        """
+        names = STRUCT_LAYOUT_TYPES if type_name in STRUCT_LAYOUT_TYPES else STRUCT_LAYOUT_TYPES + (type_name,)
+        return self.dwarf_info.struct_layouts(names)[type_name]
+
+    def read_struct(self, type_name, addr, members):  # type: (str, int, Iterable[str]) -> Optional[dict[str, Any]]
+        """
+        Members of a struct variable read from the core dump memory without GDB
+        :return: values by member name (see ``StructLayout.read``), None if the layout of the type or any of the members is not known
+        :raises ValueError: if the memory of the members is not available
+        """
+        layout = self.get_struct_layout(type_name)
+        members = list(members)
+        if layout is None or not members or any(name not in layout.members for name in members):
+            return None
+        start = min(layout.members[name].offset for name in members)
+        end = max(layout.members[name].offset + layout.members[name].size for name in members)
+        data = self.address_space.read(addr + start, end - start)
+        return {name: layout.read(data, name, start) for name in members}
+
+    def map_gdb_workers(self, func, items):  # type: (Callable[[EspGDB, list[Any]], list[Any]], list[Any]) -> list[Any]
+        """
+        Results of ``func(gdb, shard)`` for the items split into contiguous shards, one for ``gdb_esp`` and each GDB worker
+        (see ``jobs``). The shards are processed in parallel and the results are merged in the order of the items.
+        """
+        workers = [self.gdb_esp] + [worker.result() for worker in self._gdb_workers]
+        if len(workers) == 1 or len(items) < 2:
+            return func(self.gdb_esp, items)
+        shard_size = -(-len(items) // len(workers))
+        shards = [items[i : i + shard_size] for i in range(0, len(items), shard_size)]
+        with ThreadPoolExecutor(len(shards)) as executor:
+            return [result for results in executor.map(func, workers, shards) for result in results]
+
+    def get_freertos_task_names(self, tcb_addrs):  # type: (list[int]) -> list[str]
+        """
+        Task names from the TCBs in the core dump, GDB reads them in one batch if the TCB layout is not known
+        """
+        layout = self.get_struct_layout('TCB_t')
+        if layout is None or 'pcTaskName' not in layout.members:
+            return [''] * len(tcb_addrs) if self.no_gdb else self.map_gdb_workers(EspGDB.get_freertos_task_names, tcb_addrs)
+        names = []
+        for tcb_addr in tcb_addrs:
+            try:
+                fields = self.read_struct('TCB_t', tcb_addr, ['pcTaskName'])
+            except ValueError:
+                names.append('')
+                continue
+            names.append(fields['pcTaskName'].split(b'\x00')[0].decode('ascii', 'replace'))  # type: ignore
+        return names
+
+    def get_freertos_task_name(self, tcb_addr):  # type: (int) -> str
+        return self.get_freertos_task_names([tcb_addr])[0]
+
+    def get_tcb_stack_fields(self, tcb_addrs):  # type: (list[int]) -> list[dict[str, int]]
+        """
+        ``TCB_STACK_FIELDS`` of the TCBs, all zeros for a TCB which cannot be read.
+        The fields are decoded from the core dump, GDB reads them in one batch if the TCB layout is not known.
+        """
+        layout = self.get_struct_layout('TCB_t')
+        if layout is None or any(name not in layout.members for name in TCB_STACK_FIELDS):
+            values = self.map_gdb_workers(EspGDB.parse_tcb_variables, [(tcb_addr, name) for tcb_addr in tcb_addrs for name in TCB_STACK_FIELDS])
+            tcb_values = [values[i : i + len(TCB_STACK_FIELDS)] for i in range(0, len(values), len(TCB_STACK_FIELDS))]
+            tcb_fields = []
+            for hex_values in tcb_values:
+                try:
+                    tcb_fields.append({name: int(val, 16) for name, val in zip(TCB_STACK_FIELDS, hex_values)})
+                except ValueError:
+                    tcb_fields.append(dict.fromkeys(TCB_STACK_FIELDS, 0))
+            return tcb_fields
+        tcb_fields = []
+        for tcb_addr in tcb_addrs:
+            try:
+                tcb_fields.append(self.read_struct('TCB_t', tcb_addr, TCB_STACK_FIELDS))  # type: ignore
+            except ValueError:
+                tcb_fields.append(dict.fromkeys(TCB_STACK_FIELDS, 0))
+        return tcb_fields
+
+    def describe_address(self, addr, is_return_address=False):  # type: (int, bool) -> str
+        """
+        Function and source line of a code address without GDB, the call instruction is looked up for return addresses
+        """
+        lookup_addr = addr - 1 if is_return_address else addr
+        symbol = self.symbolize([lookup_addr])[0]
+        locations = self.dwarf_info.lookup(lookup_addr)
+        if not locations:
+            return format_symbol(addr, symbol)
+        if locations[0].function is None and symbol:
+            locations[0] = locations[0]._replace(function=symbol.name)
+        return f'0x{addr:08x}: ' + format_source_locations(locations)
+
+    def get_task_registers(self, note):  # type: (Note) -> Tuple[int, int, int]
+        """
+        TCB address, PC and return address of the task from its PRSTATUS note
+        """
+        tcb_addr = int.from_bytes(note.desc[PRSTATUS_OFFSET_PR_PID : PRSTATUS_OFFSET_PR_PID + 4], 'little')
+        regs = parse_uint32_array(note.desc[PRSTATUS_OFFSET_PR_REG:])
+        if self.core_elf.e_machine == ESPCoreDumpElfFile.EM_XTENSA:
+            pc = regs[xtensa.REG_PC_IDX]
+            ra = regs[xtensa.REG_AR_START_IDX]
+            # the window increment of the call is in the top bits of the windowed return address
+            if ra & 0x80000000:
+                ra = (ra & 0x3FFFFFFF) | 0x40000000
+        else:
+            pc, ra = regs[0], regs[1]
+        return tcb_addr, pc, ra
+
+    def print_task_frames(self, note):  # type: (Note) -> None
+        _, pc, ra = self.get_task_registers(note)
+        print(f'PC {self.describe_address(pc)}')
+        print(f'RA {self.describe_address(ra, is_return_address=True)}')
+
+    def get_task_info_extra_note_tuple(self):  # type: () -> Tuple[Optional[TaskTable], Optional[Container]]
+        return self.core_elf.task_info, self.core_elf.extra_info_note
 
     def get_panic_details(self):
-        for note_seg in self.core_elf.note_segments:
-            for note_sec in note_seg.note_secs:
-                if note_sec.type == ESPCoreDumpElfFile.PT_ESP_PANIC_DETAILS:
-                    return note_sec
-        return None
+        return self.core_elf.panic_details_note
 
-    def print_crashed_task_info(self, marker):  # type: (Optional[int]) -> None
+    @staticmethod
+    def get_task_names(task_info):  # type: (Optional[TaskTable]) -> dict[int, str]
+        """
+        Task names by TCB address from the TASK_INFO notes
+        """
+        if not task_info:
+            return {}
+        return {task.task_tcb_addr: task.task_name.split(b'\x00')[0].decode('ascii', 'replace') for task in task_info}
+
+    def print_crashed_task_info(self, marker, task_info=None):  # type: (Optional[int], Optional[TaskTable]) -> None
         if marker == ESPCoreDumpElfFile.CURR_TASK_MARKER:
             print('\nCrashed task has been skipped.')
+        elif self.no_gdb:
+            task_name = self.get_task_names(task_info).get(marker) or self.get_freertos_task_name(marker)  # type: ignore
+            print(f'\nCrashed task handle: 0x{marker:x}' + (f", name: '{task_name}'" if task_name else ''))
         else:
-            task_name = self.gdb_esp.get_freertos_task_name(marker)
+            task_name = self.get_freertos_task_name(marker)  # type: ignore
             print(f"\nCrashed task handle: 0x{marker:x}, name: '{task_name}', GDB name: 'process {marker}'")
 
-    def print_threads_info(self, task_info):  # type: (Optional[list[Container]]) -> None
+    def print_threads_summary(self, task_info):  # type: (Optional[TaskTable]) -> None
+        """
+        PC and return address of each task, located in the sources with the DWARF information of the app
+        """
+        task_names = self.get_task_names(task_info)
+        for thr_id, note in enumerate(self.core_elf.prstatus_notes, 1):
+            tcb_addr, _, _ = self.get_task_registers(note)
+            task_name = task_names.get(tcb_addr) or self.get_freertos_task_name(tcb_addr)
+            name_info = f", name: '{task_name}'" if task_name else ''
+            print(f'\n==================== THREAD {thr_id} (TCB: 0x{tcb_addr:x}{name_info}) =====================')
+            self.print_task_frames(note)
+
+    def print_threads_info(self, task_info):  # type: (Optional[TaskTable]) -> None
+        if self.no_gdb:
+            self.print_threads_summary(task_info)
+            return
         print(self.gdb_esp.run_cmd('info threads'))
         # THREADS STACKS
-        for attempt in range(1, RETRY_ATTEMPTS + 1):
-            threads, _ = self.gdb_esp.get_thread_info(attempt * DEFAULT_GDB_TIMEOUT_SEC)
+        for _ in range(RETRY_ATTEMPTS):
+            # the time budget grows after each attempt which timed out
+            threads, _ = self.gdb_esp.get_thread_info()
             if threads:
                 break
 
@@ -399,18 +635,13 @@ class CoreDump:
         print('---------- ---------------- -------- ----------------')
 
         thread_dict = {}
-        for thr in threads:
+        tcb_addrs = [self.gdb_esp.gdb2freertos_thread_id(thr['target-id']) for thr in threads]
+        # all TCBs are read at once, from the core dump or in one batch of GDB commands
+        task_names = self.get_freertos_task_names(tcb_addrs)
+        tcb_fields = self.get_tcb_stack_fields(tcb_addrs)
+        for thr, tcb_addr, task_name, fields in zip(threads, tcb_addrs, task_names, tcb_fields):
             thr_id = int(thr['id'])
-            tcb_addr = self.gdb_esp.gdb2freertos_thread_id(thr['target-id'])
-            task_name = self.gdb_esp.get_freertos_task_name(tcb_addr)
-            try:
-                pxEndOfStack = int(self.gdb_esp.parse_tcb_variable(tcb_addr, 'pxEndOfStack'), 16)
-                pxTopOfStack = int(self.gdb_esp.parse_tcb_variable(tcb_addr, 'pxTopOfStack'), 16)
-                pxStack = int(self.gdb_esp.parse_tcb_variable(tcb_addr, 'pxStack'), 16)
-                uxPriority = int(self.gdb_esp.parse_tcb_variable(tcb_addr, 'uxPriority'), 16)
-                uxBasePriority = int(self.gdb_esp.parse_tcb_variable(tcb_addr, 'uxBasePriority'), 16)
-            except ValueError:
-                pxEndOfStack = pxTopOfStack = pxStack = uxPriority = uxBasePriority = 0
+            pxEndOfStack, pxTopOfStack, pxStack, uxPriority, uxBasePriority = (fields[name] for name in TCB_STACK_FIELDS)
 
             thread_dict[thr_id] = {'tcb_addr': tcb_addr, 'task_name': task_name}
             ftcb_addr = '0x{:x}'.format(tcb_addr)
@@ -421,14 +652,16 @@ class CoreDump:
                 fstack_usage = '{}/{}'.format(abs(pxEndOfStack - pxTopOfStack), abs(pxStack - pxTopOfStack))
                 print(f'{ftcb_addr:>10}{task_name:>17}{fpriority:>9}{fstack_usage:>17}')
 
+        # the backtraces are split by threads between the GDB workers
+        thr_ids = list(thread_dict)
+        backtraces = dict(zip(thr_ids, self.map_gdb_workers(lambda gdb, ids: list(gdb.get_backtraces(ids).values()), thr_ids)))
         for thr_id, value in thread_dict.items():
             tcb_addr = value['tcb_addr']
             task_index = thr_id - 1
             task_name = value['task_name']
-            self.gdb_esp.switch_thread(thr_id)
             print(f"\n==================== THREAD {thr_id} (TCB: 0x{tcb_addr:x}, name: '{task_name}') =====================")
 
-            print(self.gdb_esp.run_cmd('bt'))
+            print(backtraces[thr_id])
             if task_info and task_info[task_index].task_flags != TASK_STATUS_CORRECT:
                 print(
                     f"The task '{thr_id}' is corrupted."
@@ -445,7 +678,8 @@ class CoreDump:
                 xtensa.print_exc_regs_info(extra_info)
             else:
                 print('Exception registers have not been found!')
-        print(self.gdb_esp.run_cmd('info registers'))
+        if not self.no_gdb:
+            print(self.gdb_esp.run_cmd('info registers'))
 
     def print_isr_context(self, extra_info):
         if self.exe_elf.e_machine == ESPCoreDumpElfFile.EM_XTENSA:
@@ -460,8 +694,13 @@ class CoreDump:
         else:
             print('Crashed task is not in the interrupt context')
 
-    def print_current_thread_stack(self, task_info):  # type: (Optional[list[Container]]) -> None
-        print(self.gdb_esp.run_cmd('bt'))
+    def print_current_thread_stack(self, task_info):  # type: (Optional[TaskTable]) -> None
+        if self.no_gdb:
+            notes = self.core_elf.prstatus_notes
+            if notes:
+                self.print_task_frames(notes[0])
+        else:
+            print(self.gdb_esp.run_cmd('bt'))
         if task_info and task_info[0].task_flags != TASK_STATUS_CORRECT:
             print('The current crashed task is corrupted.')
             print(
@@ -470,73 +709,30 @@ class CoreDump:
                 f'{task_info[0].task_stack_start:x}).'
             )
 
+    @property
+    def address_space(self):  # type: () -> AddressSpace
+        """
+        Address space of the loaded core dump and app, built once per core dump
+        """
+        if self._address_space is None or self._address_space.core_elf is not self.core_elf or self._address_space.exe_elf is not self.exe_elf:
+            self._address_space = AddressSpace(self.core_elf, self.exe_elf)
+        return self._address_space
+
     def print_all_memory_regions(self):  # type: () -> None
         print('Name   Address   Size   Attrs')
-        core_segs = self.core_elf.load_segments
-        merged_segs = []
-        for sec in self.exe_elf.sections:
-            merged = False
-            for seg in core_segs:
-                if seg.addr <= sec.addr <= seg.addr + len(seg.data):
-                    # sec:    |XXXXXXXXXX|
-                    # seg: |...XXX.............|
-                    seg_addr = seg.addr
-                    if seg.addr + len(seg.data) <= sec.addr + len(sec.data):
-                        # sec:        |XXXXXXXXXX|
-                        # seg:    |XXXXXXXXXXX...|
-                        # merged: |XXXXXXXXXXXXXX|
-                        seg_len = len(sec.data) + (sec.addr - seg.addr)
-                    else:
-                        # sec:        |XXXXXXXXXX|
-                        # seg:    |XXXXXXXXXXXXXXXXX|
-                        # merged: |XXXXXXXXXXXXXXXXX|
-                        seg_len = len(seg.data)
-                    merged_segs.append((sec.name, seg_addr, seg_len, sec.attr_str(), True))
-                    core_segs.remove(seg)
-                    merged = True
-                elif sec.addr <= seg.addr <= sec.addr + len(sec.data):
-                    # sec:  |XXXXXXXXXX|
-                    # seg:  |...XXX.............|
-                    seg_addr = sec.addr
-                    if (seg.addr + len(seg.data)) >= (sec.addr + len(sec.data)):
-                        # sec:    |XXXXXXXXXX|
-                        # seg:    |..XXXXXXXXXXX|
-                        # merged: |XXXXXXXXXXXXX|
-                        seg_len = len(sec.data) + (seg.addr + len(seg.data)) - (sec.addr + len(sec.data))
-                    else:
-                        # sec:    |XXXXXXXXXX|
-                        # seg:      |XXXXXX|
-                        # merged: |XXXXXXXXXX|
-                        seg_len = len(sec.data)
-                    merged_segs.append((sec.name, seg_addr, seg_len, sec.attr_str(), True))
-                    core_segs.remove(seg)
-                    merged = True
-
-            if not merged:
-                merged_segs.append((sec.name, sec.addr, len(sec.data), sec.attr_str(), False))
-
-        for ms in merged_segs:
-            print(f'{ms[0]} 0x{ms[1]:x} 0x{ms[2]:x} {ms[3]}')
-
-        for cs in core_segs:
-            # core dump exec segments are from ROM,
-            # other are belong to tasks
-            if cs.flags & ElfSegment.PF_X:
-                seg_name = 'rom.text'
-            else:
-                seg_name = 'tasks.data'
-            print(f'.coredump.{seg_name} 0x{cs.addr:x} 0x{len(cs.data):x} {cs.attr_str()}')
+        for region in self.address_space.memory_regions():
+            print(f'{region.name} 0x{region.addr:x} 0x{region.size:x} {region.attrs}')
 
     def print_core_dump_memory_contents(self):  # type: () -> None
-        for cs in self.core_elf.load_segments:
-            # core dump exec segments are from ROM,
-            # other are belong to tasks (TCB or stack)
-            if cs.flags & ElfSegment.PF_X:
-                seg_name = 'rom.text'
+        for seg in self.address_space.segments:
+            size = seg.end - seg.start
+            print(f'{seg.name} 0x{seg.start:x} 0x{size:x} {seg.obj.attr_str()}')
+            if self.no_gdb:
+                words = parse_uint32_array(seg.obj.data)
+                for i in range(0, len(words), 4):
+                    print(f'0x{seg.start + i * 4:x}:\t' + '\t'.join(f'0x{word:08x}' for word in words[i : i + 4]))
             else:
-                seg_name = 'tasks.data'
-            print(f'.coredump.{seg_name} 0x{cs.addr:x} 0x{len(cs.data):x} {cs.attr_str()}')
-            print(self.gdb_esp.run_cmd(f'x/{len(cs.data) // 4:d}x 0x{cs.addr:x}'))
+                print(self.gdb_esp.run_cmd(f'x/{size // 4:d}x 0x{seg.start:x}'))
 
     def verify_target(self, core_header_info_dict):
         target = core_header_info_dict.get('target')
@@ -563,19 +759,40 @@ class CoreDump:
                 )
             raise SystemExit(1)
 
+    def _close_loader(self):  # type: () -> None
+        """
+        Unmap the core dump source file at the end of a command
+        """
+        loader, self._loader = self._loader, None
+        if loader:
+            loader.close()
+            self._address_space = None
+
     def dbg_corefile(self):  # type: () -> Optional[list[str]]
         """
         Command to load core dump from file or flash and run GDB debug session with it
         """
-        exe_elf = ESPCoreDumpElfFile(self.prog)
+        try:
+            return self._dbg_corefile()
+        finally:
+            self._close_loader()
+
+    def _dbg_corefile(self):  # type: () -> Optional[list[str]]
+        exe_elf = get_elf_file(self.prog, ESPCoreDumpElfFile)
         with self._handle_coredump_loader_error():
             core_header_info_dict = self.get_core_header_info_dict(e_machine=exe_elf.e_machine)
-            self.core_elf = ESPCoreDumpElfFile(core_header_info_dict['core_elf_path'])
+            self.core_elf = core_header_info_dict.pop('core_elf') or get_elf_file(core_header_info_dict['core_elf_path'], ESPCoreDumpElfFile)
 
-        temp_files = core_header_info_dict.pop('temp_files')
+        temp_files = core_header_info_dict.pop('temp_files') or []
         self.chip = self.verify_target(core_header_info_dict)
+        # the uncompressed copy is removed with the temporary files, ``self.prog`` stays for the next commands
+        gdb_prog = self.get_uncompressed_elf_path(self.prog, temp_files)  # type: ignore
 
-        gdb_args = self.get_gdb_args(is_dbg_mode=True, **core_header_info_dict)
+        gdb_args = self.get_gdb_args(is_dbg_mode=True, prog=gdb_prog, **core_header_info_dict)
+        # the index of the app is created at the start of the first session, the next ones start faster
+        index_dir = tempfile.mkdtemp() if needs_gdb_index(self.prog) else None  # type: ignore
+        if index_dir:
+            gdb_args[-1:-1] = ['-ex', 'save gdb-index {}'.format(index_dir.replace('\\', '/') if os.name == 'nt' else index_dir)]
 
         p = subprocess.Popen(
             bufsize=0,
@@ -586,21 +803,92 @@ class CoreDump:
             close_fds=CLOSE_FDS,
         )
         p.wait()
+        if index_dir:
+            try:
+                store_gdb_index(self.prog, self._gdb_index_file(index_dir, gdb_prog))  # type: ignore
+            finally:
+                rmtree(index_dir, ignore_errors=True)
         print('Done!')
         return temp_files  # type: ignore
 
+    @contextmanager
+    def _gdb_session(self, core_header_info_dict, prog):  # type: (dict[str, Any], str) -> Iterator[None]
+        """
+        ``gdb_esp`` with the core dump and ``prog`` loaded while the context is active, the session is taken from ``gdb_pool`` if it is given
+        """
+        if self.no_gdb:
+            yield
+            return
+        if self.gdb_pool is None:
+            gdb_args = self.get_gdb_args(is_dbg_mode=False, prog=prog, **core_header_info_dict)
+            # the workers load the app in the background, they are needed only for the threads info
+            executor = ThreadPoolExecutor(max(self.jobs - 1, 1))
+            self._gdb_workers = [executor.submit(EspGDB, gdb_args, timeout_sec=self.gdb_timeout_sec) for _ in range(self.jobs - 1)]
+            executor.shutdown(wait=False)
+            try:
+                self.gdb_esp = EspGDB(gdb_args, timeout_sec=self.gdb_timeout_sec)
+                try:
+                    yield
+                    self._cache_gdb_index(prog)
+                finally:
+                    del self.gdb_esp
+            finally:
+                workers, self._gdb_workers = self._gdb_workers, []
+                for worker in workers:
+                    if worker.exception() is None:
+                        worker.result().close()
+            return
+        gdb_args = self.get_gdb_args(is_dbg_mode=False, prog=prog, **dict(core_header_info_dict, core_elf_path=None))
+        # sessions are shared by the apps with the same SHA256, the program ELF file path is not a part of the key
+        key = (tuple(gdb_args[:-1]), get_elf_sha256(self.prog))  # type: ignore
+        with self.gdb_pool.session(key, gdb_args, core_header_info_dict['core_elf_path'], self.gdb_timeout_sec) as self.gdb_esp:
+            try:
+                yield
+                self._cache_gdb_index(prog)
+            finally:
+                del self.gdb_esp
+
+    @staticmethod
+    def _gdb_index_file(index_dir, prog):  # type: (str, str) -> str
+        """
+        Index file saved by GDB for the program ELF file ``prog`` it loaded
+        """
+        return os.path.join(index_dir, f'{os.path.basename(prog)}.gdb-index')
+
+    def _cache_gdb_index(self, prog):  # type: (str) -> None
+        """
+        Add the GDB index of the app to the cache if it is not there, a copy of the app with it is given to GDB next time.
+        ``prog`` is the program ELF file loaded by GDB, ``self.prog`` or its uncompressed copy.
+        """
+        if not needs_gdb_index(self.prog):  # type: ignore
+            return
+        index_dir = tempfile.mkdtemp()
+        try:
+            if self.gdb_esp.save_gdb_index(index_dir):
+                store_gdb_index(self.prog, self._gdb_index_file(index_dir, prog))  # type: ignore
+        finally:
+            rmtree(index_dir, ignore_errors=True)
+
     def info_corefile(self):  # type: () -> Optional[list[str]]
         """
         Command to load core dump from file or
         flash and print it's data in user friendly form
         """
+        try:
+            return self._info_corefile()
+        finally:
+            self._close_loader()
+
+    def _info_corefile(self):  # type: () -> Optional[list[str]]
         with self._handle_coredump_loader_error():
-            self.exe_elf = ESPCoreDumpElfFile(self.prog)
+            self.exe_elf = get_elf_file(self.prog, ESPCoreDumpElfFile)
             core_header_info_dict = self.get_core_header_info_dict(e_machine=self.exe_elf.e_machine)
-            self.core_elf = ESPCoreDumpElfFile(core_header_info_dict['core_elf_path'])
+            self.core_elf = core_header_info_dict.pop('core_elf') or get_elf_file(core_header_info_dict['core_elf_path'], ESPCoreDumpElfFile)
 
-        temp_files = core_header_info_dict.pop('temp_files')
+        temp_files = core_header_info_dict.pop('temp_files') or []
         self.chip = self.verify_target(core_header_info_dict)
+        # the uncompressed copy is removed with the temporary files, ``self.prog`` stays for the next commands
+        gdb_prog = self.get_uncompressed_elf_path(self.prog, temp_files)  # type: ignore
 
         if self.exe_elf.e_machine != self.core_elf.e_machine:
             raise ValueError('The arch should be the same between core elf and exe elf')
@@ -610,39 +898,35 @@ class CoreDump:
         print('===============================================================')
         print('==================== ESP32 CORE DUMP START ====================')
 
-        gdb_args = self.get_gdb_args(is_dbg_mode=False, **core_header_info_dict)
+        with self._gdb_session(core_header_info_dict, gdb_prog):
+            extra_info = None
+            if extra_note:
+                extra_info = parse_uint32_array(extra_note.desc)
+                marker = extra_info[0]
+                self.print_crashed_task_info(marker, task_info)
+                self.print_isr_context(extra_info)
 
-        self.gdb_esp = EspGDB(gdb_args, timeout_sec=self.gdb_timeout_sec)
+            panic_details = self.get_panic_details()
+            if panic_details:
+                print('Panic reason: ' + panic_details.desc.decode('utf-8'))
 
-        extra_info = None
-        if extra_note:
-            extra_info = Struct('regs' / GreedyRange(Int32ul)).parse(extra_note.desc).regs
-            marker = extra_info[0]
-            self.print_crashed_task_info(marker)
-            self.print_isr_context(extra_info)
+            print('\n================== CURRENT THREAD REGISTERS ===================')
+            # Only xtensa have exception registers
+            self.print_current_thread_registers(extra_note, extra_info)
 
-        panic_details = self.get_panic_details()
-        if panic_details:
-            print('Panic reason: ' + panic_details.desc.decode('utf-8'))
+            print('\n==================== CURRENT THREAD STACK =====================')
+            self.print_current_thread_stack(task_info)
+            print('\n======================== THREADS INFO =========================')
+            self.print_threads_info(task_info)
+            print('\n\n======================= ALL MEMORY REGIONS ========================')
+            self.print_all_memory_regions()
 
-        print('\n================== CURRENT THREAD REGISTERS ===================')
-        # Only xtensa have exception registers
-        self.print_current_thread_registers(extra_note, extra_info)
+            if self.print_mem:
+                print('\n====================== CORE DUMP MEMORY CONTENTS ========================')
+                self.print_core_dump_memory_contents()
 
-        print('\n==================== CURRENT THREAD STACK =====================')
-        self.print_current_thread_stack(task_info)
-        print('\n======================== THREADS INFO =========================')
-        self.print_threads_info(task_info)
-        print('\n\n======================= ALL MEMORY REGIONS ========================')
-        self.print_all_memory_regions()
-
-        if self.print_mem:
-            print('\n====================== CORE DUMP MEMORY CONTENTS ========================')
-            self.print_core_dump_memory_contents()
-
-        print('\n===================== ESP32 CORE DUMP END =====================')
-        print('===============================================================')
+            print('\n===================== ESP32 CORE DUMP END =====================')
+            print('===============================================================')
 
-        del self.gdb_esp
         print('Done!')
         return temp_files  # type: ignore
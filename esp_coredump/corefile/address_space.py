@@ -0,0 +1,164 @@
+#
+# SPDX-FileCopyrightText: 2026 Espressif Systems (Shanghai) CO LTD
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+from bisect import bisect_right
+from collections import namedtuple
+from typing import Any, Iterator, Optional  # noqa: F401
+
+from .elf import ElfFile, ElfSegment, ESPCoreDumpElfFile  # noqa: F401
+
+# Address range [start, end) with its origin.
+# ``kind`` is one of the ``AddressSpace.*`` kinds, ``obj`` is the section, the segment or the task status.
+Region = namedtuple('Region', ['start', 'end', 'kind', 'name', 'obj'])
+
+# row of the memory regions listing
+MemoryRegion = namedtuple('MemoryRegion', ['name', 'addr', 'size', 'attrs'])
+
+
+class IntervalIndex:
+    """
+    Static index of possibly overlapping regions sorted by their start address.
+    Each lookup is a binary search followed by a backward scan, which is bounded by the running maximum of region ends.
+    """
+
+    def __init__(self, regions):  # type: (list[Region]) -> None
+        self.regions = sorted(regions, key=lambda r: (r.start, r.end))
+        self._starts = [r.start for r in self.regions]
+        # the highest end of regions[:i + 1]
+        self._max_ends = []  # type: list[int]
+        max_end = 0
+        for region in self.regions:
+            max_end = max(max_end, region.end)
+            self._max_ends.append(max_end)
+
+    def find(self, addr):  # type: (int) -> list[Region]
+        """
+        All regions containing the address, in the order of their start address
+        """
+        found = []
+        i = bisect_right(self._starts, addr) - 1
+        while i >= 0 and self._max_ends[i] > addr:
+            region = self.regions[i]
+            if region.end > addr:
+                found.append(region)
+            i -= 1
+        found.reverse()
+        return found
+
+    def __len__(self):  # type: () -> int
+        return len(self.regions)
+
+    def __iter__(self):  # type: () -> Iterator[Region]
+        return iter(self.regions)
+
+
+class AddressSpace:
+    """
+    Memory of the target described by the core dump, the segments of the core ELF and the sections of the app ELF.
+    Task stacks from the TASK_INFO notes are added as annotations, they have no data of their own.
+    Data of the core dump take precedence over the app sections, the memory might have changed at runtime.
+    """
+
+    SEGMENT = 'segment'
+    SECTION = 'section'
+    TASK_STACK = 'task_stack'
+    _KIND_ORDER = {TASK_STACK: 0, SEGMENT: 1, SECTION: 2}
+
+    def __init__(self, core_elf, exe_elf=None):  # type: (ESPCoreDumpElfFile, Optional[ElfFile]) -> None
+        self.core_elf = core_elf
+        self.exe_elf = exe_elf
+        self.segments = [Region(seg.addr, seg.addr + seg.size, self.SEGMENT, self._segment_name(seg), seg) for seg in core_elf.load_segments]
+        self.sections = [Region(sec.addr, sec.addr + sec.size, self.SECTION, sec.name, sec) for sec in exe_elf.sections] if exe_elf else []
+        self.task_stacks = []  # type: list[Region]
+        try:
+            task_info = core_elf.task_info
+        except ValueError:  # too short TASK_INFO note, no annotations then
+            task_info = []  # type: ignore
+        for task in task_info:
+            if task.task_stack_len:
+                name = task.task_name.split(b'\x00')[0].decode('ascii', 'replace') or f'#{task.task_index}'
+                self.task_stacks.append(Region(task.task_stack_start, task.task_stack_start + task.task_stack_len, self.TASK_STACK, f'task {name} stack', task))
+        self._data_index = IntervalIndex([r for r in self.segments + self.sections if r.end > r.start])
+        self._index = IntervalIndex(self.segments + self.sections + self.task_stacks)
+
+    @staticmethod
+    def _segment_name(seg):  # type: (ElfSegment) -> str
+        # core dump exec segments are from ROM, other are belong to tasks (TCB or stack)
+        return '.coredump.rom.text' if seg.flags & ElfSegment.PF_X else '.coredump.tasks.data'
+
+    def regions_at(self, addr):  # type: (int) -> list[Region]
+        """
+        All regions containing the address, sorted from the innermost one.
+        Of the regions with the same size, task stacks go first, then core dump segments and app sections.
+        """
+        return sorted(self._index.find(addr), key=lambda r: (r.end - r.start, self._KIND_ORDER[r.kind]))
+
+    def owner(self, addr):  # type: (int) -> Optional[Region]
+        """
+        The innermost region containing the address (task stack, core dump segment or app section), None if there is none
+        """
+        regions = self.regions_at(addr)
+        return regions[0] if regions else None
+
+    def _data_at(self, addr):  # type: (int) -> Optional[Region]
+        regions = self._data_index.find(addr)
+        for region in regions:
+            if region.kind == self.SEGMENT:
+                return region
+        return regions[0] if regions else None
+
+    def read(self, addr, size):  # type: (int, int) -> bytes
+        """
+        Read memory, the range may span adjacent segments and sections
+        :raises ValueError: if any part of the range is not available in the core dump nor in the app
+        """
+        chunks = []
+        pos = addr
+        end = addr + size
+        while pos < end:
+            region = self._data_at(pos)
+            if region is None:
+                raise ValueError(f'Memory at 0x{pos:x} is not available')
+            chunk_end = min(end, region.end)
+            chunks.append(bytes(region.obj.data[pos - region.start : chunk_end - region.start]))
+            pos = chunk_end
+        return b''.join(chunks)
+
+    def memory_regions(self):  # type: () -> list[MemoryRegion]
+        """
+        Listing of app sections merged with the core dump segments which overlap them, followed by the remaining segments.
+        A segment is merged into the first overlapping section (the boundaries are inclusive).
+        Sections and segments are merged in one sweep over them sorted by address.
+        """
+        sections = sorted(range(len(self.sections)), key=lambda i: self.sections[i].start)
+        segments = sorted(range(len(self.segments)), key=lambda i: self.segments[i].start)
+        # merged regions for each section
+        merged = [[] for _ in self.sections]  # type: list[list[tuple[int, int]]]
+        consumed = [False] * len(self.segments)
+        j = 0
+        for i in sections:
+            sec = self.sections[i]
+            k = j
+            # each segment starting before the section end either overlaps it, or ends before it and also before all next sections
+            while k < len(segments) and self.segments[segments[k]].start <= sec.end:
+                seg = self.segments[segments[k]]
+                if seg.end >= sec.start:
+                    merged[i].append((min(sec.start, seg.start), max(sec.end, seg.end)))
+                    consumed[segments[k]] = True
+                k += 1
+            j = k
+
+        rows = []
+        for sec, sec_merged in zip(self.sections, merged):
+            attrs = sec.obj.attr_str()
+            if not sec_merged:
+                rows.append(MemoryRegion(sec.name, sec.start, sec.end - sec.start, attrs))
+            for start, end in sec_merged:
+                rows.append(MemoryRegion(sec.name, start, end - start, attrs))
+        for seg, seg_consumed in zip(self.segments, consumed):
+            if not seg_consumed:
+                rows.append(MemoryRegion(seg.name, seg.start, seg.end - seg.start, seg.obj.attr_str()))
+        return rows
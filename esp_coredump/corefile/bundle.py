@@ -0,0 +1,178 @@
+#
+# SPDX-FileCopyrightText: 2026 Espressif Systems (Shanghai) CO LTD
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+import os
+import tempfile
+import zlib
+from typing import Any, Optional  # noqa: F401
+
+from .cache import get_elf_file, get_elf_sha256
+from .codec import ELF_IDENT, CompressionHeader, ElfHeader, SectionHeader, StructCodec
+from .elf import ElfFile, ElfSection
+from .symbols import SymbolEntry, SymbolTable
+
+# Analysis bundle is a program ELF file reduced to what is needed to decode core dumps: the allocated sections,
+# symbols and the DWARF debug sections (line tables, scopes and types), which are compressed (SHF_COMPRESSED).
+# It is a valid ELF file, so it can be given as the program ELF to GDB and to ``CoreDump``.
+# Symbols of the ROM ELF file and the SHA256 of the original ELF file (as stored in core dumps) are added in extra sections.
+
+BUNDLE_SECTION = '.esp_coredump.bundle'
+ROM_SYMTAB_SECTION = '.esp_rom.symtab'
+ROM_STRTAB_SECTION = '.esp_rom.strtab'
+
+BUNDLE_MAGIC = b'ESPBNDL\x00'
+BUNDLE_VERSION = 1
+
+BundleInfo = StructCodec(
+    'BundleInfo',
+    [
+        ('magic', '8s'),
+        ('version', 'I'),
+        ('app_sha256', '32s'),
+        # zeros if there are no ROM symbols
+        ('rom_sha256', '32s'),
+    ],
+)
+
+
+def get_bundle_info(elf):  # type: (ElfFile) -> Any
+    """
+    ``BundleInfo`` of an analysis bundle, None for other ELF files
+    :raises ValueError: if the bundle was created by a newer version of the tool
+    """
+    section = elf.get_section(BUNDLE_SECTION)
+    if section is None or section.size < BundleInfo.size:
+        return None
+    info = BundleInfo.parse(section.data)
+    if info.magic != BUNDLE_MAGIC:
+        return None
+    if info.version > BUNDLE_VERSION:
+        raise ValueError(f'Analysis bundle version {info.version} is not supported, please update esp-coredump')
+    return info
+
+
+def get_rom_symbol_table(elf):  # type: (ElfFile) -> Optional[SymbolTable]
+    """
+    Symbols of the ROM ELF file stored in an analysis bundle, None if there are none
+    """
+    if elf.get_section(ROM_SYMTAB_SECTION) is None:
+        return None
+    return SymbolTable.from_elf(elf, ROM_SYMTAB_SECTION, ROM_STRTAB_SECTION)
+
+
+def _is_kept(name, sh):  # type: (str, Any) -> bool
+    # sections with an address are listed in the memory regions, even the empty ones
+    return bool(sh.sh_addr or sh.sh_flags & ElfSection.SHF_ALLOC) or name in ('.symtab', '.strtab') or name.startswith('.debug_')
+
+
+def _compress(data):  # type: (Any) -> bytes
+    return CompressionHeader.pack(ElfFile.ELFCOMPRESS_ZLIB, len(data), 1) + zlib.compress(data, 9)
+
+
+def write_bundle(elf_path, output, rom_elf_path=None):  # type: (str, str, Optional[str]) -> None
+    """
+    Write the analysis bundle of the program ELF file.
+
+    Section indexes of the program ELF file are kept, so its symbols remain valid. Dropped sections (e.g. ``.comment``
+    or the Xtensa property tables) stay as inactive ``SHT_NULL`` entries without data.
+    :param elf_path: program ELF file path, the file may be compressed
+    :param output: bundle file path, the file is replaced atomically
+    :param rom_elf_path: ROM ELF file whose symbols are added to the bundle
+    """
+    elf = get_elf_file(elf_path)  # type: ElfFile
+    if elf._elf_data is None:
+        raise ValueError(f'"{elf_path}" is not an ELF file')
+    elf_data = elf._elf_data
+    elf_header = ElfHeader.parse(elf_data)
+    headers = list(SectionHeader.iter_parse(elf_data, elf_header.e_shoff, elf_header.e_shnum))
+    shstrtab = headers[elf_header.e_shstrndx]
+    string_table = bytes(elf_data[shstrtab.sh_offset : shstrtab.sh_offset + shstrtab.sh_size])
+
+    # (name, header fields, data) of the bundle sections, in the order of the section header table
+    sections = []  # type: list[tuple[str, dict[str, int], Any]]
+    for i, sh in enumerate(headers):
+        name = ElfFile._parse_string_table(string_table, sh.sh_name) if i else ''
+        fields = sh._asdict()
+        data = b'' if sh.sh_type == ElfFile.SHT_NOBITS else elf_data[sh.sh_offset : sh.sh_offset + sh.sh_size]
+        if i == 0 or i == elf_header.e_shstrndx:
+            data = b''  # the string table is built below
+        elif not _is_kept(name, sh):
+            fields.update(sh_type=ElfFile.SHT_NULL, sh_flags=0, sh_size=0, sh_link=0, sh_info=0)
+            data = b''
+        elif name.startswith('.debug_') and not sh.sh_flags & ElfSection.SHF_COMPRESSED:
+            data = _compress(data)
+            fields.update(sh_flags=sh.sh_flags | ElfSection.SHF_COMPRESSED, sh_addralign=4)
+        sections.append((name, fields, data))
+
+    rom_sha256 = bytes(32)
+    if rom_elf_path:
+        rom_elf = get_elf_file(rom_elf_path)  # type: ElfFile
+        rom_symtab = rom_elf.get_section('.symtab')
+        rom_strtab = rom_elf.get_section('.strtab')
+        if rom_symtab is None or rom_strtab is None:
+            raise ValueError(f'ROM ELF file "{rom_elf_path}" has no symbols')
+        rom_sha256 = get_elf_sha256(rom_elf_path)
+        # not SHT_SYMTAB, so GDB does not mix them with the app symbols
+        rom_symtab_fields = {'sh_type': ElfFile.SHT_PROGBITS, 'sh_link': len(sections) + 1, 'sh_addralign': 4, 'sh_entsize': SymbolEntry.size}
+        sections.append((ROM_SYMTAB_SECTION, rom_symtab_fields, rom_symtab.data))
+        sections.append((ROM_STRTAB_SECTION, {'sh_type': ElfFile.SHT_PROGBITS, 'sh_addralign': 1}, rom_strtab.data))
+    info = BundleInfo.build({'magic': BUNDLE_MAGIC, 'version': BUNDLE_VERSION, 'app_sha256': get_elf_sha256(elf_path), 'rom_sha256': rom_sha256})
+    sections.append((BUNDLE_SECTION, {'sh_type': ElfFile.SHT_PROGBITS, 'sh_addralign': 4}, info))
+
+    names = bytearray(b'\x00')
+    for name, fields, _ in sections:
+        if name:
+            fields['sh_name'] = len(names)
+            names += name.encode() + b'\x00'
+    sections[elf_header.e_shstrndx] = ('.shstrtab', sections[elf_header.e_shstrndx][1], bytes(names))
+
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(os.path.abspath(output)), delete=False) as f:
+        try:
+            _write_sections(f, elf_header, sections)
+        except BaseException:
+            f.close()
+            os.remove(f.name)
+            raise
+    os.replace(f.name, output)
+
+
+def _write_sections(f, elf_header, sections):  # type: (Any, Any, list[tuple[str, dict[str, int], Any]]) -> None
+    offset = ElfHeader.size
+    section_headers = []
+    chunks = []
+    for _, fields, data in sections:
+        align = max(fields.get('sh_addralign', 1), 1)
+        padding = -offset % align if data else 0
+        chunks.append(bytes(padding))
+        chunks.append(data)
+        offset += padding
+        sh_size = len(data) if fields.get('sh_type') != ElfFile.SHT_NOBITS else fields['sh_size']
+        section_headers.append(SectionHeader.build(dict(fields, sh_offset=offset if data else 0, sh_size=sh_size)))
+        offset += len(data)
+    padding = -offset % 4
+    f.write(
+        ElfHeader.build(
+            {
+                'e_ident': ELF_IDENT,
+                'e_type': elf_header.e_type,
+                'e_machine': elf_header.e_machine,
+                'e_version': elf_header.e_version,
+                'e_entry': elf_header.e_entry,
+                'e_phoff': 0,
+                'e_shoff': offset + padding,
+                'e_flags': elf_header.e_flags,
+                'e_ehsize': ElfHeader.size,
+                'e_phentsize': 0,
+                'e_phnum': 0,
+                'e_shentsize': SectionHeader.size,
+                'e_shnum': len(section_headers),
+                'e_shstrndx': elf_header.e_shstrndx,
+            }
+        )
+    )
+    f.writelines(chunks)
+    f.write(bytes(padding))
+    f.write(b''.join(section_headers))
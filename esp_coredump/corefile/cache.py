@@ -0,0 +1,236 @@
+#
+# SPDX-FileCopyrightText: 2026 Espressif Systems (Shanghai) CO LTD
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from stat import S_ISREG
+from typing import Any, Optional, Tuple, Type  # noqa: F401
+
+from .elf import ElfFile
+
+# default budget of the process-wide cache, can be changed with the ESP_COREDUMP_ELF_CACHE_SIZE environment variable
+DEFAULT_ELF_CACHE_SIZE = 256 * 1024 * 1024
+
+# extended attribute with the SHA256 of an ELF file, see ``get_elf_sha256``. It is used instead of a file in
+# ``get_cache_dir()`` only if the ESP_COREDUMP_SHA256_XATTR environment variable is 1, the ELF files are not modified otherwise.
+SHA256_XATTR = 'user.esp_coredump.sha256'
+
+
+class ElfFileCache:
+    """
+    LRU cache of parsed ELF files, so program and ROM ELF files used for many core dumps are parsed only once.
+
+    Files are identified by their real path, size, modification time and inode, a modified file is parsed again.
+    The size of the ELF data (mapped or decompressed) of all cached files is kept within ``max_bytes``,
+    the least recently used files are evicted first. Cached ``ElfFile`` objects are shared and must not be modified.
+    Evicted and discarded files are only dropped from the cache, they may be still in use. A file is unmapped when
+    its last reference is released.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_ELF_CACHE_SIZE):  # type: (int) -> None
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # real path -> ((size, mtime_ns, inode), parsed file, size of its data)
+        self._entries = OrderedDict()  # type: OrderedDict[str, Tuple[Tuple[int, int, int], ElfFile, int]]
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, elf_path, elf_class=ElfFile):  # type: (str, Type[ElfFile]) -> Any
+        """
+        Returns parsed ELF file, an already cached instance of ``elf_class`` (or of its subclass) is reused.
+        Missing files are not cached, an empty ``elf_class`` object is returned for them like from its constructor.
+        """
+        try:
+            stat = os.stat(elf_path)
+        except OSError:
+            return elf_class(elf_path)
+        if not S_ISREG(stat.st_mode):
+            return elf_class(elf_path)
+        signature = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+        path = os.path.realpath(elf_path)
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == signature and isinstance(entry[1], elf_class):
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry[1]
+
+            self.misses += 1
+            elf = elf_class(elf_path)
+            self._remove(path)
+            nbytes = len(elf._elf_data) if elf._elf_data is not None else 0
+            if nbytes <= self.max_bytes:
+                self._entries[path] = (signature, elf, nbytes)
+                self._size += nbytes
+                self._evict()
+            return elf
+
+    def discard(self, elf_path):  # type: (str) -> None
+        """
+        Drop the file from the cache, e.g. before it is removed
+        """
+        with self._lock:
+            self._remove(os.path.realpath(elf_path))
+
+    def clear(self):  # type: () -> None
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    @property
+    def size(self):  # type: () -> int
+        """
+        Size of the ELF data of all cached files
+        """
+        return self._size
+
+    def __len__(self):  # type: () -> int
+        return len(self._entries)
+
+    def _remove(self, path):  # type: (str) -> None
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self._size -= entry[2]
+
+    def _evict(self):  # type: () -> None
+        while self._size > self.max_bytes:
+            _, (_, _, nbytes) = self._entries.popitem(last=False)
+            self._size -= nbytes
+
+
+elf_file_cache = ElfFileCache(int(os.environ.get('ESP_COREDUMP_ELF_CACHE_SIZE', DEFAULT_ELF_CACHE_SIZE)))
+
+
+def get_elf_file(elf_path, elf_class=ElfFile):  # type: (str, Type[ElfFile]) -> Any
+    """
+    Parse the ELF file through the process-wide ``elf_file_cache``
+    """
+    return elf_file_cache.get(elf_path, elf_class)
+
+
+def get_cache_dir():  # type: () -> str
+    """
+    Directory of the persistent caches, can be changed with the ESP_COREDUMP_CACHE_DIR environment variable
+    """
+    return os.environ.get('ESP_COREDUMP_CACHE_DIR') or os.path.join(os.path.expanduser('~'), '.cache', 'esp-coredump')
+
+
+def get_elf_cache_dir(name, elf_path):  # type: (str, str) -> Optional[str]
+    """
+    Directory of the persistent cache ``name`` for the ELF file in ``get_cache_dir()``, None if it can't be created.
+
+    The directory belongs to the real path of the file and is valid for its current size, modification time and inode only,
+    the content cached for a previous version of the file is removed.
+    """
+    try:
+        stat = os.stat(elf_path)
+    except OSError:
+        return None
+    path = os.path.realpath(elf_path)
+    cache_dir = os.path.join(get_cache_dir(), name, hashlib.sha1(path.encode('utf-8', 'surrogateescape')).hexdigest())
+    identity = f'{stat.st_size}:{stat.st_mtime_ns}:{stat.st_ino}:{path}'
+    identity_path = os.path.join(cache_dir, 'identity')
+    try:
+        with open(identity_path, encoding='utf-8', errors='surrogateescape') as fr:
+            if fr.read() == identity:
+                return cache_dir
+    except OSError:
+        pass
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with tempfile.NamedTemporaryFile('w', dir=cache_dir, delete=False, encoding='utf-8', errors='surrogateescape') as f:
+            f.write(identity)
+        os.replace(f.name, identity_path)
+    except OSError as e:
+        logging.debug(f'Failed to create the cache directory of "{elf_path}": {e}')
+        return None
+    return cache_dir
+
+
+def _sha256_sidecar_path(elf_path):  # type: (str) -> str
+    return os.path.join(get_cache_dir(), 'sha256', hashlib.sha1(elf_path.encode('utf-8', 'surrogateescape')).hexdigest())
+
+
+def _use_sha256_xattr():  # type: () -> bool
+    return os.environ.get('ESP_COREDUMP_SHA256_XATTR') == '1'
+
+
+def _load_stored_sha256(elf_path, stamp):  # type: (str, str) -> Optional[bytes]
+    values = []
+    if _use_sha256_xattr():
+        try:
+            values.append(os.getxattr(elf_path, SHA256_XATTR).decode('ascii'))
+        except (AttributeError, OSError, UnicodeDecodeError):  # no xattr support
+            pass
+    try:
+        with open(_sha256_sidecar_path(elf_path), encoding='ascii') as f:
+            values.append(f.read())
+    except (OSError, UnicodeDecodeError):
+        pass
+    for value in values:
+        value_stamp, _, sha256 = value.strip().rpartition(':')
+        if value_stamp == stamp and len(sha256) == 64:
+            try:
+                return bytes.fromhex(sha256)
+            except ValueError:
+                pass
+    return None
+
+
+def _store_sha256(elf_path, stamp, sha256):  # type: (str, str, bytes) -> None
+    value = f'{stamp}:{sha256.hex()}'
+    if _use_sha256_xattr():
+        try:
+            os.setxattr(elf_path, SHA256_XATTR, value.encode('ascii'))
+            return
+        except (AttributeError, OSError):  # no xattr support or read-only file
+            pass
+    sidecar_path = _sha256_sidecar_path(elf_path)
+    try:
+        os.makedirs(os.path.dirname(sidecar_path), exist_ok=True)
+        with tempfile.NamedTemporaryFile('w', dir=os.path.dirname(sidecar_path), delete=False, encoding='ascii') as f:
+            f.write(value)
+        os.replace(f.name, sidecar_path)
+    except OSError as e:
+        logging.debug(f'Failed to store SHA256 of "{elf_path}": {e}')
+
+
+def get_elf_sha256(elf_path):  # type: (str) -> bytes
+    """
+    SHA256 of the ELF file, as stored in core dumps to match them with the app.
+
+    The whole file is hashed once for each version of it, the result is stored in a file in ``get_cache_dir()``
+    (or in the extended attributes of the ELF file, see ``SHA256_XATTR``) and reused while the size,
+    modification time and inode of the file are the same.
+    The SHA256 of an analysis bundle is the one of the program ELF file it was created from.
+    """
+    from .bundle import get_bundle_info  # the bundle module imports this module
+
+    elf = get_elf_file(elf_path)  # type: ElfFile
+    bundle_info = get_bundle_info(elf)
+    if bundle_info is not None:
+        return bundle_info.app_sha256  # type: ignore
+    try:
+        stat = os.stat(elf_path)
+    except OSError:
+        return elf.sha256
+    stamp = f'{stat.st_size}:{stat.st_mtime_ns}:{stat.st_ino}'
+    path = os.path.realpath(elf_path)
+    sha256 = _load_stored_sha256(path, stamp)
+    if sha256 is None:
+        sha256 = elf.sha256
+        _store_sha256(path, stamp, sha256)
+    else:
+        elf.sha256 = sha256
+    return sha256
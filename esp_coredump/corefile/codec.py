@@ -0,0 +1,245 @@
+#
+# SPDX-FileCopyrightText: 2026 Espressif Systems (Shanghai) CO LTD
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+import struct
+from collections import namedtuple
+from typing import Any, Iterator, Mapping, Optional, Tuple  # noqa: F401
+
+# Precompiled codecs of the static structures used while reading and writing core dumps.
+# They replace the interpreted ``construct`` structs in the hot paths, field names are kept.
+
+
+class StructCodec:
+    """
+    ``struct.Struct`` based equivalent of a static ``construct`` Struct.
+
+    Fields are given as ``(name, format)`` pairs in the ``struct`` module syntax, little-endian is implied.
+    Padding fields (``'12x'``) have no name, repeated numeric fields (``'32I'``) are parsed into lists.
+    ``parse`` returns a named tuple, ``build`` accepts any mapping, missing fields are built as zeros.
+    """
+
+    record = None  # type: Any
+
+    def __init__(self, name, fields):  # type: (str, list[Tuple[Optional[str], str]]) -> None
+        self.names = []  # type: list[str]
+        # number of items of the array fields
+        self._arrays = {}  # type: dict[str, int]
+        for field_name, fmt in fields:
+            if field_name is None:
+                continue
+            self.names.append(field_name)
+            if len(fmt) > 1 and fmt[-1] != 's':
+                self._arrays[field_name] = int(fmt[:-1])
+        self._struct = struct.Struct('<' + ''.join(fmt for _, fmt in fields))
+        self.record = namedtuple(name, self.names)  # type: ignore[misc]
+        self.size = self._struct.size
+
+    def sizeof(self):  # type: () -> int
+        return self.size
+
+    def unpack_from(self, data, offset=0):  # type: (Any, int) -> Tuple[Any, ...]
+        """
+        Parse into a plain tuple of values, array fields are flattened
+        """
+        return self._struct.unpack_from(data, offset)
+
+    def pack(self, *values):  # type: (Any) -> bytes
+        """
+        Build from values in the field order, array fields are flattened
+        """
+        return self._struct.pack(*values)
+
+    def parse(self, data, offset=0):  # type: (Any, int) -> Any
+        values = self._struct.unpack_from(data, offset)
+        if not self._arrays:
+            return self.record._make(values)
+        fields = []
+        pos = 0
+        for field_name in self.names:
+            count = self._arrays.get(field_name)
+            if count is None:
+                fields.append(values[pos])
+                pos += 1
+            else:
+                fields.append(list(values[pos : pos + count]))
+                pos += count
+        return self.record._make(fields)
+
+    def iter_parse(self, data, offset=0, count=None):  # type: (Any, int, Optional[int]) -> Iterator[Any]
+        """
+        Parse consecutive records, until the end of data or ``count`` records
+        """
+        end = len(data) if count is None else offset + count * self.size
+        for pos in range(offset, end - self.size + 1, self.size):
+            yield self.parse(data, pos)
+
+    def build(self, obj):  # type: (Mapping[str, Any]) -> bytes
+        values = []  # type: list[Any]
+        for field_name in self.names:
+            if field_name in self._arrays:
+                values.extend(obj.get(field_name) or [0] * self._arrays[field_name])
+            else:
+                values.append(obj.get(field_name, 0))
+        return self._struct.pack(*values)
+
+
+def parse_uint32_array(data):  # type: (Any) -> list[int]
+    """
+    Parse all complete little-endian 32-bit words of data, like ``GreedyRange(Int32ul)``
+    """
+    return list(struct.unpack_from(f'<{len(data) // 4}I', data))
+
+
+def build_uint32_array(values):  # type: (list[int]) -> bytes
+    return struct.pack(f'<{len(values)}I', *values)
+
+
+UINT32 = struct.Struct('<I')
+
+# Following structs are based on spec
+# https://refspecs.linuxfoundation.org/elf/elf.pdf
+# and source code
+# IDF_PATH/components/espcoredump/include_core_dump/elf.h
+
+ELF_IDENT = b'\x7fELF\x01\x01\x01'  # ELFCLASS32, ELFDATA2LSB, EV_CURRENT
+
+ElfHeader = StructCodec(
+    'ElfHeader',
+    [
+        ('e_ident', '16s'),
+        ('e_type', 'H'),
+        ('e_machine', 'H'),
+        ('e_version', 'I'),
+        ('e_entry', 'I'),
+        ('e_phoff', 'I'),
+        ('e_shoff', 'I'),
+        ('e_flags', 'I'),
+        ('e_ehsize', 'H'),
+        ('e_phentsize', 'H'),
+        ('e_phnum', 'H'),
+        ('e_shentsize', 'H'),
+        ('e_shnum', 'H'),
+        ('e_shstrndx', 'H'),
+    ],
+)
+
+SectionHeader = StructCodec(
+    'SectionHeader',
+    [
+        ('sh_name', 'I'),
+        ('sh_type', 'I'),
+        ('sh_flags', 'I'),
+        ('sh_addr', 'I'),
+        ('sh_offset', 'I'),
+        ('sh_size', 'I'),
+        ('sh_link', 'I'),
+        ('sh_info', 'I'),
+        ('sh_addralign', 'I'),
+        ('sh_entsize', 'I'),
+    ],
+)
+
+ProgramHeader = StructCodec(
+    'ProgramHeader',
+    [
+        ('p_type', 'I'),
+        ('p_offset', 'I'),
+        ('p_vaddr', 'I'),
+        ('p_paddr', 'I'),
+        ('p_filesz', 'I'),
+        ('p_memsz', 'I'),
+        ('p_flags', 'I'),
+        ('p_align', 'I'),
+    ],
+)
+
+# Elf32_Chdr in front of the data of SHF_COMPRESSED sections
+CompressionHeader = StructCodec(
+    'CompressionHeader',
+    [
+        ('ch_type', 'I'),
+        ('ch_size', 'I'),
+        ('ch_addralign', 'I'),
+    ],
+)
+
+NoteHeader = StructCodec(
+    'NoteHeader',
+    [
+        ('namesz', 'I'),
+        ('descsz', 'I'),
+        ('type', 'I'),
+    ],
+)
+
+Note = namedtuple('Note', ['namesz', 'descsz', 'type', 'name', 'desc'])
+
+
+def iter_notes(data):  # type: (Any) -> Iterator[Note]
+    """
+    Parse 4-byte aligned ELF notes, like ``GreedyRange(NoteSection)`` it stops at the first incomplete note.
+    ``name`` is cut at the terminating NUL byte, it may be followed by non-zero padding.
+    """
+    unpack_header = NoteHeader.unpack_from
+    header_size = NoteHeader.size
+    data_len = len(data)
+    offset = 0
+    while offset + header_size <= data_len:
+        namesz, descsz, note_type = unpack_header(data, offset)
+        name_start = offset + header_size
+        desc_start = name_start + ((namesz + 3) & ~3)
+        next_offset = desc_start + ((descsz + 3) & ~3)
+        if next_offset > data_len:
+            return
+        name = bytes(data[name_start : name_start + namesz])
+        nul = name.find(b'\x00')
+        yield Note(namesz, descsz, note_type, name if nul == -1 else name[:nul], bytes(data[desc_start : desc_start + descsz]))
+        offset = next_offset
+
+
+# Following structs are based on source code
+# IDF_PATH/components/espcoredump/src/core_dump_elf.c
+
+EspTaskStatus = StructCodec(
+    'EspTaskStatus',
+    [
+        ('task_index', 'I'),
+        ('task_flags', 'I'),
+        ('task_tcb_addr', 'I'),
+        ('task_stack_start', 'I'),
+        ('task_stack_len', 'I'),
+        ('task_name', '16s'),
+    ],
+)
+
+# Following structs are based on source code
+# components/espcoredump/include_core_dump/esp_core_dump_priv.h
+
+TaskHeader = StructCodec(
+    'TaskHeader',
+    [
+        ('tcb_addr', 'I'),
+        ('stack_top', 'I'),
+        ('stack_end', 'I'),
+    ],
+)
+
+MemSegmentHeader = StructCodec(
+    'MemSegmentHeader',
+    [
+        ('mem_start', 'I'),
+        ('mem_sz', 'I'),
+    ],
+)
+
+# version and SHA256 of the application as hex string, the beginning of ESP_CORE_DUMP_INFO note
+CoreDumpInfo = StructCodec(
+    'CoreDumpInfo',
+    [
+        ('ver', 'I'),
+        ('sha256', '64s'),
+    ],
+)
@@ -0,0 +1,1180 @@
+#
+# SPDX-FileCopyrightText: 2026 Espressif Systems (Shanghai) CO LTD
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+import json
+import logging
+import os
+import re
+import struct
+import sys
+import tempfile
+import zlib
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+from typing import Any, Iterable, Optional, Tuple, Union  # noqa: F401
+
+from .address_space import IntervalIndex, Region
+from .cache import get_cache_dir, get_elf_cache_dir, get_elf_file
+from .elf import ElfFile  # noqa: F401
+
+# Source lines of program addresses decoded from the DWARF debug information (versions 2 - 5) of the app ELF,
+# so crashes can be located without GDB. Only the compilation units containing the looked up addresses are decoded.
+# Layouts of struct types are extracted too, so the variables (e.g. FreeRTOS TCBs) can be read from the core dump memory.
+# Following constants are based on spec https://dwarfstd.org/doc/DWARF5.pdf
+
+# source location of an address, ``function`` is None if it is not known
+SourceLocation = namedtuple('SourceLocation', ['function', 'file', 'line'])
+
+# member of a struct or union, ``kind`` is one of the ``StructLayout.*`` kinds of its type
+StructMember = namedtuple('StructMember', ['name', 'offset', 'size', 'type_name', 'kind'])
+
+DW_TAG_array_type = 0x01
+DW_TAG_enumeration_type = 0x04
+DW_TAG_lexical_block = 0x0B
+DW_TAG_member = 0x0D
+DW_TAG_pointer_type = 0x0F
+DW_TAG_compile_unit = 0x11
+DW_TAG_structure_type = 0x13
+DW_TAG_subroutine_type = 0x15
+DW_TAG_typedef = 0x16
+DW_TAG_union_type = 0x17
+DW_TAG_inlined_subroutine = 0x1D
+DW_TAG_subrange_type = 0x21
+DW_TAG_base_type = 0x24
+DW_TAG_const_type = 0x26
+DW_TAG_subprogram = 0x2E
+DW_TAG_volatile_type = 0x35
+DW_TAG_restrict_type = 0x37
+DW_TAG_partial_unit = 0x3C
+DW_TAG_atomic_type = 0x47
+
+DW_AT_sibling = 0x01
+DW_AT_name = 0x03
+DW_AT_byte_size = 0x0B
+DW_AT_bit_size = 0x0D
+DW_AT_stmt_list = 0x10
+DW_AT_low_pc = 0x11
+DW_AT_high_pc = 0x12
+DW_AT_comp_dir = 0x1B
+DW_AT_upper_bound = 0x2F
+DW_AT_abstract_origin = 0x31
+DW_AT_count = 0x37
+DW_AT_data_member_location = 0x38
+DW_AT_declaration = 0x3C
+DW_AT_encoding = 0x3E
+DW_AT_specification = 0x47
+DW_AT_type = 0x49
+DW_AT_ranges = 0x55
+DW_AT_call_file = 0x58
+DW_AT_call_line = 0x59
+DW_AT_linkage_name = 0x6E
+DW_AT_str_offsets_base = 0x72
+DW_AT_addr_base = 0x73
+DW_AT_rnglists_base = 0x74
+DW_AT_MIPS_linkage_name = 0x2007
+
+DW_FORM_addr = 0x01
+DW_FORM_block2 = 0x03
+DW_FORM_block4 = 0x04
+DW_FORM_data2 = 0x05
+DW_FORM_data4 = 0x06
+DW_FORM_data8 = 0x07
+DW_FORM_string = 0x08
+DW_FORM_block = 0x09
+DW_FORM_block1 = 0x0A
+DW_FORM_data1 = 0x0B
+DW_FORM_flag = 0x0C
+DW_FORM_sdata = 0x0D
+DW_FORM_strp = 0x0E
+DW_FORM_udata = 0x0F
+DW_FORM_ref_addr = 0x10
+DW_FORM_ref1 = 0x11
+DW_FORM_ref2 = 0x12
+DW_FORM_ref4 = 0x13
+DW_FORM_ref8 = 0x14
+DW_FORM_ref_udata = 0x15
+DW_FORM_indirect = 0x16
+DW_FORM_sec_offset = 0x17
+DW_FORM_exprloc = 0x18
+DW_FORM_flag_present = 0x19
+DW_FORM_strx = 0x1A
+DW_FORM_addrx = 0x1B
+DW_FORM_ref_sup4 = 0x1C
+DW_FORM_strp_sup = 0x1D
+DW_FORM_data16 = 0x1E
+DW_FORM_line_strp = 0x1F
+DW_FORM_ref_sig8 = 0x20
+DW_FORM_implicit_const = 0x21
+DW_FORM_loclistx = 0x22
+DW_FORM_rnglistx = 0x23
+DW_FORM_ref_sup8 = 0x24
+DW_FORM_strx1 = 0x25
+DW_FORM_strx2 = 0x26
+DW_FORM_strx3 = 0x27
+DW_FORM_strx4 = 0x28
+DW_FORM_addrx1 = 0x29
+DW_FORM_addrx2 = 0x2A
+DW_FORM_addrx3 = 0x2B
+DW_FORM_addrx4 = 0x2C
+DW_FORM_GNU_addr_index = 0x1F01
+DW_FORM_GNU_str_index = 0x1F02
+DW_FORM_GNU_ref_alt = 0x1F20
+DW_FORM_GNU_strp_alt = 0x1F21
+
+# forms of a fixed size
+FIXED_FORM_SIZES = {
+    DW_FORM_data1: 1,
+    DW_FORM_ref1: 1,
+    DW_FORM_flag: 1,
+    DW_FORM_strx1: 1,
+    DW_FORM_addrx1: 1,
+    DW_FORM_data2: 2,
+    DW_FORM_ref2: 2,
+    DW_FORM_strx2: 2,
+    DW_FORM_addrx2: 2,
+    DW_FORM_strx3: 3,
+    DW_FORM_addrx3: 3,
+    DW_FORM_data4: 4,
+    DW_FORM_ref4: 4,
+    DW_FORM_ref_sup4: 4,
+    DW_FORM_strx4: 4,
+    DW_FORM_addrx4: 4,
+    DW_FORM_data8: 8,
+    DW_FORM_ref8: 8,
+    DW_FORM_ref_sig8: 8,
+    DW_FORM_ref_sup8: 8,
+    DW_FORM_data16: 16,
+    DW_FORM_flag_present: 0,
+    DW_FORM_implicit_const: 0,
+}
+ULEB_FORMS = {
+    DW_FORM_udata,
+    DW_FORM_ref_udata,
+    DW_FORM_strx,
+    DW_FORM_addrx,
+    DW_FORM_loclistx,
+    DW_FORM_rnglistx,
+    DW_FORM_GNU_addr_index,
+    DW_FORM_GNU_str_index,
+}
+OFFSET_FORMS = {DW_FORM_strp, DW_FORM_sec_offset, DW_FORM_line_strp, DW_FORM_strp_sup, DW_FORM_GNU_ref_alt, DW_FORM_GNU_strp_alt}
+STRX_FORMS = {DW_FORM_strx, DW_FORM_strx1, DW_FORM_strx2, DW_FORM_strx3, DW_FORM_strx4, DW_FORM_GNU_str_index}
+ADDRX_FORMS = {DW_FORM_addrx, DW_FORM_addrx1, DW_FORM_addrx2, DW_FORM_addrx3, DW_FORM_addrx4, DW_FORM_GNU_addr_index}
+CU_REF_FORMS = {DW_FORM_ref1, DW_FORM_ref2, DW_FORM_ref4, DW_FORM_ref8, DW_FORM_ref_udata}
+
+BLOCK_FORMS = {DW_FORM_block, DW_FORM_block1, DW_FORM_block2, DW_FORM_block4, DW_FORM_exprloc}
+
+DW_ATE_float = 0x04
+DW_ATE_signed = 0x05
+DW_ATE_signed_char = 0x06
+
+DW_OP_plus_uconst = 0x23
+
+# type qualifiers, they are kept in the type names
+QUALIFIER_TAGS = {DW_TAG_const_type: 'const', DW_TAG_volatile_type: 'volatile', DW_TAG_restrict_type: 'restrict', DW_TAG_atomic_type: '_Atomic'}
+COMPOSITE_TAGS = {DW_TAG_structure_type: 'struct', DW_TAG_union_type: 'union', DW_TAG_enumeration_type: 'enum'}
+
+DW_LNS_copy = 1
+DW_LNS_advance_pc = 2
+DW_LNS_advance_line = 3
+DW_LNS_set_file = 4
+DW_LNS_const_add_pc = 8
+DW_LNS_fixed_advance_pc = 9
+DW_LNE_end_sequence = 1
+DW_LNE_set_address = 2
+DW_LNE_define_file = 3
+
+DW_LNCT_path = 1
+DW_LNCT_directory_index = 2
+
+DW_RLE_end_of_list = 0
+DW_RLE_base_addressx = 1
+DW_RLE_startx_endx = 2
+DW_RLE_startx_length = 3
+DW_RLE_offset_pair = 4
+DW_RLE_base_address = 5
+DW_RLE_start_end = 6
+DW_RLE_start_length = 7
+
+UINT8 = struct.Struct('<B')
+UINT16 = struct.Struct('<H')
+UINT32 = struct.Struct('<I')
+UINT64 = struct.Struct('<Q')
+INT8 = struct.Struct('<b')
+
+
+# null-terminated string, without the terminator
+CSTRING_RE = re.compile(rb'[^\x00]*')
+
+
+def read_uleb128(data, pos):  # type: (Any, int) -> Tuple[int, int]
+    result = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def read_sleb128(data, pos):  # type: (Any, int) -> Tuple[int, int]
+    result = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            if byte & 0x40:
+                result -= 1 << shift
+            return result, pos
+
+
+def read_cstring(data, pos):  # type: (Any, int) -> Tuple[bytes, int]
+    # sections are memoryviews, which have no ``index``
+    end = CSTRING_RE.match(data, pos).end()  # type: ignore
+    if end >= len(data):
+        raise ValueError(f'Unterminated string at {pos:#x}')
+    return bytes(data[pos:end]), end + 1
+
+
+def read_uint(data, pos, size):  # type: (Any, int, int) -> int
+    if size == 4:
+        return UINT32.unpack_from(data, pos)[0]  # type: ignore
+    if size == 8:
+        return UINT64.unpack_from(data, pos)[0]  # type: ignore
+    return int.from_bytes(data[pos : pos + size], 'little')
+
+
+def read_initial_length(data, pos):  # type: (bytes, int) -> Tuple[int, int, int]
+    """
+    :return: unit length, size of offsets (4 for 32-bit DWARF, 8 for 64-bit DWARF) and position after the length
+    """
+    length = UINT32.unpack_from(data, pos)[0]
+    if length == 0xFFFFFFFF:
+        return UINT64.unpack_from(data, pos + 4)[0], 8, pos + 12
+    return length, 4, pos + 4
+
+
+def join_path(directory, name):  # type: (str, str) -> str
+    if not directory or name.startswith('/') or (len(name) > 1 and name[1] == ':'):
+        return name
+    return f'{directory.rstrip("/")}/{name}'
+
+
+class LineTable:
+    """
+    Address to source line rows of one compilation unit, sorted by address.
+    Each sequence of contiguous code ends with a row with ``END_SEQUENCE`` file index.
+    """
+
+    END_SEQUENCE = 0xFFFFFFFF
+    CACHE_MAGIC = b'ESPLINE1'
+    CACHE_HEADER = struct.Struct('<8sII')
+
+    def __init__(self):  # type: () -> None
+        self.addrs = array('I')
+        self.lines = array('I')
+        self.files = array('I')
+        self.file_names = []  # type: list[str]
+
+    def lookup(self, addr):  # type: (int) -> Optional[Tuple[str, int]]
+        i = bisect_right(self.addrs, addr) - 1
+        if i < 0 or self.files[i] == self.END_SEQUENCE:
+            return None
+        return self.file_names[self.files[i]], self.lines[i]
+
+    def __len__(self):  # type: () -> int
+        return len(self.addrs)
+
+    def to_bytes(self):  # type: () -> bytes
+        columns = [self.addrs, self.lines, self.files]
+        if sys.byteorder == 'big':
+            columns = [array('I', column) for column in columns]
+            for column in columns:
+                column.byteswap()
+        names = '\x00'.join(self.file_names).encode('utf-8', 'surrogateescape')
+        return zlib.compress(self.CACHE_HEADER.pack(self.CACHE_MAGIC, len(self), len(names)) + b''.join(c.tobytes() for c in columns) + names)
+
+    @classmethod
+    def from_bytes(cls, data):  # type: (bytes) -> LineTable
+        """
+        :raises ValueError: if the data are not a valid line table
+        """
+        try:
+            data = zlib.decompress(data)
+        except zlib.error as e:
+            raise ValueError(f'Invalid line table: {e}')
+        if len(data) < cls.CACHE_HEADER.size:
+            raise ValueError('Invalid line table')
+        magic, count, names_size = cls.CACHE_HEADER.unpack_from(data)
+        if magic != cls.CACHE_MAGIC or len(data) != cls.CACHE_HEADER.size + count * 12 + names_size:
+            raise ValueError('Invalid line table')
+        table = cls()
+        offset = cls.CACHE_HEADER.size
+        for column in (table.addrs, table.lines, table.files):
+            column.frombytes(data[offset : offset + count * 4])
+            if sys.byteorder == 'big':
+                column.byteswap()
+            offset += count * 4
+        table.file_names = data[offset:].decode('utf-8', 'surrogateescape').split('\x00') if names_size else []
+        return table
+
+
+class StructLayout:
+    """
+    Offsets and sizes of the members of a struct or union type. Bit fields are left out.
+    """
+
+    SIGNED = 'signed'
+    UNSIGNED = 'unsigned'
+    FLOAT = 'float'
+    POINTER = 'pointer'
+    ARRAY = 'array'
+    STRUCT = 'struct'
+    UNION = 'union'
+    OTHER = 'other'
+    # kinds decoded as integers
+    INTEGER_KINDS = (SIGNED, UNSIGNED, POINTER)
+
+    def __init__(self, name, size, members):  # type: (str, int, list[StructMember]) -> None
+        self.name = name
+        self.size = size
+        self.members = {member.name: member for member in members}
+
+    def __repr__(self):  # type: () -> str
+        return f'StructLayout({self.name!r}, {self.size}, {list(self.members.values())!r})'
+
+    def read(self, data, name, base=0):  # type: (bytes, str, int) -> Any
+        """
+        Value of the member in the data of the struct (which start at ``base`` offset of the struct).
+        Integers and pointers are decoded, other members are returned as bytes.
+        :raises KeyError: if there is no such member
+        """
+        member = self.members[name]
+        raw = data[member.offset - base : member.offset - base + member.size]
+        if member.kind in self.INTEGER_KINDS:
+            return int.from_bytes(raw, 'little', signed=member.kind == self.SIGNED)
+        return bytes(raw)
+
+    def to_dict(self):  # type: () -> dict[str, Any]
+        return {'name': self.name, 'size': self.size, 'members': [list(member) for member in self.members.values()]}
+
+    @classmethod
+    def from_dict(cls, value):  # type: (dict[str, Any]) -> StructLayout
+        return cls(value['name'], value['size'], [StructMember(*member) for member in value['members']])
+
+
+class Unit:
+    """
+    Compilation unit in .debug_info, its root DIE and the tables are read on demand
+    """
+
+    def __init__(self, offset, data):  # type: (int, bytes) -> None
+        self.offset = offset
+        length, self.offset_size, pos = read_initial_length(data, offset)
+        self.end = pos + length
+        self.version = UINT16.unpack_from(data, pos)[0]
+        pos += 2
+        if self.version >= 5:
+            self.unit_type = data[pos]
+            self.addr_size = data[pos + 1]
+            self.abbrev_offset = read_uint(data, pos + 2, self.offset_size)
+            pos += 2 + self.offset_size
+            # skeleton and split units have an 8 bytes id, type units an 8 bytes signature and an offset
+            if self.unit_type in (0x04, 0x05):
+                pos += 8
+            elif self.unit_type in (0x02, 0x06):
+                pos += 8 + self.offset_size
+        else:
+            self.unit_type = 0x01
+            self.abbrev_offset = read_uint(data, pos, self.offset_size)
+            self.addr_size = data[pos + self.offset_size]
+            pos += self.offset_size + 1
+        self.die_offset = pos
+        self.abbrevs = None  # type: Optional[dict[int, tuple[int, bool, list[tuple[int, int, int]]]]]
+        self.root = None  # type: Optional[dict[int, tuple[int, Any]]]
+        self.str_offsets_base = 8
+        self.addr_base = 8
+        self.rnglists_base = 0
+        self.low_pc = 0
+
+
+class DwarfInfo:
+    """
+    Decoder of .debug_line, .debug_aranges and .debug_info sections of an ELF file.
+
+    The compilation unit containing an address is found with .debug_aranges (or the ranges of the unit DIEs if it is missing),
+    then only the line program of that unit is decoded. Decoded line tables and struct layouts are kept in ``cache_dir`` if it is given.
+    """
+
+    def __init__(self, elf, cache_dir=None):  # type: (ElfFile, Optional[str]) -> None
+        self.cache_dir = cache_dir
+        self._sections = {}  # type: dict[str, Union[bytes, memoryview]]
+        self._elf = elf
+        self._units = None  # type: Optional[list[Unit]]
+        self._unit_offsets = []  # type: list[int]
+        # address ranges of the units, ``obj`` of the regions is the unit offset
+        self._aranges = None  # type: Optional[IntervalIndex]
+        self._line_tables = {}  # type: dict[int, Optional[LineTable]]
+        self._scopes = {}  # type: dict[int, list[tuple[list[tuple[int, int]], int, int, int, int, int]]]
+        # struct layouts by type name, None for types which are not found
+        self._layouts = None  # type: Optional[dict[str, Optional[StructLayout]]]
+
+    def _section(self, name):  # type: (str) -> Any
+        """
+        Data of the section, a view of the mapped file, compressed sections are decompressed by ``ElfFile.get_section``
+        """
+        data = self._sections.get(name)
+        if data is None:
+            section = self._elf.get_section(name)
+            data = self._sections[name] = section.data if section is not None else b''
+        return data
+
+    @property
+    def has_line_info(self):  # type: () -> bool
+        return bool(self._section('.debug_line'))
+
+    # Units
+
+    @property
+    def units(self):  # type: () -> list[Unit]
+        if self._units is None:
+            info = self._section('.debug_info')
+            self._units = []
+            pos = 0
+            while pos + 11 <= len(info):
+                unit = Unit(pos, info)
+                self._units.append(unit)
+                pos = unit.end
+            self._unit_offsets = [unit.offset for unit in self._units]
+        return self._units
+
+    def unit_at(self, offset):  # type: (int) -> Optional[Unit]
+        units = self.units
+        i = bisect_right(self._unit_offsets, offset) - 1
+        if i < 0 or offset >= units[i].end:
+            return None
+        return units[i]
+
+    def _abbrevs(self, unit):  # type: (Unit) -> dict[int, tuple[int, bool, list[tuple[int, int, int]]]]
+        if unit.abbrevs is None:
+            data = self._section('.debug_abbrev')
+            abbrevs = {}
+            pos = unit.abbrev_offset
+            while True:
+                code, pos = read_uleb128(data, pos)
+                if code == 0:
+                    break
+                tag, pos = read_uleb128(data, pos)
+                has_children = bool(data[pos])
+                pos += 1
+                attrs = []
+                while True:
+                    name, pos = read_uleb128(data, pos)
+                    form, pos = read_uleb128(data, pos)
+                    if name == 0 and form == 0:
+                        break
+                    const = 0
+                    if form == DW_FORM_implicit_const:
+                        const, pos = read_sleb128(data, pos)
+                    attrs.append((name, form, const))
+                abbrevs[code] = (tag, has_children, attrs)
+            unit.abbrevs = abbrevs
+        return unit.abbrevs
+
+    def _read_form(self, data, pos, form, unit, const=0):  # type: (bytes, int, int, Unit, int) -> Tuple[Any, int]
+        size = FIXED_FORM_SIZES.get(form)
+        if size is not None:
+            if form == DW_FORM_implicit_const:
+                return const, pos
+            if form == DW_FORM_flag_present:
+                return True, pos
+            return read_uint(data, pos, size), pos + size
+        if form in ULEB_FORMS:
+            return read_uleb128(data, pos)
+        if form in OFFSET_FORMS:
+            return read_uint(data, pos, unit.offset_size), pos + unit.offset_size
+        if form == DW_FORM_addr:
+            return read_uint(data, pos, unit.addr_size), pos + unit.addr_size
+        if form == DW_FORM_string:
+            return read_cstring(data, pos)
+        if form == DW_FORM_sdata:
+            return read_sleb128(data, pos)
+        if form == DW_FORM_ref_addr:
+            size = unit.addr_size if unit.version <= 2 else unit.offset_size
+            return read_uint(data, pos, size), pos + size
+        if form in (DW_FORM_block, DW_FORM_exprloc):
+            length, pos = read_uleb128(data, pos)
+            return data[pos : pos + length], pos + length
+        if form in (DW_FORM_block1, DW_FORM_block2, DW_FORM_block4):
+            size = {DW_FORM_block1: 1, DW_FORM_block2: 2, DW_FORM_block4: 4}[form]
+            length = read_uint(data, pos, size)
+            pos += size
+            return data[pos : pos + length], pos + length
+        if form == DW_FORM_indirect:
+            form, pos = read_uleb128(data, pos)
+            value, pos = self._read_form(data, pos, form, unit)
+            return value, pos
+        raise ValueError(f'Unsupported DWARF form 0x{form:x}')
+
+    def _read_die(self, unit, pos):  # type: (Unit, int) -> Tuple[int, bool, dict[int, tuple[int, Any]], int]
+        """
+        :return: tag (0 for a null entry), has children, attributes by name as (form, value) and position of the next DIE
+        """
+        data = self._section('.debug_info')
+        code, pos = read_uleb128(data, pos)
+        if code == 0:
+            return 0, False, {}, pos
+        tag, has_children, attr_specs = self._abbrevs(unit)[code]
+        attrs = {}
+        for name, form, const in attr_specs:
+            value, pos = self._read_form(data, pos, form, unit, const)
+            attrs[name] = (form, value)
+        return tag, has_children, attrs, pos
+
+    def _root(self, unit):  # type: (Unit) -> dict[int, tuple[int, Any]]
+        if unit.root is None:
+            _, _, unit.root, _ = self._read_die(unit, unit.die_offset)
+            unit.str_offsets_base = unit.root.get(DW_AT_str_offsets_base, (0, 8))[1]
+            unit.addr_base = unit.root.get(DW_AT_addr_base, (0, 8))[1]
+            unit.rnglists_base = unit.root.get(DW_AT_rnglists_base, (0, 0))[1]
+            if DW_AT_low_pc in unit.root:
+                unit.low_pc = self._address(unit, *unit.root[DW_AT_low_pc])
+        return unit.root
+
+    # Attribute values
+
+    def _string(self, unit, form, value):  # type: (Unit, int, Any) -> str
+        if form == DW_FORM_string:
+            raw = value
+        elif form == DW_FORM_line_strp:
+            raw, _ = read_cstring(self._section('.debug_line_str'), value)
+        elif form in STRX_FORMS:
+            offset = read_uint(self._section('.debug_str_offsets'), unit.str_offsets_base + value * unit.offset_size, unit.offset_size)
+            raw, _ = read_cstring(self._section('.debug_str'), offset)
+        elif form == DW_FORM_strp:
+            raw, _ = read_cstring(self._section('.debug_str'), value)
+        else:
+            return ''
+        return raw.decode('utf-8', 'surrogateescape')  # type: ignore
+
+    def _address(self, unit, form, value):  # type: (Unit, int, Any) -> int
+        if form in ADDRX_FORMS:
+            return read_uint(self._section('.debug_addr'), unit.addr_base + value * unit.addr_size, unit.addr_size)
+        return value  # type: ignore
+
+    @staticmethod
+    def _ref(unit, form, value):  # type: (Unit, int, int) -> int
+        """
+        .debug_info offset of a referenced DIE
+        """
+        return unit.offset + value if form in CU_REF_FORMS else value
+
+    def _ranges(self, unit, attrs):  # type: (Unit, dict[int, tuple[int, Any]]) -> list[tuple[int, int]]
+        """
+        Address ranges [start, end) of a DIE
+        """
+        if DW_AT_low_pc in attrs and DW_AT_high_pc in attrs:
+            low = self._address(unit, *attrs[DW_AT_low_pc])
+            form, high = attrs[DW_AT_high_pc]
+            if form != DW_FORM_addr and form not in ADDRX_FORMS:
+                high += low
+            else:
+                high = self._address(unit, form, high)
+            return [(low, high)]
+        if DW_AT_ranges not in attrs:
+            return []
+        form, offset = attrs[DW_AT_ranges]
+        if unit.version < 5:
+            return self._debug_ranges(unit, offset)
+        if form == DW_FORM_rnglistx:
+            base = unit.rnglists_base
+            offset = base + read_uint(self._section('.debug_rnglists'), base + offset * unit.offset_size, unit.offset_size)
+        return self._debug_rnglists(unit, offset)
+
+    def _debug_ranges(self, unit, offset):  # type: (Unit, int) -> list[tuple[int, int]]
+        data = self._section('.debug_ranges')
+        size = unit.addr_size
+        base_selection = (1 << (8 * size)) - 1
+        base = unit.low_pc
+        ranges = []
+        while offset + 2 * size <= len(data):
+            start = read_uint(data, offset, size)
+            end = read_uint(data, offset + size, size)
+            offset += 2 * size
+            if start == 0 and end == 0:
+                break
+            if start == base_selection:
+                base = end
+            elif start != end:
+                ranges.append((base + start, base + end))
+        return ranges
+
+    def _debug_rnglists(self, unit, offset):  # type: (Unit, int) -> list[tuple[int, int]]
+        data = self._section('.debug_rnglists')
+        size = unit.addr_size
+        base = unit.low_pc
+        ranges = []
+        while offset < len(data):
+            kind = data[offset]
+            offset += 1
+            if kind == DW_RLE_end_of_list:
+                break
+            if kind == DW_RLE_base_addressx:
+                index, offset = read_uleb128(data, offset)
+                base = self._address(unit, DW_FORM_addrx, index)
+                continue
+            if kind == DW_RLE_base_address:
+                base = read_uint(data, offset, size)
+                offset += size
+                continue
+            if kind == DW_RLE_startx_endx:
+                start, offset = read_uleb128(data, offset)
+                end, offset = read_uleb128(data, offset)
+                start, end = self._address(unit, DW_FORM_addrx, start), self._address(unit, DW_FORM_addrx, end)
+            elif kind == DW_RLE_startx_length:
+                start, offset = read_uleb128(data, offset)
+                length, offset = read_uleb128(data, offset)
+                start = self._address(unit, DW_FORM_addrx, start)
+                end = start + length
+            elif kind == DW_RLE_offset_pair:
+                start, offset = read_uleb128(data, offset)
+                end, offset = read_uleb128(data, offset)
+                start, end = base + start, base + end
+            elif kind == DW_RLE_start_end:
+                start, end = read_uint(data, offset, size), read_uint(data, offset + size, size)
+                offset += 2 * size
+            elif kind == DW_RLE_start_length:
+                start = read_uint(data, offset, size)
+                length, offset = read_uleb128(data, offset + size)
+                end = start + length
+            else:
+                raise ValueError(f'Unsupported range list entry 0x{kind:x}')
+            if start != end:
+                ranges.append((start, end))
+        return ranges
+
+    # Address to unit
+
+    def _unit_index(self):  # type: () -> IntervalIndex
+        if self._aranges is None:
+            regions = []
+            data = self._section('.debug_aranges')
+            pos = 0
+            while pos + 12 <= len(data):
+                length, offset_size, header_pos = read_initial_length(data, pos)
+                end = header_pos + length
+                info_offset = read_uint(data, header_pos + 2, offset_size)
+                addr_size = data[header_pos + 2 + offset_size]
+                # tuples are aligned to their size from the start of the set
+                tuple_pos = header_pos + 2 + offset_size + 2
+                tuple_pos += -(tuple_pos - pos) % (2 * addr_size)
+                while tuple_pos + 2 * addr_size <= end:
+                    start = read_uint(data, tuple_pos, addr_size)
+                    size = read_uint(data, tuple_pos + addr_size, addr_size)
+                    tuple_pos += 2 * addr_size
+                    # the terminating (0, 0) tuple is not reliable, sections removed by the linker leave such tuples in the middle
+                    if size:
+                        regions.append(Region(start, start + size, 'unit', '', info_offset))
+                pos = end
+            # units missing in .debug_aranges (e.g. from assembler sources) are added with the ranges of their root DIE
+            covered = {region.obj for region in regions}
+            for unit in self.units:
+                if unit.offset not in covered:
+                    regions += [Region(start, end, 'unit', '', unit.offset) for start, end in self._ranges(unit, self._root(unit))]
+            # code removed by the linker remains at address 0
+            self._aranges = IntervalIndex([region for region in regions if region.start])
+        return self._aranges
+
+    def find_unit(self, addr):  # type: (int) -> Optional[Unit]
+        regions = self._unit_index().find(addr)
+        return self.unit_at(regions[-1].obj) if regions else None
+
+    # Line programs
+
+    def line_table(self, unit):  # type: (Unit) -> Optional[LineTable]
+        root = self._root(unit)
+        if DW_AT_stmt_list not in root:
+            return None
+        offset = root[DW_AT_stmt_list][1]
+        if offset in self._line_tables:
+            return self._line_tables[offset]
+        table = self._load_cached_line_table(offset)
+        if table is None:
+            comp_dir = self._string(unit, *root[DW_AT_comp_dir]) if DW_AT_comp_dir in root else ''
+            name = self._string(unit, *root[DW_AT_name]) if DW_AT_name in root else ''
+            table = self._decode_line_program(offset, comp_dir, name)
+            self._store_cached_line_table(offset, table)
+        self._line_tables[offset] = table
+        return table
+
+    def _cache_path(self, offset):  # type: (int) -> Optional[str]
+        return os.path.join(self.cache_dir, f'{offset:x}.lines') if self.cache_dir else None
+
+    def _load_cached_line_table(self, offset):  # type: (int) -> Optional[LineTable]
+        path = self._cache_path(offset)
+        if not path:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return LineTable.from_bytes(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def _store_cached_line_table(self, offset, table):  # type: (int, LineTable) -> None
+        path = self._cache_path(offset)
+        if path:
+            self._write_cache_file(path, table.to_bytes())
+
+    @staticmethod
+    def _write_cache_file(path, data):  # type: (str, bytes) -> None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), delete=False) as f:
+                f.write(data)
+            os.replace(f.name, path)
+        except OSError as e:
+            logging.debug(f'Failed to store "{path}": {e}')
+
+    def _read_entry_formats(self, data, pos):  # type: (bytes, int) -> Tuple[list[tuple[int, int]], int]
+        count = data[pos]
+        pos += 1
+        formats = []
+        for _ in range(count):
+            content_type, pos = read_uleb128(data, pos)
+            form, pos = read_uleb128(data, pos)
+            formats.append((content_type, form))
+        return formats, pos
+
+    def _read_entries(self, data, pos, formats, unit):  # type: (bytes, int, list[tuple[int, int]], Unit) -> Tuple[list[tuple[str, int]], int]
+        """
+        Directory or file name entries of DWARF 5 line program header, as (path, directory index)
+        """
+        count, pos = read_uleb128(data, pos)
+        entries = []
+        for _ in range(count):
+            path = ''
+            dir_index = 0
+            for content_type, form in formats:
+                value, pos = self._read_form(data, pos, form, unit)
+                if content_type == DW_LNCT_path:
+                    path = self._string(unit, form, value)
+                elif content_type == DW_LNCT_directory_index:
+                    dir_index = value
+            entries.append((path, dir_index))
+        return entries, pos
+
+    def _decode_line_program(self, offset, comp_dir, cu_name):  # type: (int, str, str) -> LineTable
+        data = self._section('.debug_line')
+        length, offset_size, pos = read_initial_length(data, offset)
+        end = pos + length
+        version = UINT16.unpack_from(data, pos)[0]
+        pos += 2
+        # unit-like context for reading the forms of DWARF 5 header entries
+        unit = Unit.__new__(Unit)
+        unit.offset_size = offset_size
+        unit.version = version
+        unit.addr_size = 4
+        if version >= 5:
+            unit.addr_size = data[pos]
+            pos += 2
+        header_length = read_uint(data, pos, offset_size)
+        pos += offset_size
+        program_start = pos + header_length
+        min_inst_length = data[pos]
+        pos += 1
+        if version >= 4:
+            pos += 1  # maximum_operations_per_instruction, VLIW is not used
+        # default_is_stmt at pos is not needed, all rows are kept
+        line_base = INT8.unpack_from(data, pos + 1)[0]
+        line_range = data[pos + 2]
+        opcode_base = data[pos + 3]
+        std_opcode_lengths = list(data[pos + 4 : pos + 4 + opcode_base - 1])
+        pos += 4 + opcode_base - 1
+
+        file_names = []  # type: list[str]
+        if version >= 5:
+            dir_formats, pos = self._read_entry_formats(data, pos)
+            directories, pos = self._read_entries(data, pos, dir_formats, unit)
+            file_formats, pos = self._read_entry_formats(data, pos)
+            files, pos = self._read_entries(data, pos, file_formats, unit)
+            dirs = [path for path, _ in directories]
+            if dirs and not dirs[0]:
+                dirs[0] = comp_dir
+            elif dirs and comp_dir:
+                dirs[0] = join_path(comp_dir, dirs[0])
+            for path, dir_index in files:
+                file_names.append(join_path(dirs[dir_index] if dir_index < len(dirs) else '', path))
+        else:
+            dirs = [comp_dir]
+            while data[pos]:
+                directory, pos = read_cstring(data, pos)
+                dirs.append(join_path(comp_dir, directory.decode('utf-8', 'surrogateescape')))
+            pos += 1
+            # file indexes start at 1, index 0 is the unit itself
+            file_names.append(join_path(comp_dir, cu_name))
+            while data[pos]:
+                name, pos = read_cstring(data, pos)
+                dir_index, pos = read_uleb128(data, pos)
+                _, pos = read_uleb128(data, pos)
+                _, pos = read_uleb128(data, pos)
+                file_names.append(join_path(dirs[dir_index] if dir_index < len(dirs) else '', name.decode('utf-8', 'surrogateescape')))
+
+        # sequences of (address, file, line) rows, the last row of each is the end address
+        sequences = []  # type: list[list[tuple[int, int, int]]]
+        rows = []  # type: list[tuple[int, int, int]]
+        pos = program_start
+        address, file, line = 0, 1, 1
+        while pos < end:
+            opcode = data[pos]
+            pos += 1
+            if opcode >= opcode_base:
+                adjusted = opcode - opcode_base
+                address += (adjusted // line_range) * min_inst_length
+                line += line_base + adjusted % line_range
+                rows.append((address, file, line))
+            elif opcode == 0:
+                length, pos = read_uleb128(data, pos)
+                sub_opcode = data[pos]
+                if sub_opcode == DW_LNE_end_sequence:
+                    rows.append((address, LineTable.END_SEQUENCE, 0))
+                    sequences.append(rows)
+                    rows = []
+                    address, file, line = 0, 1, 1
+                elif sub_opcode == DW_LNE_set_address:
+                    address = read_uint(data, pos + 1, length - 1)
+                elif sub_opcode == DW_LNE_define_file:
+                    name, _ = read_cstring(data, pos + 1)
+                    file_names.append(name.decode('utf-8', 'surrogateescape'))
+                pos += length
+            elif opcode == DW_LNS_copy:
+                rows.append((address, file, line))
+            elif opcode == DW_LNS_advance_pc:
+                value, pos = read_uleb128(data, pos)
+                address += value * min_inst_length
+            elif opcode == DW_LNS_advance_line:
+                value, pos = read_sleb128(data, pos)
+                line += value
+            elif opcode == DW_LNS_set_file:
+                file, pos = read_uleb128(data, pos)
+            elif opcode == DW_LNS_const_add_pc:
+                address += ((255 - opcode_base) // line_range) * min_inst_length
+            elif opcode == DW_LNS_fixed_advance_pc:
+                address += UINT16.unpack_from(data, pos)[0]
+                pos += 2
+            else:
+                # other standard opcodes only change the registers not kept in the table, skip their operands
+                for _ in range(std_opcode_lengths[opcode - 1]):
+                    _, pos = read_uleb128(data, pos)
+
+        table = LineTable()
+        table.file_names = file_names
+        # code removed by the linker remains at address 0
+        sequences = sorted((seq for seq in sequences if seq[0][0] != 0), key=lambda seq: seq[0][0])
+        for seq in sequences:
+            for address, file, line in seq:
+                if file != LineTable.END_SEQUENCE and file >= len(file_names):
+                    file = len(file_names)
+                    file_names.append('??')
+                table.addrs.append(address)
+                table.files.append(file)
+                table.lines.append(line)
+        return table
+
+    # Scopes
+
+    def _unit_scopes(self, unit):  # type: (Unit) -> list[tuple[list[tuple[int, int]], int, int, int, int, int]]
+        """
+        Functions and inlined functions of the unit with code, as (ranges, tag, DIE offset, call file, call line, parent scope index)
+        """
+        scopes = self._scopes.get(unit.offset)
+        if scopes is not None:
+            return scopes
+        self._root(unit)
+        scopes = []
+        # (depth, scope index) of the enclosing scopes
+        stack = []  # type: list[tuple[int, int]]
+        depth = 0
+        pos = unit.die_offset
+        while pos < unit.end:
+            die_offset = pos
+            tag, has_children, attrs, pos = self._read_die(unit, pos)
+            if tag == 0:
+                depth -= 1
+                while stack and stack[-1][0] > depth:
+                    stack.pop()
+                if depth <= 0:
+                    break
+                continue
+            if tag in (DW_TAG_subprogram, DW_TAG_inlined_subroutine):
+                ranges = self._ranges(unit, attrs)
+                if ranges:
+                    call_file = attrs.get(DW_AT_call_file, (0, 0))[1]
+                    call_line = attrs.get(DW_AT_call_line, (0, 0))[1]
+                    scopes.append((ranges, tag, die_offset, call_file, call_line, stack[-1][1] if stack else -1))
+                    if has_children:
+                        stack.append((depth + 1, len(scopes) - 1))
+            if has_children:
+                depth += 1
+        self._scopes[unit.offset] = scopes
+        return scopes
+
+    def _names(self, offset, max_depth=8):  # type: (int, int) -> Tuple[Optional[str], Optional[str]]
+        """
+        Linkage name and name of the DIE at .debug_info offset, following the abstract origin and specification references
+        """
+        unit = self.unit_at(offset)
+        if unit is None or max_depth == 0:
+            return None, None
+        self._root(unit)
+        _, _, attrs, _ = self._read_die(unit, offset)
+        linkage_name = name = None
+        for attr in (DW_AT_linkage_name, DW_AT_MIPS_linkage_name):
+            if attr in attrs:
+                linkage_name = self._string(unit, *attrs[attr])
+                break
+        if DW_AT_name in attrs:
+            name = self._string(unit, *attrs[DW_AT_name])
+        for attr in (DW_AT_abstract_origin, DW_AT_specification):
+            if linkage_name is not None:
+                break
+            if attr in attrs:
+                ref_linkage_name, ref_name = self._names(self._ref(unit, *attrs[attr]), max_depth - 1)
+                linkage_name = ref_linkage_name
+                name = name or ref_name
+        return linkage_name, name
+
+    def function_name(self, offset):  # type: (int) -> Optional[str]
+        """
+        Name of the function DIE at .debug_info offset, the linkage (mangled) name is preferred like by addr2line
+        """
+        linkage_name, name = self._names(offset)
+        return linkage_name or name
+
+    # Types
+
+    def _skip_children(self, unit, pos, attrs):  # type: (Unit, int, dict[int, tuple[int, Any]]) -> int
+        """
+        Position after the children of a DIE, which starts at ``pos``
+        """
+        if DW_AT_sibling in attrs:
+            return self._ref(unit, *attrs[DW_AT_sibling])
+        depth = 1
+        while depth and pos < unit.end:
+            tag, has_children, _, pos = self._read_die(unit, pos)
+            depth += 1 if has_children else -1 if tag == 0 else 0
+        return pos
+
+    def _type_info(self, offset, max_depth=16):  # type: (int, int) -> Tuple[str, str, int]
+        """
+        Name, kind (one of the ``StructLayout`` kinds) and size of the type DIE at .debug_info offset
+        """
+        unit = self.unit_at(offset)
+        if unit is None or max_depth == 0:
+            return '?', StructLayout.OTHER, 0
+        self._root(unit)
+        tag, has_children, attrs, pos = self._read_die(unit, offset)
+        name = self._string(unit, *attrs[DW_AT_name]) if DW_AT_name in attrs else ''
+        size = attrs.get(DW_AT_byte_size, (0, 0))[1]
+        if DW_AT_type in attrs:
+            target_name, target_kind, target_size = self._type_info(self._ref(unit, *attrs[DW_AT_type]), max_depth - 1)
+        else:
+            target_name, target_kind, target_size = 'void', StructLayout.OTHER, 0
+        if tag == DW_TAG_base_type:
+            encoding = attrs.get(DW_AT_encoding, (0, 0))[1]
+            if encoding in (DW_ATE_signed, DW_ATE_signed_char):
+                return name, StructLayout.SIGNED, size
+            return name, StructLayout.FLOAT if encoding == DW_ATE_float else StructLayout.UNSIGNED, size
+        if tag == DW_TAG_pointer_type:
+            return f'{target_name} *', StructLayout.POINTER, size or unit.addr_size
+        if tag == DW_TAG_typedef:
+            return name, target_kind, target_size
+        if tag in QUALIFIER_TAGS:
+            # qualifiers of arrays are repeated on their elements
+            qualified_name = target_name if target_name.startswith(QUALIFIER_TAGS[tag] + ' ') else f'{QUALIFIER_TAGS[tag]} {target_name}'
+            return qualified_name, target_kind, target_size
+        if tag in COMPOSITE_TAGS:
+            if tag == DW_TAG_enumeration_type:
+                kind = target_kind if DW_AT_type in attrs else StructLayout.UNSIGNED
+            else:
+                kind = StructLayout.STRUCT if tag == DW_TAG_structure_type else StructLayout.UNION
+            return f'{COMPOSITE_TAGS[tag]} {name}'.rstrip(), kind, size
+        if tag == DW_TAG_array_type:
+            dims = []
+            while has_children and pos < unit.end:
+                child_tag, child_has_children, child_attrs, pos = self._read_die(unit, pos)
+                if child_tag == 0:
+                    break
+                if child_tag == DW_TAG_subrange_type:
+                    if DW_AT_count in child_attrs:
+                        dims.append(child_attrs[DW_AT_count][1])
+                    elif DW_AT_upper_bound in child_attrs:
+                        dims.append(child_attrs[DW_AT_upper_bound][1] + 1)
+                    else:  # flexible array member
+                        dims.append(0)
+                if child_has_children:
+                    pos = self._skip_children(unit, pos, child_attrs)
+            count = 1
+            for dim in dims:
+                count *= dim
+            return target_name + ' ' + ''.join(f'[{dim}]' for dim in dims), StructLayout.ARRAY, size or count * target_size
+        if tag == DW_TAG_subroutine_type:
+            return 'function', StructLayout.OTHER, 0
+        return name or '?', StructLayout.OTHER, size
+
+    def _struct_layout(self, name, offset, max_depth=16):  # type: (str, int, int) -> Optional[StructLayout]
+        """
+        Layout of the struct or union DIE at .debug_info offset, typedefs are followed to the type they name.
+        None for other types and for declarations of incomplete types.
+        """
+        unit = self.unit_at(offset)
+        if unit is None or max_depth == 0:
+            return None
+        self._root(unit)
+        tag, has_children, attrs, pos = self._read_die(unit, offset)
+        if tag in QUALIFIER_TAGS or tag == DW_TAG_typedef:
+            return self._struct_layout(name, self._ref(unit, *attrs[DW_AT_type]), max_depth - 1) if DW_AT_type in attrs else None
+        if tag not in (DW_TAG_structure_type, DW_TAG_union_type) or DW_AT_declaration in attrs:
+            return None
+        members = []
+        while has_children and pos < unit.end:
+            child_tag, child_has_children, child_attrs, pos = self._read_die(unit, pos)
+            if child_tag == 0:
+                break
+            if child_has_children:
+                pos = self._skip_children(unit, pos, child_attrs)
+            if child_tag != DW_TAG_member or DW_AT_type not in child_attrs or DW_AT_bit_size in child_attrs:
+                continue
+            form, location = child_attrs.get(DW_AT_data_member_location, (DW_FORM_data1, 0))
+            if form in BLOCK_FORMS:
+                # DWARF 2 location expression of the member
+                if not location or location[0] != DW_OP_plus_uconst:
+                    continue
+                location, _ = read_uleb128(location, 1)
+            member_name = self._string(unit, *child_attrs[DW_AT_name]) if DW_AT_name in child_attrs else ''
+            type_name, kind, size = self._type_info(self._ref(unit, *child_attrs[DW_AT_type]))
+            members.append(StructMember(member_name, location, size, type_name, kind))
+        return StructLayout(name, attrs.get(DW_AT_byte_size, (0, 0))[1], members)
+
+    def _find_struct_layouts(self, names):  # type: (set[str]) -> dict[str, StructLayout]
+        """
+        Layouts of the struct and union types (or typedefs of them) with the names, the first complete definition wins.
+        Only the top level DIEs of the units are read, their children are skipped over by the sibling references.
+        """
+        layouts = {}  # type: dict[str, StructLayout]
+        wanted = set(names)
+        for unit in self.units:
+            if not wanted:
+                break
+            self._root(unit)
+            _, has_children, _, pos = self._read_die(unit, unit.die_offset)
+            while has_children and pos < unit.end:
+                die_offset = pos
+                tag, die_has_children, attrs, pos = self._read_die(unit, pos)
+                if tag == 0:
+                    break
+                if die_has_children:
+                    pos = self._skip_children(unit, pos, attrs)
+                if tag not in (DW_TAG_typedef, DW_TAG_structure_type, DW_TAG_union_type) or DW_AT_name not in attrs or DW_AT_declaration in attrs:
+                    continue
+                name = self._string(unit, *attrs[DW_AT_name])
+                if name in wanted:
+                    layout = self._struct_layout(name, die_offset)
+                    if layout is not None:
+                        layouts[name] = layout
+                        wanted.discard(name)
+        return layouts
+
+    def struct_layouts(self, names):  # type: (Iterable[str]) -> dict[str, Optional[StructLayout]]
+        """
+        Layouts of struct and union types by their name (a typedef name or a struct tag), None for types which are not found.
+        All units are searched once for the types which are not in ``cache_dir`` yet, the results are stored there.
+        """
+        names = list(names)
+        if self._layouts is None:
+            self._layouts = self._load_cached_layouts()
+        missing = {name for name in names if name not in self._layouts}
+        if missing:
+            found = self._find_struct_layouts(missing)
+            for name in missing:
+                self._layouts[name] = found.get(name)
+            if self.cache_dir:
+                layouts = {name: layout.to_dict() if layout else None for name, layout in self._layouts.items()}
+                self._write_cache_file(os.path.join(self.cache_dir, 'layouts.json'), json.dumps(layouts, sort_keys=True).encode())
+        return {name: self._layouts[name] for name in names}
+
+    def _load_cached_layouts(self):  # type: () -> dict[str, Optional[StructLayout]]
+        if not self.cache_dir:
+            return {}
+        try:
+            with open(os.path.join(self.cache_dir, 'layouts.json')) as f:
+                return {name: StructLayout.from_dict(value) if value else None for name, value in json.load(f).items()}
+        except (OSError, ValueError, KeyError, TypeError):
+            return {}
+
+    # Lookup
+
+    def lookup(self, addr):  # type: (int) -> list[SourceLocation]
+        """
+        Source locations of the address, the innermost inlined function first and the function with the code last.
+        Empty if there is no line information for the address.
+        """
+        unit = self.find_unit(addr)
+        if unit is None:
+            return []
+        table = self.line_table(unit)
+        location = table.lookup(addr) if table else None
+        if location is None:
+            return []
+        scopes = self._unit_scopes(unit)
+        # the innermost scope containing the address, the scopes of a parent precede its children
+        innermost = -1
+        for i, scope in enumerate(scopes):
+            if any(start <= addr < end for start, end in scope[0]):
+                innermost = i
+        if innermost < 0:
+            return [SourceLocation(None, *location)]
+        locations = []
+        file, line = location
+        i = innermost
+        while i >= 0:
+            ranges, tag, die_offset, call_file, call_line, parent = scopes[i]
+            locations.append(SourceLocation(self.function_name(die_offset), file, line))
+            if tag != DW_TAG_inlined_subroutine:
+                break
+            file = table.file_names[call_file] if table and call_file < len(table.file_names) else '??'  # type: ignore
+            line = call_line
+            i = parent
+        return locations
+
+
+def get_dwarf_info(elf_path):  # type: (str) -> DwarfInfo
+    """
+    Debug information of the ELF file, decoded line tables and struct layouts are stored in ``get_elf_cache_dir()``.
+    It is kept with the ELF file in the ELF file cache, so it is dropped with it and decoded again for a modified file.
+    """
+    elf = get_elf_file(elf_path)  # type: ElfFile
+    cache_root = get_cache_dir()
+    dwarf_info = elf._dwarf_infos.get(cache_root)
+    if dwarf_info is None:
+        dwarf_info = elf._dwarf_infos[cache_root] = DwarfInfo(elf, get_elf_cache_dir('dwarf', elf_path))
+    return dwarf_info
+
+
+def format_source_locations(locations):  # type: (list[SourceLocation]) -> str
+    """
+    ``function at file:line`` of each location, inlined functions are followed by their callers
+    """
+    lines = []  # type: list[str]
+    for loc in locations:
+        prefix = '    (inlined by) ' if lines else ''
+        lines.append(f'{prefix}{loc.function or "??"} at {loc.file}:{loc.line}')
+    return '\n'.join(lines)
@@ -5,106 +5,43 @@
 #
 
 import hashlib
+import logging
+import mmap
 import os
-from typing import Optional  # noqa: F401
-
-from construct import (
-    AlignedStruct,
-    Bytes,
-    Const,
-    Container,  # noqa: F401
-    GreedyRange,
-    Int16ul,
-    Int32ul,
-    Padding,
-    Pointer,
-    Sequence,
-    Struct,
-    this,
+import sys
+import zlib
+from array import array
+from typing import Any, BinaryIO, Iterator, Optional, Union  # noqa: F401
+
+from .codec import (
+    ELF_IDENT,
+    CompressionHeader,
+    ElfHeader,
+    EspTaskStatus,
+    Note,  # noqa: F401
+    ProgramHeader,
+    SectionHeader,
+    iter_notes,
 )
 
-# Following structs are based on spec
-# https://refspecs.linuxfoundation.org/elf/elf.pdf
-# and source code
-# IDF_PATH/components/espcoredump/include_core_dump/elf.h
-
-ElfIdentification = Struct(
-    'EI_MAG' / Const(b'\x7fELF'),
-    'EI_CLASS' / Const(b'\x01'),  # ELFCLASS32
-    'EI_DATA' / Const(b'\x01'),  # ELFDATA2LSB
-    'EI_VERSION' / Const(b'\x01'),  # EV_CURRENT
-    Padding(9),
-)
-
-ElfHeader = Struct(
-    'e_ident' / ElfIdentification,
-    'e_type' / Int16ul,
-    'e_machine' / Int16ul,
-    'e_version' / Int32ul,
-    'e_entry' / Int32ul,
-    'e_phoff' / Int32ul,
-    'e_shoff' / Int32ul,
-    'e_flags' / Int32ul,
-    'e_ehsize' / Int16ul,
-    'e_phentsize' / Int16ul,
-    'e_phnum' / Int16ul,
-    'e_shentsize' / Int16ul,
-    'e_shnum' / Int16ul,
-    'e_shstrndx' / Int16ul,
-)
-
-SectionHeader = Struct(
-    'sh_name' / Int32ul,
-    'sh_type' / Int32ul,
-    'sh_flags' / Int32ul,
-    'sh_addr' / Int32ul,
-    'sh_offset' / Int32ul,
-    'sh_size' / Int32ul,
-    'sh_link' / Int32ul,
-    'sh_info' / Int32ul,
-    'sh_addralign' / Int32ul,
-    'sh_entsize' / Int32ul,
-)
-
-ProgramHeader = Struct(
-    'p_type' / Int32ul,
-    'p_offset' / Int32ul,
-    'p_vaddr' / Int32ul,
-    'p_paddr' / Int32ul,
-    'p_filesz' / Int32ul,
-    'p_memsz' / Int32ul,
-    'p_flags' / Int32ul,
-    'p_align' / Int32ul,
-)
-
-ElfHeaderTables = Struct(
-    'elf_header' / ElfHeader,
-    'program_headers' / Pointer(this.elf_header.e_phoff, ProgramHeader[this.elf_header.e_phnum]),
-    'section_headers' / Pointer(this.elf_header.e_shoff, SectionHeader[this.elf_header.e_shnum]),
-)
-
-NoteSection = AlignedStruct(
-    4,
-    'namesz' / Int32ul,
-    'descsz' / Int32ul,
-    'type' / Int32ul,
-    'name' / Bytes(this.namesz),
-    'desc' / Bytes(this.descsz),
-)
-
-NoteSections = GreedyRange(NoteSection)
-
 
 class ElfFile:
     """
     Elf class to a single elf file
+
+    Only the ELF, program and section headers are parsed when the file is read. The file is mapped into memory,
+    section and segment data are ``memoryview`` slices of it, which are created on first access.
+    The mapping is released with ``close`` (or at the end of a ``with`` block), the data must not be used after it.
     """
 
     SHN_UNDEF = 0x00
+    SHT_NULL = 0x00
     SHT_PROGBITS = 0x01
     SHT_STRTAB = 0x03
     SHT_NOBITS = 0x08
 
+    ELFCOMPRESS_ZLIB = 0x01
+
     PT_LOAD = 0x01
     PT_NOTE = 0x04
 
@@ -117,52 +54,156 @@ class ElfFile:
         self.e_type = e_type
         self.e_machine = e_machine
 
-        self._struct = None  # type: Optional[Struct]
-        self._model = None  # type: Optional[Container]
-
         self.sections = []  # type: list[ElfSection]
         self.load_segments = []  # type: list[ElfSegment]
         self.note_segments = []  # type: list[ElfNoteSegment]
 
-        self.sha256 = b''  # type: bytes
+        self._elf_data = None  # type: Optional[Union[bytes, memoryview]]
+        self._elf_map = None  # type: Optional[mmap.mmap]
+        self._sha256 = None  # type: Optional[bytes]
+        # all sections by name, including the ones without address, see ``get_section``
+        self._section_headers = {}  # type: dict[str, Any]
+        self._sections_by_name = {}  # type: dict[str, ElfSection]
+        # decoded debug information by the cache directory, it lives as long as this object, see ``get_dwarf_info``
+        self._dwarf_infos = {}  # type: dict[str, Any]
 
         if elf_path and os.path.isfile(elf_path):
             self.read_elf(elf_path)
 
+    def __enter__(self):  # type: () -> ElfFile
+        return self
+
+    def __exit__(self, *_):  # type: (Any) -> None
+        self.close()
+
+    def close(self):  # type: () -> None
+        """
+        Release the section and segment data sliced from the file and unmap the file
+        """
+        for item in self.sections + self.load_segments + self.note_segments + list(self._sections_by_name.values()):  # type: ignore
+            item.release()
+        if isinstance(self._elf_data, memoryview):
+            self._elf_data.release()
+        self._elf_data = None
+        if self._elf_map is not None:
+            try:
+                self._elf_map.close()
+            except BufferError:
+                # a slice of the data is still referenced outside, the file is unmapped when it is released
+                logging.debug('ELF file is still referenced, it is not unmapped now')
+            self._elf_map = None
+
+    @property
+    def sha256(self):  # type: () -> bytes
+        """
+        SHA256 of the input bytes, calculated on first access
+        (note: may differ from sha256 of any generated output struct, as the ELF parser may change some details)
+        """
+        if self._sha256 is None:
+            self._sha256 = hashlib.sha256(self._elf_data).digest() if self._elf_data is not None else b''
+        return self._sha256
+
+    @sha256.setter
+    def sha256(self, value):  # type: (bytes) -> None
+        self._sha256 = value
+
     def read_elf(self, elf_path):  # type: (str) -> None
         """
-        Read elf file, also write to ``self.model``, ``self.program_headers``,
-        ``self.section_headers``
-        :param elf_path: elf file path
+        Read elf file headers, section and segment data are read on demand
+        :param elf_path: elf file path, the file may be compressed (gzip, xz, bz2 or zstd)
         :return: None
         """
+        from .streams import is_compressed_file, open_decompressed  # the package imports this module first
+
+        if is_compressed_file(elf_path):
+            with open_decompressed(elf_path) as fr:
+                self.read_elf_bytes(fr.read())
+            return
+
         with open(elf_path, 'rb') as fr:
-            elf_bytes = fr.read()
-        header_tables = ElfHeaderTables.parse(elf_bytes)
-        self.e_type = header_tables.elf_header.e_type
-        self.e_machine = header_tables.elf_header.e_machine
-
-        self._struct = self._generate_struct_from_headers(header_tables)
-        self._model = self._struct.parse(elf_bytes)
-
-        self.load_segments = [ElfSegment(seg.ph.p_vaddr, seg.data, seg.ph.p_flags) for seg in self._model.load_segments]
-        self.note_segments = [ElfNoteSegment(seg.ph.p_vaddr, seg.data, seg.ph.p_flags) for seg in self._model.note_segments]
-        self.sections = [
-            ElfSection(
-                self._parse_string_table(self._model.string_table, sec.sh.sh_name),
-                sec.sh.sh_addr,
-                sec.data,
-                sec.sh.sh_flags,
-            )
-            for sec in self._model.sections
-        ]
-
-        # calculate sha256 of the input bytes
-        # (note: may differ from sha256 of any generated output struct,
-        # as the ELF parser may change some details)
-        sha256 = hashlib.sha256()
-        sha256.update(elf_bytes)
-        self.sha256 = sha256.digest()
+            try:
+                elf_map = mmap.mmap(fr.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # empty file can't be mapped
+                elf_map = fr.read()  # type: ignore
+        self.read_elf_bytes(memoryview(elf_map))
+        self._elf_map = elf_map if isinstance(elf_map, mmap.mmap) else None
+
+    def read_elf_bytes(self, elf_bytes):  # type: (Union[bytes, memoryview]) -> None
+        """
+        Same as ``read_elf``, but parse elf file content which is already in memory
+        :param elf_bytes: bytes-like object with the elf file content, it is referenced, not copied
+        :return: None
+        """
+        if bytes(elf_bytes[: len(ELF_IDENT)]) != ELF_IDENT:
+            raise ValueError('Not a 32-bit little-endian ELF file')
+        self._elf_data = elf_bytes
+        self._sha256 = None
+        elf_header = ElfHeader.parse(elf_bytes)
+        self.e_type = elf_header.e_type
+        self.e_machine = elf_header.e_machine
+
+        program_headers = self._parse_table(ProgramHeader, elf_header.e_phoff, elf_header.e_phnum)
+        section_headers = self._parse_table(SectionHeader, elf_header.e_shoff, elf_header.e_shnum)
+        assert program_headers or section_headers
+
+        self.load_segments = []
+        self.note_segments = []
+        for ph in program_headers:
+            self._check_bounds(ph.p_offset, ph.p_filesz)
+            if ph.p_vaddr == 0 and ph.p_type == self.PT_NOTE:
+                self.note_segments.append(ElfNoteSegment.from_file(ph.p_vaddr, ph.p_flags, elf_bytes, ph.p_offset, ph.p_filesz))
+            elif ph.p_vaddr != 0:
+                self.load_segments.append(ElfSegment.from_file(ph.p_vaddr, ph.p_flags, elf_bytes, ph.p_offset, ph.p_filesz))
+
+        string_table = b''
+        if elf_header.e_shstrndx < len(section_headers) and section_headers[elf_header.e_shstrndx].sh_type == self.SHT_STRTAB:
+            sh = section_headers[elf_header.e_shstrndx]
+            self._check_bounds(sh.sh_offset, sh.sh_size)
+            string_table = bytes(elf_bytes[sh.sh_offset : sh.sh_offset + sh.sh_size])
+
+        self.sections = []
+        self._section_headers = {}
+        self._sections_by_name = {}
+        for i, sh in enumerate(section_headers):
+            if i == elf_header.e_shstrndx or sh.sh_type == self.SHT_NULL:
+                continue
+            name = self._parse_string_table(string_table, sh.sh_name)
+            self._section_headers.setdefault(name, sh)
+            if sh.sh_addr != 0 and sh.sh_type == self.SHT_PROGBITS:
+                self._check_bounds(sh.sh_offset, sh.sh_size)
+                section = ElfSection.from_file(name, sh.sh_addr, sh.sh_flags, elf_bytes, sh.sh_offset, sh.sh_size)
+                self.sections.append(section)
+                self._sections_by_name.setdefault(name, section)
+
+    def get_section(self, name):  # type: (str) -> Optional[ElfSection]
+        """
+        Find section by name, also sections which are not loaded (e.g. ``.debug_line``) are found.
+        Sections without data in the file (``SHT_NOBITS``) have empty data, compressed sections (``SHF_COMPRESSED``,
+        e.g. debug sections of an analysis bundle) are decompressed.
+        """
+        section = self._sections_by_name.get(name)
+        if section is None and name in self._section_headers:
+            sh = self._section_headers[name]
+            size = 0 if sh.sh_type == self.SHT_NOBITS else sh.sh_size
+            self._check_bounds(sh.sh_offset, size)
+            if sh.sh_flags & ElfSection.SHF_COMPRESSED and size >= CompressionHeader.size:
+                section = ElfSection(name, sh.sh_addr, self._decompress(sh.sh_offset, size), sh.sh_flags & ~ElfSection.SHF_COMPRESSED)
+            else:
+                section = ElfSection.from_file(name, sh.sh_addr, sh.sh_flags, self._elf_data, sh.sh_offset, size)  # type: ignore
+            self._sections_by_name[name] = section
+        return section
+
+    def _decompress(self, offset, size):  # type: (int, int) -> bytes
+        chdr = CompressionHeader.parse(self._elf_data, offset)
+        if chdr.ch_type != self.ELFCOMPRESS_ZLIB:
+            raise ValueError(f'Unsupported section compression type {chdr.ch_type}')
+        try:
+            data = zlib.decompress(self._elf_data[offset + CompressionHeader.size : offset + size])  # type: ignore
+        except zlib.error as e:
+            raise ValueError(f'Corrupted compressed section at offset 0x{offset:x}: {e}')
+        if len(data) != chdr.ch_size:
+            raise ValueError(f'Corrupted compressed section at offset 0x{offset:x}')
+        return data
 
     @staticmethod
     def _parse_string_table(byte_str, offset):  # type: (bytes, int) -> str
@@ -176,71 +217,75 @@ class ElfFile:
 
         return name
 
-    def _generate_struct_from_headers(self, header_tables):  # type: (Container) -> Struct
+    def _check_bounds(self, offset, size):  # type: (int, int) -> None
+        if offset + size > len(self._elf_data):  # type: ignore
+            raise ValueError(f'ELF file is truncated: {size} bytes at offset 0x{offset:x} are out of file')
+
+    def _parse_table(self, codec, offset, num):  # type: (Any, int, int) -> list[Any]
         """
-        Generate ``construct`` Struct for this file
-        :param header_tables: contains elf_header, program_headers, section_headers
-        :return: Struct of the whole file
+        Parse table of ``num`` headers, e.g. program headers
         """
-        elf_header = header_tables.elf_header
-        program_headers = header_tables.program_headers
-        section_headers = header_tables.section_headers
-        assert program_headers or section_headers
+        self._check_bounds(offset, num * codec.size)
+        return list(codec.iter_parse(self._elf_data, offset, num))
 
-        string_table_sh = None
-        load_segment_subcons = []
-        note_segment_subcons = []
-        # Here we point back to make segments know their program headers
-        for i, ph in enumerate(program_headers):
-            args = [
-                'ph' / Pointer(elf_header.e_phoff + i * ProgramHeader.sizeof(), ProgramHeader),
-                'data' / Pointer(ph.p_offset, Bytes(ph.p_filesz)),
-            ]
-            if ph.p_vaddr == 0 and ph.p_type == self.PT_NOTE:
-                args.append('note_secs' / Pointer(ph.p_offset, NoteSections))
-                note_segment_subcons.append(Struct(*args))
-            elif ph.p_vaddr != 0:
-                load_segment_subcons.append(Struct(*args))
 
-        section_subcons = []
-        for i, sh in enumerate(section_headers):
-            if sh.sh_type == self.SHT_STRTAB and i == elf_header.e_shstrndx:
-                string_table_sh = sh
-            elif sh.sh_addr != 0 and sh.sh_type == self.SHT_PROGBITS:
-                section_subcons.append(
-                    Struct(
-                        'sh'
-                        / Pointer(
-                            elf_header.e_shoff + i * SectionHeader.sizeof(),
-                            SectionHeader,
-                        ),
-                        'data' / Pointer(sh.sh_offset, Bytes(sh.sh_size)),
-                    )
-                )
-
-        args = [
-            'elf_header' / ElfHeader,
-            'load_segments' / Sequence(*load_segment_subcons),
-            'note_segments' / Sequence(*note_segment_subcons),
-            'sections' / Sequence(*section_subcons),
-        ]
-        if string_table_sh is not None:
-            args.append('string_table' / Pointer(string_table_sh.sh_offset, Bytes(string_table_sh.sh_size)))
-
-        return Struct(*args)
+def _released_view():  # type: () -> memoryview
+    view = memoryview(b'')
+    view.release()
+    return view
 
 
 class ElfSection:
     SHF_WRITE = 0x01
     SHF_ALLOC = 0x02
     SHF_EXECINSTR = 0x04
+    SHF_COMPRESSED = 0x800
     SHF_MASKPROC = 0xF0000000
 
-    def __init__(self, name, addr, data, flags):  # type: (str, int, bytes, int) -> None
+    __slots__ = ('name', 'addr', 'flags', '_data', '_source')
+
+    def __init__(self, name, addr, data, flags):  # type: (str, int, Union[bytes, memoryview], int) -> None
         self.name = name
         self.addr = addr
-        self.data = data
+        self._data = data  # type: Optional[Union[bytes, memoryview]]
         self.flags = flags
+        # (file data, offset, size) of the data which are not sliced yet
+        self._source = None  # type: Optional[tuple[Union[bytes, memoryview], int, int]]
+
+    @classmethod
+    def from_file(cls, name, addr, flags, elf_data, offset, size):
+        # type: (str, int, int, Union[bytes, memoryview], int, int) -> ElfSection
+        section = cls(name, addr, b'', flags)
+        section._data = None
+        section._source = (elf_data, offset, size)
+        return section
+
+    @property
+    def data(self):  # type: () -> Union[bytes, memoryview]
+        if self._data is None:
+            elf_data, offset, size = self._source  # type: ignore
+            self._data = memoryview(elf_data)[offset : offset + size]
+            self._source = None
+        return self._data
+
+    @data.setter
+    def data(self, value):  # type: (Union[bytes, memoryview]) -> None
+        self._data = value
+        self._source = None
+
+    @property
+    def size(self):  # type: () -> int
+        return self._source[2] if self._data is None else len(self._data)  # type: ignore
+
+    def release(self):  # type: () -> None
+        """
+        Release the data if it is a slice of the ELF file, it must not be used anymore
+        """
+        if self._source is not None:
+            self._data = _released_view()
+            self._source = None
+        elif isinstance(self._data, memoryview):
+            self._data.release()
 
     def attr_str(self):  # type: () -> str
         if self.flags & self.SHF_MASKPROC:
@@ -253,7 +298,7 @@ class ElfSection:
         return res
 
     def __repr__(self):  # type: () -> str
-        return '{:>32} [Addr] 0x{:>08X}, [Size] 0x{:>08X} {:>4}'.format(self.name, self.addr, len(self.data), self.attr_str())
+        return '{:>32} [Addr] 0x{:>08X}, [Size] 0x{:>08X} {:>4}'.format(self.name, self.addr, self.size, self.attr_str())
 
 
 class ElfSegment:
@@ -261,11 +306,50 @@ class ElfSegment:
     PF_W = 0x02
     PF_R = 0x04
 
-    def __init__(self, addr, data, flags):  # type: (int, bytes, int) -> None
+    __slots__ = ('addr', 'flags', 'type', '_data', '_source')
+
+    def __init__(self, addr, data, flags):  # type: (int, Union[bytes, memoryview], int) -> None
         self.addr = addr
-        self.data = data
+        self._data = data  # type: Optional[Union[bytes, memoryview]]
         self.flags = flags
         self.type = ElfFile.PT_LOAD
+        # (file data, offset, size) of the data which are not sliced yet
+        self._source = None  # type: Optional[tuple[Union[bytes, memoryview], int, int]]
+
+    @classmethod
+    def from_file(cls, addr, flags, elf_data, offset, size):
+        # type: (int, int, Union[bytes, memoryview], int, int) -> Any
+        segment = cls(addr, b'', flags)
+        segment._data = None
+        segment._source = (elf_data, offset, size)
+        return segment
+
+    @property
+    def data(self):  # type: () -> Union[bytes, memoryview]
+        if self._data is None:
+            elf_data, offset, size = self._source  # type: ignore
+            self._data = memoryview(elf_data)[offset : offset + size]
+            self._source = None
+        return self._data
+
+    @data.setter
+    def data(self, value):  # type: (Union[bytes, memoryview]) -> None
+        self._data = value
+        self._source = None
+
+    @property
+    def size(self):  # type: () -> int
+        return self._source[2] if self._data is None else len(self._data)  # type: ignore
+
+    def release(self):  # type: () -> None
+        """
+        Release the data if it is a slice of the ELF file, it must not be used anymore
+        """
+        if self._source is not None:
+            self._data = _released_view()
+            self._source = None
+        elif isinstance(self._data, memoryview):
+            self._data.release()
 
     def attr_str(self):  # type: () -> str
         res = ''
@@ -279,21 +363,26 @@ class ElfSegment:
         return 'LOAD'
 
     def __repr__(self):  # type: () -> str
-        return '{:>8} Addr 0x{:>08X}, Size 0x{:>08X} Flags {:4}'.format(self._type_str(), self.addr, len(self.data), self.attr_str())
+        return '{:>8} Addr 0x{:>08X}, Size 0x{:>08X} Flags {:4}'.format(self._type_str(), self.addr, self.size, self.attr_str())
 
 
 class ElfNoteSegment(ElfSegment):
-    def __init__(self, addr, data, flags):  # type: (int, bytes, int) -> None
+    __slots__ = ('_note_secs',)
+
+    def __init__(self, addr, data, flags):  # type: (int, Union[bytes, memoryview], int) -> None
         super().__init__(addr, data, flags)
         self.type = ElfFile.PT_NOTE
-        self.note_secs = NoteSections.parse(self.data)
-        for note in self.note_secs:
-            # note.name should include a terminating NUL byte, plus possible
-            # padding
-            #
-            # (note: construct.PaddingString can't parse this if there
-            # are non-zero padding bytes after the NUL, it also parses those.)
-            note.name = note.name.split(b'\x00')[0]
+        self._note_secs = None  # type: Optional[list[Note]]
+
+    @property
+    def note_secs(self):  # type: () -> list[Note]
+        """
+        Notes of the segment, parsed on first access.
+        note.name is cut at the terminating NUL byte, see ``iter_notes``
+        """
+        if self._note_secs is None:
+            self._note_secs = list(iter_notes(self.data))
+        return self._note_secs
 
     @staticmethod
     def _type_str():  # type: () -> str
@@ -304,14 +393,65 @@ TASK_STATUS_CORRECT = 0x00
 TASK_STATUS_TCB_CORRUPTED = 0x01
 TASK_STATUS_STACK_CORRUPTED = 0x02
 
-EspTaskStatus = Struct(
-    'task_index' / Int32ul,
-    'task_flags' / Int32ul,
-    'task_tcb_addr' / Int32ul,
-    'task_stack_start' / Int32ul,
-    'task_stack_len' / Int32ul,
-    'task_name' / Bytes(16),
-)
+
+class TaskTable:
+    """
+    Columnar table of ``EspTaskStatus`` records, every numeric field is kept in an ``array``.
+    Indexing and iteration return ``EspTaskStatus`` records, so the table can replace a list of them.
+    """
+
+    NUMERIC_FIELDS = ('task_index', 'task_flags', 'task_tcb_addr', 'task_stack_start', 'task_stack_len')
+    TASK_NAME_SIZE = 16
+
+    __slots__ = NUMERIC_FIELDS + ('task_names',)
+
+    def __init__(self):  # type: () -> None
+        self.task_index = array('I')
+        self.task_flags = array('I')
+        self.task_tcb_addr = array('I')
+        self.task_stack_start = array('I')
+        self.task_stack_len = array('I')
+        # task names, ``TASK_NAME_SIZE`` bytes each
+        self.task_names = b''
+
+    @classmethod
+    def from_bytes(cls, data):  # type: (Union[bytes, memoryview]) -> TaskTable
+        """
+        Decode concatenated ``EspTaskStatus`` records at once
+        """
+        table = cls()
+        num = len(data) // EspTaskStatus.size
+        stride = EspTaskStatus.size // 4
+        words = array('I')
+        words.frombytes(data[: num * EspTaskStatus.size])
+        if sys.byteorder == 'big':
+            words.byteswap()
+        for i, field in enumerate(cls.NUMERIC_FIELDS):
+            setattr(table, field, words[i::stride])
+        name_offset = len(cls.NUMERIC_FIELDS) * 4
+        table.task_names = b''.join(bytes(data[pos + name_offset : pos + EspTaskStatus.size]) for pos in range(0, num * EspTaskStatus.size, EspTaskStatus.size))
+        return table
+
+    def task_name(self, i):  # type: (int) -> bytes
+        return self.task_names[i * self.TASK_NAME_SIZE : (i + 1) * self.TASK_NAME_SIZE]
+
+    def __len__(self):  # type: () -> int
+        return len(self.task_index)
+
+    def __getitem__(self, i):  # type: (int) -> Any
+        if i < 0:
+            i += len(self)
+        return EspTaskStatus.record(
+            self.task_index[i],
+            self.task_flags[i],
+            self.task_tcb_addr[i],
+            self.task_stack_start[i],
+            self.task_stack_len[i],
+            self.task_name(i),
+        )
+
+    def __iter__(self):  # type: () -> Iterator[Any]
+        return (self[i] for i in range(len(self)))
 
 
 class ESPCoreDumpElfFile(ElfFile):
@@ -320,8 +460,14 @@ class ESPCoreDumpElfFile(ElfFile):
     PT_ESP_TASK_INFO = 678
     PT_ESP_EXTRA_INFO = 677
 
+    # note with the task registers, its type is the same as PT_LOAD
+    NT_PRSTATUS = 1
+
     CURR_TASK_MARKER = 0xDEADBEEF
 
+    # alignment of load segments in a page-aligned core ELF
+    PAGE_SIZE = 0x1000
+
     # ELF file machine type
     EM_XTENSA = 0x5E
     EM_RISCV = 0xF3
@@ -330,23 +476,128 @@ class ESPCoreDumpElfFile(ElfFile):
         # type: (Optional[str], Optional[int], Optional[int]) -> None
         _e_type = e_type or self.ET_CORE
         _e_machine = e_machine or self.EM_XTENSA
+        # notes by (type, name) and by (type, None), see ``get_notes``
+        self._note_index = None  # type: Optional[dict[tuple[int, Optional[bytes]], list[Note]]]
+        self._task_info = None  # type: Optional[TaskTable]
         super().__init__(elf_path, _e_type, _e_machine)
 
+    def read_elf_bytes(self, elf_bytes):  # type: (Union[bytes, memoryview]) -> None
+        super().read_elf_bytes(elf_bytes)
+        self._reset_note_index()
+
     def add_segment(self, addr, data, seg_type, flags):  # type: (int, bytes, int, int) -> None
         if seg_type != self.PT_NOTE:
             self.load_segments.append(ElfSegment(addr, data, flags))
         else:
             self.note_segments.append(ElfNoteSegment(addr, data, flags))
+            self._reset_note_index()
 
-    def dump(self, output_path):  # type: (str) -> None
+    def _reset_note_index(self):  # type: () -> None
+        self._note_index = None
+        self._task_info = None
+
+    def get_notes(self, note_type, name=None):  # type: (int, Optional[bytes]) -> list[Note]
+        """
+        Notes of the given type in the file order, optionally only the ones with the given name.
+        All notes are walked only once, when the index is built on first call.
+        """
+        if self._note_index is None:
+            index = {}  # type: dict[tuple[int, Optional[bytes]], list[Note]]
+            for seg in self.note_segments:
+                for note in seg.note_secs:
+                    index.setdefault((note.type, note.name), []).append(note)
+                    index.setdefault((note.type, None), []).append(note)
+            self._note_index = index
+        return self._note_index.get((note_type, name), [])
+
+    def get_note(self, note_type, name=None):  # type: (int, Optional[bytes]) -> Optional[Note]
+        """
+        The first note of the given type (and name)
+        """
+        notes = self.get_notes(note_type, name)
+        return notes[0] if notes else None
+
+    @property
+    def core_dump_info_note(self):  # type: () -> Optional[Note]
+        return self.get_note(self.PT_ESP_INFO, b'ESP_CORE_DUMP_INFO')
+
+    @property
+    def panic_details_note(self):  # type: () -> Optional[Note]
+        return self.get_note(self.PT_ESP_PANIC_DETAILS)
+
+    @property
+    def extra_info_note(self):  # type: () -> Optional[Note]
+        notes = self.get_notes(self.PT_ESP_EXTRA_INFO)
+        return notes[-1] if notes else None
+
+    @property
+    def prstatus_notes(self):  # type: () -> list[Note]
+        return self.get_notes(self.NT_PRSTATUS, b'CORE')
+
+    @property
+    def chip_rev(self):  # type: () -> Optional[int]
+        note = self.get_note(self.PT_ESP_INFO, b'ESP_CHIP_REV')
+        return int.from_bytes(note.desc, 'little') if note else None
+
+    @property
+    def task_info(self):  # type: () -> TaskTable
         """
-        Dump self.model into file
-        :param output_path: output file path
+        ``EspTaskStatus`` of all tasks, decoded at once from the TASK_INFO notes
+        """
+        if self._task_info is None:
+            size = EspTaskStatus.size
+            notes = self.get_notes(self.PT_ESP_TASK_INFO)
+            self._task_info = TaskTable.from_bytes(b''.join(note.desc[:size] for note in notes))
+            if len(self._task_info) != len(notes):
+                raise ValueError('Too short TASK_INFO note')
+        return self._task_info
+
+    def coalesce_load_segments(self):  # type: () -> None
+        """
+        Sort load segments by address, drop exact duplicates and merge adjacent or overlapping segments
+        with the same flags. Where merged segments overlap, data of the segment with the lower address are kept.
+        """
+        segments = []  # type: list[ElfSegment]
+        # data chunks of the last segment in ``segments``, joined once the segment is complete
+        chunks = []  # type: list[Union[bytes, memoryview]]
+        last_end = 0
+        for seg in sorted(self.load_segments, key=lambda s: (s.addr, s.size)):
+            if segments and seg.flags == segments[-1].flags and seg.addr <= last_end:
+                # exact duplicates and segments within the last one are dropped
+                if seg.addr + seg.size > last_end:
+                    chunks.append(seg.data[last_end - seg.addr :])
+                    last_end = seg.addr + seg.size
+                continue
+            if len(chunks) > 1:
+                segments[-1].data = b''.join(chunks)
+            segments.append(ElfSegment(seg.addr, seg.data, seg.flags))
+            chunks = [seg.data]
+            last_end = seg.addr + seg.size
+        if len(chunks) > 1:
+            segments[-1].data = b''.join(chunks)
+        self.load_segments = segments  # type: ignore
+
+    def dump(self, output, page_align=False):  # type: (Union[str, BinaryIO], bool) -> None
+        """
+        Dump ELF header, program headers and data of all segments into file. Segment data are written one by one,
+        so only the headers are built in memory.
+        :param output: output file path or writable binary file object
+        :param page_align: place load segments at file offsets congruent to their addresses modulo ``PAGE_SIZE``,
+            so they can be mapped directly
         :return: None
         """
-        res = b''
-        res += ElfHeader.build(
+        if isinstance(output, str):
+            with open(output, 'wb') as fw:
+                fw.writelines(self._iter_dump_chunks(page_align))
+        else:
+            for chunk in self._iter_dump_chunks(page_align):
+                output.write(chunk)
+
+    def _iter_dump_chunks(self, page_align=False):  # type: (bool) -> Iterator[Union[bytes, memoryview]]
+        _segments = self.load_segments + self.note_segments  # type: ignore
+        yield ElfHeader.build(
             {
+                'e_ident': ELF_IDENT,
                 'e_type': self.e_type,
                 'e_machine': self.e_machine,
                 'e_version': self.EV_CURRENT,
@@ -356,32 +607,29 @@ class ESPCoreDumpElfFile(ElfFile):
                 'e_flags': 0,
                 'e_ehsize': ElfHeader.sizeof(),
                 'e_phentsize': ProgramHeader.sizeof(),
-                'e_phnum': len(self.load_segments) + len(self.note_segments),
+                'e_phnum': len(_segments),
                 'e_shentsize': 0,
                 'e_shnum': 0,
                 'e_shstrndx': self.SHN_UNDEF,
             }
         )
 
-        offset = ElfHeader.sizeof() + (len(self.load_segments) + len(self.note_segments)) * ProgramHeader.sizeof()
-        _segments = self.load_segments + self.note_segments  # type: ignore
+        program_headers = []
+        # zero padding in front of each segment
+        paddings = []
+        offset = ElfHeader.sizeof() + len(_segments) * ProgramHeader.sizeof()
         for seg in _segments:
-            res += ProgramHeader.build(
-                {
-                    'p_type': seg.type,
-                    'p_offset': offset,
-                    'p_vaddr': seg.addr,
-                    'p_paddr': seg.addr,
-                    'p_filesz': len(seg.data),
-                    'p_memsz': len(seg.data),
-                    'p_flags': seg.flags,
-                    'p_align': 0,
-                }
-            )
-            offset += len(seg.data)
-
-        for seg in _segments:
-            res += seg.data
-
-        with open(output_path, 'wb') as fw:
-            fw.write(res)
+            size = seg.size
+            align = self.PAGE_SIZE if page_align and seg.type == self.PT_LOAD else 0
+            padding = (seg.addr - offset) % align if align else 0
+            offset += padding
+            paddings.append(padding)
+            # p_type, p_offset, p_vaddr, p_paddr, p_filesz, p_memsz, p_flags, p_align
+            program_headers.append(ProgramHeader.pack(seg.type, offset, seg.addr, seg.addr, size, size, seg.flags, align))
+            offset += size
+        yield b''.join(program_headers)
+
+        for seg, padding in zip(_segments, paddings):
+            if padding:
+                yield bytes(padding)
+            yield seg.data
@@ -7,14 +7,31 @@
 import logging
 import os
 import re
+import selectors
+import threading
 import time
+from contextlib import contextmanager
 from subprocess import TimeoutExpired
+from typing import Any, Hashable, Iterator, Optional, Tuple  # noqa: F401
 
 from pygdbmi.gdbcontroller import GdbController
 
 from . import ESPCoreDumpError
 
 DEFAULT_GDB_TIMEOUT_SEC = 3
+# Time budget of an MI command is this multiple of its longest response time so far, but at least the GDB timeout.
+# Commands which are slow for the loaded app get enough time, and a command which timed out gets more time next time.
+ADAPTIVE_TIMEOUT_FACTOR = 4
+# poll interval where the GDB output pipes cannot be waited for (Windows)
+POLL_INTERVAL_SEC = 0.01
+# commands sent ahead of the results in batched queries, their size is well below the pipe buffers,
+# so GDB never blocks on a full output pipe while more commands are written
+PIPELINE_DEPTH = 64
+# GDB processes run at once by an ``EspGDBPool``, and how long its sessions are kept idle
+DEFAULT_GDB_POOL_SIZE = os.cpu_count() or 1
+DEFAULT_GDB_POOL_IDLE_SEC = 300
+# GDB reads all the DWARF info of the app to create its index
+GDB_INDEX_TIMEOUT_SEC = 300
 
 
 class EspGDB:
@@ -28,21 +45,22 @@ class EspGDB:
             # fallback for pygdbmi<0.10.0.0.
             self.p = GdbController(gdb_path=gdb_args[0], gdb_args=gdb_args[1:])
 
-        self.timeout = timeout_sec
+        self.timeout = timeout_sec  # type: float
+        # MI commands are sent with increasing tokens, the result record of a command carries its token
+        self._token = 0
+        # the longest response time of each MI command
+        self._latencies = {}  # type: dict[str, float]
+        self._selector = self._create_selector()
 
         # Consume initial output by issuing a dummy command
-        self._gdbmi_run_cmd_get_responses(
-            cmd='-data-list-register-values x pc',
-            resp_message=None,
-            resp_type='console',
-            multiple=True,
-            done_message='done',
-            done_type='result',
-        )
+        self._gdbmi_run_cmd_get_responses(cmd='-data-list-register-values x pc', resp_message=None, resp_type='console')
 
     def __del__(self):
+        self.close()
+
+    def close(self):  # type: () -> None
         """
-        EspGDB destructor taking GdbController.gdb_process.exit() and adjusting it
+        Terminate GDB, taking GdbController.gdb_process.exit() and adjusting it
         to work properly
         """
         try:
@@ -61,34 +79,101 @@ class EspGDB:
                 self.p.gdb_process = None
         except IndexError:
             logging.warning('Attempt to terminate the GDB process failed, because it is already terminated. Skip.')
+        selector = getattr(self, '_selector', None)
+        if selector is not None:
+            selector.close()
+            self._selector = None
+
+    def _create_selector(self):  # type: () -> Optional[selectors.BaseSelector]
+        """
+        Selector waiting for the output of GDB, None if the pipes cannot be selected
+        """
+        process = getattr(self.p, 'gdb_process', None)
+        if os.name == 'nt' or process is None:
+            return None
+        selector = selectors.DefaultSelector()
+        for stream in (process.stdout, process.stderr):
+            if stream is not None:
+                selector.register(stream, selectors.EVENT_READ)
+        return selector
 
-    def _gdbmi_run_cmd_get_responses(
-        self,
-        cmd,
-        resp_message,
-        resp_type,
-        multiple=True,
-        done_message=None,
-        done_type=None,
-        response_delay_sec=None,
-    ):
-        self.p.write(cmd, read_response=False)
-        t_end = time.time() + (response_delay_sec or self.timeout)
-        filtered_response_list = []
-        all_responses = []
-        while time.time() < t_end:
+    def _wait_for_output(self, timeout_sec):  # type: (float) -> None
+        if self._selector is None:
+            time.sleep(min(timeout_sec, POLL_INTERVAL_SEC))
+        else:
+            self._selector.select(timeout_sec)
+
+    def _timeout_for(self, cmd):  # type: (str) -> float
+        return max(self.timeout, ADAPTIVE_TIMEOUT_FACTOR * self._latencies.get(cmd.split(' ', 1)[0], 0))
+
+    def _record_latency(self, cmd, latency):  # type: (str, float) -> None
+        name = cmd.split(' ', 1)[0]
+        self._latencies[name] = max(self._latencies.get(name, 0), latency)
+
+    def _gdbmi_run_cmds(self, cmds, timeout_sec=None):
+        # type: (list[str], Optional[float]) -> list[Tuple[Optional[dict[str, Any]], list[dict[str, Any]]]]
+        """
+        Send MI commands pipelined (up to ``PIPELINE_DEPTH`` of them in flight), each tagged with a new token,
+        and read the output of GDB until the result records of all of them, the output is waited for without polling.
+        GDB runs the commands in order, so the output records preceding the result record of a command belong to it.
+        :param timeout_sec: time budget of each command since the previous one finished, adaptive by default (see ``ADAPTIVE_TIMEOUT_FACTOR``)
+        :return: the result record (None if GDB did not finish the command in time) and all the records for each command
+        """
+        first_token = self._token + 1
+        self._token += len(cmds)
+        results = []  # type: list[Tuple[Optional[dict[str, Any]], list[dict[str, Any]]]]
+        responses = []  # type: list[dict[str, Any]]
+        sent = 0
+        last_progress = time.time()
+        while len(results) < len(cmds):
+            if sent < len(cmds) and sent - len(results) < PIPELINE_DEPTH:
+                end = min(len(cmds), len(results) + PIPELINE_DEPTH)
+                self.p.write([f'{first_token + i}{cmds[i]}' for i in range(sent, end)], read_response=False)
+                sent = end
             more_responses = self.p.get_gdb_response(timeout_sec=0, raise_error_on_timeout=False)
-            filtered_response_list += filter(
-                lambda rsp: rsp['message'] == resp_message and rsp['type'] == resp_type,
-                more_responses,
-            )
-            all_responses += more_responses
-            if filtered_response_list and not multiple:
+            for rsp in more_responses:
+                if rsp['type'] != 'result':
+                    responses.append(rsp)
+                    continue
+                token = rsp.get('token')
+                if token is None or not first_token + len(results) <= token < first_token + len(cmds):
+                    # late result of a command which timed out before, the output read so far belongs to that command too
+                    responses = []
+                    continue
+                while first_token + len(results) < token:
+                    results.append((None, []))
+                now = time.time()
+                self._record_latency(cmds[len(results)], now - last_progress)
+                responses.append(rsp)
+                results.append((rsp, responses))
+                responses = []
+                last_progress = now
+            if len(results) == len(cmds):
                 break
-            if done_message and done_type and self._gdbmi_filter_responses(more_responses, done_message, done_type):
+            remaining = last_progress + (timeout_sec or self._timeout_for(cmds[len(results)])) - time.time()
+            if remaining <= 0 or (not more_responses and self.p.gdb_process.poll() is not None):
+                pending = cmds[len(results)]
+                logging.debug(f'GDB did not finish "{pending}" in time')
+                # the command gets more time next time
+                self._record_latency(pending, timeout_sec or self._timeout_for(pending))
+                results.append((None, responses))
+                results += [(None, [])] * (len(cmds) - len(results))
                 break
+            if sent - len(results) >= PIPELINE_DEPTH or sent == len(cmds):
+                self._wait_for_output(remaining)
+        return results
+
+    def _gdbmi_run_cmd(self, cmd, timeout_sec=None):  # type: (str, Optional[float]) -> Tuple[Optional[dict[str, Any]], list[dict[str, Any]]]
+        """
+        Send an MI command and read the output of GDB until its result record, see ``_gdbmi_run_cmds``
+        """
+        return self._gdbmi_run_cmds([cmd], timeout_sec)[0]
+
+    def _gdbmi_run_cmd_get_responses(self, cmd, resp_message, resp_type, multiple=True, response_delay_sec=None):
+        _, responses = self._gdbmi_run_cmd(cmd, response_delay_sec)
+        filtered_response_list = self._gdbmi_filter_responses(responses, resp_message, resp_type)
         if not filtered_response_list and not multiple:
-            raise ESPCoreDumpError(f"Couldn't find response with message {resp_message}, type {resp_type} in responses {str(all_responses)}")
+            raise ESPCoreDumpError(f"Couldn't find response with message {resp_message}, type {resp_type} in responses {str(responses)}")
         return filtered_response_list
 
     def _gdbmi_run_cmd_get_one_response(self, cmd, resp_message, resp_type, response_delay_sec=None):
@@ -104,48 +189,107 @@ class EspGDB:
         """Get the value of an expression, similar to the 'print' command"""
         return self._gdbmi_run_cmd_get_one_response(f'-data-evaluate-expression "{expr}"', 'done', 'result')['payload']['value']
 
-    def get_tcb_variable(self, tcb_addr, variable):
-        """Get FreeRTOS variable from given TCB address"""
-        try:
-            val = self._gdbmi_data_evaluate_expression(f'(char*)((TCB_t *)0x{tcb_addr:x})->{variable}')
-        except (ESPCoreDumpError, KeyError):
-            # KeyError is raised when "value" is not in "payload"
-            return ''
-        return val
+    def evaluate_expressions(self, exprs):  # type: (list[str]) -> list[Optional[str]]
+        """Get the values of expressions in one batch of commands, None for the expressions which failed"""
+        values = []  # type: list[Optional[str]]
+        for result, _ in self._gdbmi_run_cmds([f'-data-evaluate-expression "{expr}"' for expr in exprs]):
+            payload = result['payload'] if result and result['message'] == 'done' else None
+            values.append(payload.get('value') if isinstance(payload, dict) else None)
+        return values
 
-    def parse_tcb_variable(self, tcb_addr, variable):
+    def get_tcb_variables(self, tcb_variables):  # type: (list[Tuple[int, str]]) -> list[str]
+        """Get FreeRTOS variables from given (TCB address, variable) pairs in one batch"""
+        values = self.evaluate_expressions([f'(char*)((TCB_t *)0x{tcb_addr:x})->{variable}' for tcb_addr, variable in tcb_variables])
+        return [val or '' for val in values]
+
+    def get_tcb_variable(self, tcb_addr, variable):
         """Get FreeRTOS variable from given TCB address"""
-        val = self.get_tcb_variable(tcb_addr, variable)
+        return self.get_tcb_variables([(tcb_addr, variable)])[0]
 
+    @staticmethod
+    def _parse_tcb_value(val):  # type: (str) -> str
         # Value is of form '0x12345678 ""'
         result = re.search(r'0x[0-9a-fA-F]+', val)
         if result:
             return result.group(0)
         return ''
 
-    def get_freertos_task_name(self, tcb_addr):
-        """Get FreeRTOS task name given the TCB address"""
-        val = self.get_tcb_variable(tcb_addr, 'pcTaskName')
+    def parse_tcb_variables(self, tcb_variables):  # type: (list[Tuple[int, str]]) -> list[str]
+        """Get FreeRTOS variables from given (TCB address, variable) pairs in one batch, as hexadecimal numbers"""
+        return [self._parse_tcb_value(val) for val in self.get_tcb_variables(tcb_variables)]
 
+    def parse_tcb_variable(self, tcb_addr, variable):
+        """Get FreeRTOS variable from given TCB address"""
+        return self._parse_tcb_value(self.get_tcb_variable(tcb_addr, variable))
+
+    @staticmethod
+    def _parse_task_name(val):  # type: (str) -> str
         # Value is of form '0x12345678 "task_name"', extract the actual name
         result = re.search(r"\"([^']*)\"$", val)
         if result:
             return result.group(1)
         return ''
 
+    def get_freertos_task_names(self, tcb_addrs):  # type: (list[int]) -> list[str]
+        """Get FreeRTOS task names given the TCB addresses in one batch"""
+        return [self._parse_task_name(val) for val in self.get_tcb_variables([(tcb_addr, 'pcTaskName') for tcb_addr in tcb_addrs])]
+
+    def get_freertos_task_name(self, tcb_addr):
+        """Get FreeRTOS task name given the TCB address"""
+        return self._parse_task_name(self.get_tcb_variable(tcb_addr, 'pcTaskName'))
+
+    @staticmethod
+    def _console_output(responses):  # type: (list[dict[str, Any]]) -> str
+        filtered_responses = EspGDB._gdbmi_filter_responses(responses, None, 'console')
+        return ''.join([x['payload'] for x in filtered_responses]).replace('\\n', '\n').replace('\\t', '\t').rstrip('\n').replace('\\"', '"')
+
     def run_cmd(self, gdb_cmd):
         """Execute a generic GDB console command via MI2"""
-        filtered_responses = self._gdbmi_run_cmd_get_responses(
-            cmd=f'-interpreter-exec console "{gdb_cmd}"',
-            resp_message=None,
-            resp_type='console',
-            multiple=True,
-            done_message='done',
-            done_type='result',
-        )
-        return ''.join([x['payload'] for x in filtered_responses]).replace('\\n', '\n').replace('\\t', '\t').rstrip('\n').replace('\\"', '"')
+        _, responses = self._gdbmi_run_cmd(f'-interpreter-exec console "{gdb_cmd}"')
+        return self._console_output(responses)
+
+    def get_backtraces(self, thr_ids):  # type: (list[int]) -> dict[int, str]
+        """
+        Get backtraces of the threads, given their IDs. Switching to each thread and its 'bt' command are sent in one batch,
+        and the output is split by the command tokens. The last thread stays selected.
+        """
+        cmds = []
+        for thr_id in thr_ids:
+            cmds += [f'-thread-select {thr_id}', '-interpreter-exec console "bt"']
+        results = self._gdbmi_run_cmds(cmds)
+        backtraces = {}
+        for i, thr_id in enumerate(thr_ids):
+            (select_result, select_responses), (_, bt_responses) = results[2 * i], results[2 * i + 1]
+            if not select_result or select_result['message'] != 'done':
+                raise ESPCoreDumpError(f"Couldn't find response with message done, type result in responses {str(select_responses)}")
+            backtraces[thr_id] = self._console_output(bt_responses)
+        return backtraces
+
+    def attach_core(self, core_path):  # type: (str) -> None
+        """Load a core file in place of the current one, the symbols loaded at the start of GDB are kept"""
+        if os.name == 'nt':
+            core_path = core_path.replace('\\', '/')
+        self._gdbmi_run_cmd_get_one_response(f'-interpreter-exec console "core-file {core_path}"', 'done', 'result')
+
+    def detach_core(self):  # type: () -> None
+        """Unload the core file"""
+        self._gdbmi_run_cmd_get_one_response('-interpreter-exec console "core-file"', 'done', 'result')
+
+    def save_gdb_index(self, directory, timeout_sec=GDB_INDEX_TIMEOUT_SEC):  # type: (str, float) -> bool
+        """Write the indexes of the loaded symbol files to the directory, as <directory>/<file name>.gdb-index"""
+        if os.name == 'nt':
+            directory = directory.replace('\\', '/')
+        result, _ = self._gdbmi_run_cmd(f'-interpreter-exec console "save gdb-index {directory}"', timeout_sec)
+        return result is not None and result['message'] == 'done'
 
-    def get_thread_info(self, response_delay_sec=DEFAULT_GDB_TIMEOUT_SEC):
+    def is_alive(self):  # type: () -> bool
+        """GDB is running and answers commands in time"""
+        if not self.p.gdb_process or self.p.gdb_process.poll() is not None:
+            return False
+        result, _ = self._gdbmi_run_cmd('-gdb-version')
+        return result is not None
+
+    def get_thread_info(self, response_delay_sec=None):
         """Get information about all threads known to GDB, and the current thread ID"""
         result = self._gdbmi_run_cmd_get_one_response('-thread-info', 'done', 'result', response_delay_sec=response_delay_sec)['payload']
         if not result:
@@ -172,3 +316,127 @@ class EspGDB:
     def gdb2freertos_thread_id(gdb_target_id):
         """Convert GDB 'target ID' to the FreeRTOS TCB address"""
         return int(gdb_target_id.replace('process ', ''), 0)
+
+
+class EspGDBPool:
+    """
+    Pool of running GDB sessions, so core dumps of the same app are decoded without GDB loading its symbols again.
+
+    Sessions are started without a core file and are looked up by a key given by the caller, e.g. the GDB command line
+    and the SHA256 of the app. A core file is attached to a session while it is taken from the pool.
+    At most ``max_sessions`` GDB processes run at once, taken or idle, ``session`` waits for one to be returned.
+    Idle sessions of other keys are closed to make room (least recently used first), as well as sessions idle for longer
+    than ``idle_timeout_sec``. An idle session which fails the health check is replaced by a new one.
+    """
+
+    def __init__(self, max_sessions=DEFAULT_GDB_POOL_SIZE, idle_timeout_sec=DEFAULT_GDB_POOL_IDLE_SEC):  # type: (int, float) -> None
+        self.max_sessions = max_sessions
+        self.idle_timeout_sec = idle_timeout_sec
+        # (key, session, time of its return) in the order of the returns
+        self._idle = []  # type: list[Tuple[Hashable, EspGDB, float]]
+        self._taken = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def __enter__(self):  # type: () -> EspGDBPool
+        return self
+
+    def __exit__(self, *_):  # type: (Any) -> None
+        self.close()
+
+    def __len__(self):  # type: () -> int
+        """
+        Number of running sessions, taken or idle
+        """
+        with self._cond:
+            return self._taken + len(self._idle)
+
+    @contextmanager
+    def session(self, key, gdb_args, core_path, timeout_sec=DEFAULT_GDB_TIMEOUT_SEC):
+        # type: (Hashable, list[str], str, float) -> Iterator[EspGDB]
+        """
+        Take a session of the key with the core file attached, GDB is started with ``gdb_args`` if there is no idle one.
+        The core file is detached when the session is returned, a session is closed if it failed while it was taken.
+        :param gdb_args: GDB command line without the core file
+        """
+        gdb = self._acquire(key)
+        healthy = False
+        try:
+            if gdb is not None and not gdb.is_alive():
+                logging.debug('GDB session failed the health check, it is replaced')
+                gdb.close()
+                gdb = None
+            if gdb is None:
+                gdb = EspGDB(gdb_args, timeout_sec=timeout_sec)
+            gdb.timeout = timeout_sec
+            gdb.attach_core(core_path)
+            yield gdb
+            gdb.detach_core()
+            healthy = True
+        finally:
+            if not healthy and gdb is not None:
+                gdb.close()
+            self._release(key, gdb if healthy else None)
+
+    def evict_idle(self):  # type: () -> int
+        """
+        Close the sessions idle for longer than ``idle_timeout_sec``, it is done on each use of the pool too
+        :return: number of the closed sessions
+        """
+        with self._cond:
+            expired = self._pop_expired()
+        for gdb in expired:
+            gdb.close()
+        return len(expired)
+
+    def close(self):  # type: () -> None
+        """
+        Close the idle sessions, the taken ones are closed when they are returned
+        """
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for _, gdb, _ in idle:
+            gdb.close()
+
+    def _pop_expired(self):  # type: () -> list[EspGDB]
+        deadline = time.time() - self.idle_timeout_sec
+        expired = [gdb for _, gdb, returned in self._idle if returned <= deadline]
+        self._idle = [entry for entry in self._idle if entry[2] > deadline]
+        return expired
+
+    def _acquire(self, key):  # type: (Hashable) -> Optional[EspGDB]
+        """
+        Take the most recently returned idle session of the key, or reserve room for a new session (None is returned)
+        """
+        stale = []  # type: list[EspGDB]
+        try:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise ESPCoreDumpError('The GDB session pool is closed')
+                    stale += self._pop_expired()
+                    for i in reversed(range(len(self._idle))):
+                        if self._idle[i][0] == key:
+                            self._taken += 1
+                            return self._idle.pop(i)[1]
+                    if self._idle and self._taken + len(self._idle) >= self.max_sessions:
+                        stale.append(self._idle.pop(0)[1])
+                    if self._taken + len(self._idle) < self.max_sessions:
+                        self._taken += 1
+                        return None
+                    self._cond.wait()
+        finally:
+            for gdb in stale:
+                gdb.close()
+
+    def _release(self, key, gdb):  # type: (Hashable, Optional[EspGDB]) -> None
+        with self._cond:
+            self._taken -= 1
+            if gdb is not None and not self._closed:
+                self._idle.append((key, gdb, time.time()))
+                gdb = None
+            self._cond.notify()
+        if gdb is not None:
+            gdb.close()
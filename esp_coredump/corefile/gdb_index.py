@@ -0,0 +1,142 @@
+#
+# SPDX-FileCopyrightText: 2026 Espressif Systems (Shanghai) CO LTD
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+import logging
+import os
+import shutil
+import tempfile
+from typing import Any, Optional  # noqa: F401
+
+from .cache import get_cache_dir, get_elf_cache_dir, get_elf_file
+from .codec import ElfHeader, SectionHeader
+from .elf import ElfFile
+
+# GDB loads the symbols of an app much faster from an index section than from the DWARF info alone, but it reads the index
+# only from the ELF file itself. A copy of the program ELF file with the index created by GDB ("save gdb-index") added
+# is kept in ``get_elf_cache_dir()`` of the file, so it is used only for the file it was created from, and it is given
+# to GDB in place of the file until the file is modified.
+
+# default budget of the cache directory, can be changed with the ESP_COREDUMP_GDB_INDEX_CACHE_SIZE environment variable,
+# 0 disables the cache
+DEFAULT_GDB_INDEX_CACHE_SIZE = 1024 * 1024 * 1024
+
+GDB_INDEX_SECTION = '.gdb_index'
+# index sections read by GDB, ELF files which have one are used as they are
+INDEX_SECTIONS = (GDB_INDEX_SECTION, '.debug_names')
+GDB_INDEX_CACHE_NAME = 'gdb-index'
+INDEXED_ELF_FILE_NAME = 'indexed.elf'
+
+
+def get_gdb_index_cache_size():  # type: () -> int
+    return int(os.environ.get('ESP_COREDUMP_GDB_INDEX_CACHE_SIZE', DEFAULT_GDB_INDEX_CACHE_SIZE))
+
+
+def _indexed_elf_path(elf_path):  # type: (str) -> Optional[str]
+    cache_dir = get_elf_cache_dir(GDB_INDEX_CACHE_NAME, elf_path)
+    return os.path.join(cache_dir, INDEXED_ELF_FILE_NAME) if cache_dir else None
+
+
+def get_indexed_elf_path(elf_path):  # type: (str) -> Optional[str]
+    """
+    Copy of the program ELF file with the GDB index, None if it is not in the cache
+    """
+    if get_gdb_index_cache_size() <= 0:
+        return None
+    path = _indexed_elf_path(elf_path)
+    if path is None or not os.path.isfile(path):
+        return None
+    try:
+        # the directory time is the time of the last use, see ``evict_gdb_indexes``
+        os.utime(os.path.dirname(path))
+    except OSError:
+        pass
+    return path
+
+
+def needs_gdb_index(elf_path):  # type: (str) -> bool
+    """
+    The ELF file has DWARF info without an index and its index is not in the cache (which is enabled)
+    """
+    if get_gdb_index_cache_size() <= 0:
+        return False
+    elf = get_elf_file(elf_path)  # type: ElfFile
+    if elf._elf_data is None or '.debug_info' not in elf._section_headers or any(name in elf._section_headers for name in INDEX_SECTIONS):
+        return False
+    return get_indexed_elf_path(elf_path) is None
+
+
+def store_gdb_index(elf_path, index_path):  # type: (str, str) -> Optional[str]
+    """
+    Add a copy of the program ELF file with its index created by GDB ("save gdb-index") to the cache
+    :return: path of the copy, None if GDB did not create the index
+    """
+    try:
+        with open(index_path, 'rb') as fr:
+            index = fr.read()
+    except OSError:
+        logging.debug(f'GDB did not create the index of "{elf_path}"')
+        return None
+    output = _indexed_elf_path(elf_path)
+    if output is None:
+        return None
+    with tempfile.NamedTemporaryFile(suffix='.elf', dir=os.path.dirname(output), delete=False) as f:
+        try:
+            _write_with_section(f, get_elf_file(elf_path), GDB_INDEX_SECTION, index)
+        except BaseException:
+            f.close()
+            os.remove(f.name)
+            raise
+    os.replace(f.name, output)
+    evict_gdb_indexes(get_gdb_index_cache_size())
+    return output
+
+
+def _write_with_section(f, elf, name, data):  # type: (Any, ElfFile, str, bytes) -> None
+    """
+    Write the ELF file with a section appended. The data of the file stays at the same offsets, the new section,
+    the extended section name table and the section header table are added at the end.
+    """
+    elf_data = elf._elf_data  # type: Any
+    elf_header = ElfHeader.parse(elf_data)
+    headers = [sh._asdict() for sh in SectionHeader.iter_parse(elf_data, elf_header.e_shoff, elf_header.e_shnum)]
+    shstrtab = headers[elf_header.e_shstrndx]
+    names = bytes(elf_data[shstrtab['sh_offset'] : shstrtab['sh_offset'] + shstrtab['sh_size']]) + name.encode() + b'\x00'
+
+    offset = len(elf_data)
+    headers.append({'sh_name': shstrtab['sh_size'], 'sh_type': ElfFile.SHT_PROGBITS, 'sh_offset': offset, 'sh_size': len(data), 'sh_addralign': 1})
+    offset += len(data)
+    shstrtab.update(sh_offset=offset, sh_size=len(names))
+    offset += len(names)
+    padding = -offset % 4
+
+    f.write(ElfHeader.build(dict(elf_header._asdict(), e_shoff=offset + padding, e_shnum=len(headers))))
+    f.write(elf_data[ElfHeader.size :])
+    f.write(data)
+    f.write(names)
+    f.write(bytes(padding))
+    f.write(b''.join(SectionHeader.build(sh) for sh in headers))
+
+
+def evict_gdb_indexes(max_bytes):  # type: (int) -> None
+    """
+    Remove the least recently used copies with the index until the size of the cache is within ``max_bytes``
+    """
+    root = os.path.join(get_cache_dir(), GDB_INDEX_CACHE_NAME)
+    entries = []
+    try:
+        for entry in os.scandir(root):
+            if entry.is_dir(follow_symlinks=False):
+                size = sum(f.stat().st_size for f in os.scandir(entry.path) if f.is_file(follow_symlinks=False))
+                entries.append((entry.stat().st_mtime, size, entry.path))
+    except OSError as e:
+        logging.debug(f'Failed to list the GDB index cache: {e}')
+        return
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
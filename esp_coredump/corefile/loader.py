@@ -4,38 +4,45 @@
 # SPDX-License-Identifier: Apache-2.0
 #
 
-import base64
 import binascii
 import hashlib
+import io
 import logging
+import mmap
 import os
+import shutil
 import subprocess
 import sys
 import tempfile
 import time
-from base64 import b64decode
-from typing import Optional, Tuple  # noqa: F401
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, BinaryIO, Iterator, Optional, Tuple, Union  # noqa: F401
 
 from construct import (
-    AlignedStruct,
     Bytes,
-    GreedyRange,
+    Container,
     Int32ul,
-    Padding,
     Struct,
-    abs_,
-    this,
 )
 
 from . import ESPCoreDumpLoaderError
+from .cache import get_elf_sha256
+from .codec import (
+    UINT32,
+    CoreDumpInfo,
+    EspTaskStatus,
+    MemSegmentHeader,
+    NoteHeader,
+    TaskHeader,
+    build_uint32_array,
+)
 from .elf import (
     TASK_STATUS_CORRECT,
     TASK_STATUS_TCB_CORRUPTED,
     ElfFile,
     ElfSegment,
     ESPCoreDumpElfFile,
-    EspTaskStatus,
-    NoteSection,
 )
 from .riscv import (
     Esp32C2Methods,
@@ -49,6 +56,17 @@ from .riscv import (
     Esp32P4Methods,
     Esp32S31Methods,
 )
+from .streams import (
+    COMPRESSION_MAGIC_SIZE,
+    STDIN_PATH,
+    B64Decoder,
+    PrefixedStream,
+    decode_b64_stream,
+    decompress_stream,
+    get_compression,
+    looks_like_b64,
+    open_core_file,
+)
 from .xtensa import Esp32Methods, Esp32S2Methods, Esp32S3Methods
 
 IDF_PATH = os.getenv('IDF_PATH', '')
@@ -57,6 +75,9 @@ PARTTOOL_PY = os.path.join(IDF_PATH, 'components', 'partition_table', 'parttool.
 RETRY_ATTEMPTS = 3
 RETRY_DELAY_SEC = 3
 
+# Size of the core dump body chunks fed into the checksum at once
+CHECKSUM_CHUNK_SIZE = 1024 * 1024
+
 # Following structs are based on source code
 # components/espcoredump/include_core_dump/esp_core_dump_priv.h
 
@@ -93,46 +114,169 @@ EspCoreDumpV2_2_Header = Struct(
 CRC = Int32ul
 SHA256 = Bytes(32)
 
-TaskHeader = Struct(
-    'tcb_addr' / Int32ul,
-    'stack_top' / Int32ul,
-    'stack_end' / Int32ul,
-)
-
-MemSegmentHeader = Struct(
-    'mem_start' / Int32ul,
-    'mem_sz' / Int32ul,
-    'data' / Bytes(this.mem_sz),
-)
-
-
-def get_core_file_format(core_file: str) -> str:
-    """Get format of core_file based on the header"""
-    with open(core_file, 'rb') as f:
-        coredump_bytes = f.read(16)
-
+BinTask = namedtuple('BinTask', ['tcb_addr', 'stack_top', 'stack_end', 'tcb', 'stack'])
+BinMemSegment = namedtuple('BinMemSegment', ['mem_start', 'mem_sz', 'data'])
+
+
+def _get_aligned_size(size, align_with=4):  # type: (int, int) -> int
+    return (size + align_with - 1) & ~(align_with - 1)
+
+
+class EspCoreDumpSource:
+    """
+    Core file opened for loading, ``auto`` format is detected from a bounded prefix of the file.
+
+    Nothing is read twice, so the core file may be also a pipe (e.g. stdin). The prefix read for
+    the format detection is kept in ``prefix``, for base64-encoded files it is already fed into ``b64_decoder``.
+    Compressed core files (gzip, xz, bz2 or zstd) are detected before the format and decompressed on the fly.
+    """
+
+    SNIFF_SIZE = 4096
+
+    def __init__(self, core_file, core_format='auto'):  # type: (Union[str, BinaryIO], str) -> None
+        self.path = core_file if isinstance(core_file, str) and core_file != STDIN_PATH else None
+        self.stream = open_core_file(core_file) if isinstance(core_file, str) else core_file
+        # streams opened here, which are closed in ``close``
+        self._own_streams = [self.stream] if self.path else []
+        self.prefix = self._read_prefix()
+        self.compression = get_compression(self.prefix)
+        if self.compression:
+            self.stream = decompress_stream(PrefixedStream(self.prefix, self.stream), self.compression)  # type: ignore
+            self._own_streams.insert(0, self.stream)
+            self.prefix = self._read_prefix()
+        self.b64_decoder = None  # type: Optional[B64Decoder]
+        self.format = self._detect_format() if core_format == 'auto' else core_format
+
+    def _read_prefix(self):  # type: () -> bytes
+        chunks = []
+        size = 0
+        while size < self.SNIFF_SIZE:
+            # pipes may return less than requested
+            chunk = self.stream.read(self.SNIFF_SIZE - size)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            size += len(chunk)
+        return b''.join(chunks)
+
+    def _detect_format(self):  # type: () -> str
         # Check if this is an ELF file without the core dump header (core_dump_header_t)
-        if coredump_bytes.startswith(b'\x7fELF'):
+        if self.prefix.startswith(b'\x7fELF'):
             return 'elf'
 
         # Check if this is a core dump with a core_dump_header_t header
-        core_version = EspCoreDumpVersion(int.from_bytes(coredump_bytes[4:7], 'little'))
+        core_version = EspCoreDumpVersion(int.from_bytes(self.prefix[4:7], 'little'))
         if core_version.dump_ver in EspCoreDumpLoader.CORE_VERSIONS:
             return 'raw'
 
-    # Neither of theses headers matched, so this might be a base64 encoded core dump;
-    # however in case it's just some unknown binary, ignore decoding errors.
-    with open(core_file, encoding='utf-8', errors='ignore') as c:
-        coredump_str = c.read()
-        try:
-            b64decode(coredump_str)
-        except Exception:
-            raise SystemExit(
-                'The format of the provided core-file is not recognized. '
-                'Please ensure that the core-format matches one of the following: '
-                'ELF (“elf”), raw (raw) or base64-encoded (b64) binary'
+        # Neither of theses headers matched, so this might be a base64 encoded core dump
+        if looks_like_b64(self.prefix):
+            self.b64_decoder = B64Decoder()
+            self.b64_decoder.feed(self.prefix)
+            return 'b64'
+
+        raise SystemExit(
+            'The format of the provided core-file is not recognized. '
+            'Please ensure that the core-format matches one of the following: '
+            'ELF (“elf”), raw (raw) or base64-encoded (b64) binary'
+        )
+
+    def read(self):  # type: () -> bytes
+        """
+        Read the whole (rest of) core file, including the prefix
+        """
+        return self.prefix + self.stream.read()
+
+    def decode_b64(self):  # type: () -> bytearray
+        """
+        Decode the whole (rest of) base64-encoded core file, including the prefix
+        """
+        if self.b64_decoder is None:
+            self.b64_decoder = B64Decoder()
+            self.b64_decoder.feed(self.prefix)
+        return decode_b64_stream(self.stream, decoder=self.b64_decoder)
+
+    def copy_to(self, fw):  # type: (BinaryIO) -> None
+        """
+        Copy the whole (rest of) core file, including the prefix, to the writable file object
+        """
+        fw.write(self.prefix)
+        shutil.copyfileobj(self.stream, fw)
+
+    def close(self):  # type: () -> None
+        for stream in self._own_streams:
+            stream.close()
+
+
+def get_core_file_format(core_file: Union[str, BinaryIO]) -> str:
+    """Get format of core_file based on the header, core_file is a path or binary file object"""
+    source = EspCoreDumpSource(core_file)
+    source.close()
+    return source.format
+
+
+class Crc32:
+    """Incremental CRC32 with the ``update``/``digest`` interface of ``hashlib`` objects"""
+
+    def __init__(self):  # type: () -> None
+        self.crc = 0
+
+    def update(self, data):  # type: (bytes) -> None
+        self.crc = binascii.crc32(data, self.crc)
+
+    def digest(self):  # type: () -> int
+        return self.crc & 0xFFFFFFFF
+
+
+class EspCoreDumpBinReader:
+    """
+    Walks tasks and memory segments of the binary (v0.1 - v0.3) core dump data.
+    Nothing is copied, TCBs, stacks and memory segments are slices of ``data``.
+    """
+
+    def __init__(self, data, task_num, tcbsz, segs_num=0):  # type: (memoryview, int, int, int) -> None
+        self.data = data
+        self.task_num = task_num
+        self.tcbsz = tcbsz
+        self.segs_num = segs_num
+        self._mem_segs_offset = None  # type: Optional[int]
+
+    def _check_bounds(self, end, what):  # type: (int, str) -> None
+        if end > len(self.data):
+            raise ESPCoreDumpLoaderError(f'{what} exceeds the core dump data ({end} > {len(self.data)} bytes)!')
+
+    def tasks(self):  # type: () -> Iterator[BinTask]
+        offset = 0
+        tcbsz_aligned = _get_aligned_size(self.tcbsz)
+        for i in range(self.task_num):
+            self._check_bounds(offset + TaskHeader.size, f'Task #{i} header')
+            tcb_addr, stack_top, stack_end = TaskHeader.unpack_from(self.data, offset)
+            stack_len = abs(stack_top - stack_end)
+            tcb_offset = offset + TaskHeader.size
+            stack_offset = tcb_offset + tcbsz_aligned
+            self._check_bounds(stack_offset + stack_len, f'Task #{i} stack')
+            yield BinTask(
+                tcb_addr,
+                stack_top,
+                stack_end,
+                self.data[tcb_offset : tcb_offset + self.tcbsz],
+                self.data[stack_offset : stack_offset + stack_len],
             )
-        return 'b64'
+            offset = stack_offset + _get_aligned_size(stack_len)
+        self._mem_segs_offset = offset
+
+    def mem_segments(self):  # type: () -> Iterator[BinMemSegment]
+        if self._mem_segs_offset is None:
+            for _ in self.tasks():
+                pass
+        offset = self._mem_segs_offset  # type: int  # type: ignore
+        for i in range(self.segs_num):
+            self._check_bounds(offset + MemSegmentHeader.size, f'Memory segment #{i} header')
+            mem_start, mem_sz = MemSegmentHeader.unpack_from(self.data, offset)
+            offset += MemSegmentHeader.size
+            self._check_bounds(offset + mem_sz, f'Memory segment #{i}')
+            yield BinMemSegment(mem_start, mem_sz, self.data[offset : offset + mem_sz])
+            offset += mem_sz
 
 
 class EspCoreDumpVersion:
@@ -222,13 +366,22 @@ class EspCoreDumpLoader(EspCoreDumpVersion):
         ELF_SHA256_V2_2,
     ]
 
-    def __init__(self):  # type: () -> None
+    def __init__(self, trusted_source=False, optimize_layout=False):  # type: (bool, bool) -> None
         super().__init__()
+        # Checksum of a trusted source is validated in the background while the core file is created
+        self.trusted_source = trusted_source
+        # load segments of the core ELF are coalesced, sorted and page-aligned
+        self.optimize_layout = optimize_layout
         self.core_src_file = None  # type: Optional[str]
-        self.core_src_struct = None
+        # core dump image which is already in memory, ``self.core_src_file`` is mapped otherwise
+        self.core_src_data = None  # type: Optional[bytes]
         self.core_src = None
+        self._core_src_mmap = None  # type: Optional[mmap.mmap]
 
         self.core_elf_file: str = None  # type: ignore
+        self.core_elf = None  # type: Optional[ESPCoreDumpElfFile]
+        # ELF core dump which is not modified during conversion is written out as is
+        self._core_elf_data = None  # type: Optional[bytes]
 
         self.header = None
         self.header_struct = EspCoreDumpV1Header
@@ -248,16 +401,59 @@ class EspCoreDumpLoader(EspCoreDumpVersion):
         self.temp_files.append(t.name)
         return t.name
 
+    def _map_core_src_file(self):  # type: () -> memoryview
+        """
+        Map ``self.core_src_file`` into memory read-only, so the dump is never copied
+        """
+        with open(self.core_src_file, 'rb') as fr:  # type: ignore
+            try:
+                self._core_src_mmap = mmap.mmap(fr.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # mmap refuses to map empty files
+                raise ESPCoreDumpLoaderError(f'Core dump file "{self.core_src_file}" is empty!')
+        return memoryview(self._core_src_mmap)
+
+    def __enter__(self):  # type: () -> EspCoreDumpLoader
+        return self
+
+    def __exit__(self, *_):  # type: (Any) -> None
+        self.close()
+
+    def close(self):  # type: () -> None
+        """
+        Unmap the core dump source file, the core ELF created from it must not be used after it.
+        The core dump which was already in memory is kept.
+        """
+        if self._core_src_mmap is None:
+            return
+        # the core ELF and the core dump data are slices of the mapped file
+        if self.core_elf is not None:
+            self.core_elf.close()
+        if self.core_src is not None and isinstance(self.core_src.data, memoryview):
+            self.core_src.data.release()
+        self._core_elf_data = None
+        try:
+            self._core_src_mmap.close()
+        except BufferError:
+            # a slice of the data is still referenced outside, the file is unmapped when it is released
+            logging.debug('Core dump file is still referenced, it is not unmapped now')
+        self._core_src_mmap = None
+
     def _load_core_src(self):  # type: () -> str
         """
         Write core elf into ``self.core_src``,
         Return the target str by reading core elf
+
+        Header, data and checksum of ``self.core_src`` are slices of the mapped source file.
         """
-        with open(self.core_src_file, 'rb') as fr:  # type: ignore
-            coredump_bytes = fr.read()
+        if self.core_src_data is not None:
+            coredump_bytes = memoryview(self.core_src_data)
+        else:
+            coredump_bytes = self._map_core_src_file()
+        if len(coredump_bytes) < EspCoreDumpV1Header.sizeof():
+            raise ESPCoreDumpLoaderError(f'Core dump is too short: {len(coredump_bytes)} bytes!')
 
-        _header = EspCoreDumpV1Header.parse(coredump_bytes)  # first we use V1 format to get version
-        self.set_version(_header.ver)
+        self.set_version(int.from_bytes(coredump_bytes[4:8], 'little'))
         if self.dump_ver == self.ELF_CRC32_V2:
             self.checksum_struct = CRC
             self.header_struct = EspCoreDumpV2Header
@@ -285,14 +481,18 @@ class EspCoreDumpLoader(EspCoreDumpVersion):
         else:
             raise ESPCoreDumpLoaderError(f'Core dump version "0x{self.dump_ver:x}" is not supported!')
 
-        self.header = self.header_struct.parse(coredump_bytes)
-
-        self.core_src_struct = Struct(
-            'header' / self.header_struct,
-            'data' / Bytes(this.header.tot_len - self.header_struct.sizeof() - self.checksum_struct.sizeof()),
-            'checksum' / self.checksum_struct,
+        header_size = self.header_struct.sizeof()
+        checksum_size = self.checksum_struct.sizeof()
+        self.header = self.header_struct.parse(coredump_bytes[:header_size])
+        tot_len = self.header.tot_len  # type: ignore
+        if not header_size + checksum_size <= tot_len <= len(coredump_bytes):
+            raise ESPCoreDumpLoaderError(f'Invalid core dump length {tot_len}, the image has {len(coredump_bytes)} bytes!')
+
+        self.core_src = Container(
+            header=self.header,
+            data=coredump_bytes[header_size : tot_len - checksum_size],
+            checksum=self.checksum_struct.parse(coredump_bytes[tot_len - checksum_size : tot_len]),
         )
-        self.core_src = self.core_src_struct.parse(coredump_bytes)  # type: ignore
 
         if self.header and self.header.get('chip_rev') is not None:
             self.chip_rev = self.header.chip_rev  # type: ignore
@@ -341,54 +541,76 @@ class EspCoreDumpLoader(EspCoreDumpVersion):
         elif self.checksum_struct == SHA256:
             self._sha256_validate()
 
+    def _calc_checksum(self):  # type: () -> Union[int, bytes]
+        """
+        Calculate the checksum of the core dump header and data without concatenating them
+        """
+        checksum = Crc32() if self.checksum_struct == CRC else hashlib.sha256()  # type: Union[Crc32, hashlib._Hash]
+        checksum.update(self.header_struct.build(self.core_src.header))  # type: ignore
+        data = self.core_src.data  # type: ignore
+        for offset in range(0, len(data), CHECKSUM_CHUNK_SIZE):
+            checksum.update(data[offset : offset + CHECKSUM_CHUNK_SIZE])
+        return checksum.digest()
+
     def _crc_validate(self):  # type: () -> None
-        if self.dump_ver in [self.BIN_V2_1, self.ELF_CRC32_V2_1]:
-            data_crc = (
-                binascii.crc32(
-                    EspCoreDumpV2_1_Header.build(self.core_src.header)  # type: ignore
-                    + self.core_src.data  # type: ignore
-                )
-                & 0xFFFFFFFF
-            )
-        else:
-            data_crc = (
-                binascii.crc32(
-                    EspCoreDumpV2Header.build(self.core_src.header) + self.core_src.data  # type: ignore
-                )
-                & 0xFFFFFFFF
-            )
+        data_crc = self._calc_checksum()
         if data_crc != self.core_src.checksum:  # type: ignore
             raise ESPCoreDumpLoaderError(
                 f'Invalid core dump CRC {data_crc:x}, should be {self.core_src.checksum:x}'  # type: ignore
             )
 
     def _sha256_validate(self):  # type: () -> None
-        if self.dump_ver in [self.ELF_SHA256_V2_1]:
-            data_sha256 = hashlib.sha256(
-                EspCoreDumpV2_1_Header.build(self.core_src.header) + self.core_src.data  # type: ignore
-            )
-        elif self.dump_ver in [self.ELF_SHA256_V2_2]:
-            data_sha256 = hashlib.sha256(
-                EspCoreDumpV2_2_Header.build(self.core_src.header) + self.core_src.data  # type: ignore
-            )
-        else:
-            data_sha256 = hashlib.sha256(
-                EspCoreDumpV2Header.build(self.core_src.header) + self.core_src.data  # type: ignore
-            )
-
-        data_sha256_str = data_sha256.hexdigest()
+        data_sha256_str = binascii.hexlify(self._calc_checksum()).decode('ascii')  # type: ignore
         sha256_str = binascii.hexlify(self.core_src.checksum).decode('ascii')  # type: ignore
         if data_sha256_str != sha256_str:
             raise ESPCoreDumpLoaderError(f'Invalid core dump SHA256 "{data_sha256_str}", should be "{sha256_str}"')
 
-    def create_corefile(self, exe_name=None, e_machine=ESPCoreDumpElfFile.EM_XTENSA):
-        # type: (Optional[str], Optional[int]) -> None
+    def create_corefile(self, exe_name=None, e_machine=ESPCoreDumpElfFile.EM_XTENSA, output=None):
+        # type: (Optional[str], Optional[int], Union[str, BinaryIO, None]) -> None
         """
         Creates core dump ELF file
+
+        The core ELF is written to ``output`` (file path or writable binary file object).
+        If ``output`` is not specified, it is written to a temporary file, see ``self.core_elf_file``.
+        """
+        if not self.trusted_source:
+            self._validate_dump_file()
+            self._convert_corefile(exe_name, e_machine)
+        else:
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                validation = executor.submit(self._validate_dump_file)
+                self._convert_corefile(exe_name, e_machine)
+                validation.result()
+
+        if output is None:
+            output = self.core_elf_file = self._create_temp_file()
+        elif isinstance(output, str):
+            self.core_elf_file = output
+        self._write_corefile(output)
+
+    def get_corefile_bytes(self, exe_name=None, e_machine=ESPCoreDumpElfFile.EM_XTENSA):
+        # type: (Optional[str], Optional[int]) -> bytes
+        """
+        Creates core dump ELF in memory, no files are created
         """
-        self._validate_dump_file()
-        self.core_elf_file = self._create_temp_file()
+        output = io.BytesIO()
+        self.create_corefile(exe_name, e_machine, output)
+        return output.getvalue()
+
+    def _write_corefile(self, output):  # type: (Union[str, BinaryIO]) -> None
+        if self._core_elf_data is None:
+            self.core_elf.dump(output, page_align=self.optimize_layout)  # type: ignore
+        elif isinstance(output, str):
+            with open(output, 'wb') as fw:
+                fw.write(self._core_elf_data)
+        else:
+            output.write(self._core_elf_data)
 
+    def _convert_corefile(self, exe_name=None, e_machine=ESPCoreDumpElfFile.EM_XTENSA):
+        # type: (Optional[str], Optional[int]) -> None
+        """
+        Converts the core dump into ``self.core_elf``
+        """
         if self.dump_ver in [
             self.ELF_CRC32_V2,
             self.ELF_CRC32_V2_1,
@@ -402,131 +624,125 @@ class EspCoreDumpLoader(EspCoreDumpVersion):
         else:
             raise NotImplementedError
 
+        if self.optimize_layout:
+            self.core_elf.coalesce_load_segments()  # type: ignore
+            self._core_elf_data = None
+
     def _extract_elf_corefile(self, exe_name=None, e_machine=ESPCoreDumpElfFile.EM_XTENSA):
         # type: (Optional[str], Optional[int]) -> None
         """
         Reads the ELF formatted core dump image and parse it
         """
-        with open(self.core_elf_file, 'wb') as fw:
-            fw.write(self.core_src.data)  # type: ignore
-
-        core_elf = ESPCoreDumpElfFile(self.core_elf_file, e_machine=e_machine)  # type: ignore
+        core_elf = ESPCoreDumpElfFile(e_machine=e_machine)  # type: ignore
+        core_elf.read_elf_bytes(self.core_src.data)  # type: ignore
+        self.core_elf = core_elf
+        self._core_elf_data = self.core_src.data  # type: ignore
 
         if self.chip_rev is not None:  # type: ignore
             chip_rev_note = b''
             chip_rev_note += self._build_note_section(
                 'ESP_CHIP_REV',
                 ESPCoreDumpElfFile.PT_ESP_INFO,
-                Int32ul.build(self.chip_rev),  # type: ignore
+                UINT32.pack(self.chip_rev),  # type: ignore
             )
             try:
                 core_elf.add_segment(0, chip_rev_note, ElfFile.PT_NOTE, 0)
             except ESPCoreDumpLoaderError as e:
                 logging.warning(f'Skip core dump info NOTES segment {len(chip_rev_note)} bytes @ 0x0. (Reason: {e})')
-            core_elf.dump(self.core_elf_file)
+            self._core_elf_data = None
 
         # Read note segments from core file which are belong to tasks (TCB or stack)
-        for seg in core_elf.note_segments:
-            for note_sec in seg.note_secs:
-                # Check for version info note
-                if note_sec.name == b'ESP_CORE_DUMP_INFO' and note_sec.type == ESPCoreDumpElfFile.PT_ESP_INFO and exe_name:
-                    exe_elf = ElfFile(exe_name)
-                    app_sha256 = binascii.hexlify(exe_elf.sha256)
-                    coredump_sha256_struct = Struct(
-                        'ver' / Int32ul,
-                        'sha256' / Bytes(64),  # SHA256 as hex string
+        for note_sec in core_elf.get_notes(ESPCoreDumpElfFile.PT_ESP_INFO, b'ESP_CORE_DUMP_INFO'):
+            # Check for version info note
+            if exe_name:
+                app_sha256 = binascii.hexlify(get_elf_sha256(exe_name))
+                coredump_sha256 = CoreDumpInfo.parse(note_sec.desc)
+
+                logging.debug(f'App SHA256: {app_sha256!r}')
+                logging.debug(f'Core dump SHA256: {coredump_sha256!r}')
+
+                # Actual coredump SHA may be shorter than a full SHA256 hash
+                # with NUL byte padding, according to the app's
+                # APP_RETRIEVE_LEN_ELF_SHA length
+                core_sha_trimmed = coredump_sha256.sha256.rstrip(b'\x00').decode()
+                app_sha_trimmed = app_sha256[: len(core_sha_trimmed)].decode()
+
+                if core_sha_trimmed != app_sha_trimmed:
+                    raise ESPCoreDumpLoaderError(
+                        f'Invalid application image for coredump: coredump SHA256({core_sha_trimmed}) != app SHA256({app_sha_trimmed}).'
+                    )
+                if coredump_sha256.ver != self.version:
+                    raise ESPCoreDumpLoaderError(
+                        f'Invalid application image for coredump: coredump SHA256 version({coredump_sha256.ver}) != app SHA256 version({self.version}).'
                     )
-                    coredump_sha256 = coredump_sha256_struct.parse(note_sec.desc[: coredump_sha256_struct.sizeof()])
-
-                    logging.debug(f'App SHA256: {app_sha256!r}')
-                    logging.debug(f'Core dump SHA256: {coredump_sha256!r}')
-
-                    # Actual coredump SHA may be shorter than a full SHA256 hash
-                    # with NUL byte padding, according to the app's
-                    # APP_RETRIEVE_LEN_ELF_SHA length
-                    core_sha_trimmed = coredump_sha256.sha256.rstrip(b'\x00').decode()
-                    app_sha_trimmed = app_sha256[: len(core_sha_trimmed)].decode()
-
-                    if core_sha_trimmed != app_sha_trimmed:
-                        raise ESPCoreDumpLoaderError(
-                            f'Invalid application image for coredump: coredump SHA256({core_sha_trimmed}) != app SHA256({app_sha_trimmed}).'
-                        )
-                    if coredump_sha256.ver != self.version:
-                        raise ESPCoreDumpLoaderError(
-                            f'Invalid application image for coredump: coredump SHA256 version({coredump_sha256.ver}) != app SHA256 version({self.version}).'
-                        )
 
     @staticmethod
     def _get_aligned_size(size, align_with=4):  # type: (int, int) -> int
-        if size % align_with:
-            return align_with * (size // align_with + 1)
-        return size
+        return _get_aligned_size(size, align_with)
 
     @staticmethod
-    def _build_note_section(name, sec_type, desc):  # type: (str, int, str) -> bytes
-        b_name = bytearray(name, encoding='ascii') + b'\0'
-        return NoteSection.build(  # type: ignore
-            {
-                'namesz': len(b_name),
-                'descsz': len(desc),
-                'type': sec_type,
-                'name': b_name,
-                'desc': desc,
-            }
-        )
+    def _build_note_section(name, sec_type, desc):  # type: (str, int, bytes) -> bytes
+        return b''.join(EspCoreDumpLoader._build_note_section_parts(name, sec_type, desc))
+
+    @staticmethod
+    def _build_note_section_parts(name, sec_type, desc):  # type: (str, int, bytes) -> list[bytes]
+        """
+        Build note section as a list of chunks, so many notes can be joined at once
+        """
+        b_name = name.encode('ascii') + b'\0'
+        return [
+            NoteHeader.pack(len(b_name), len(desc), sec_type),
+            b_name,
+            bytes(-len(b_name) % 4),
+            desc,
+            bytes(-len(desc) % 4),
+        ]
 
     def _extract_bin_corefile(self, e_machine=ESPCoreDumpElfFile.EM_XTENSA):  # type: (Optional[int]) -> None
         """
         Creates core dump ELF file
         """
-        coredump_data_struct = Struct(
-            'tasks'
-            / GreedyRange(
-                AlignedStruct(
-                    4,
-                    'task_header' / TaskHeader,
-                    'tcb' / Bytes(self.header.tcbsz),  # type: ignore
-                    'stack' / Bytes(abs_(this.task_header.stack_top - this.task_header.stack_end)),  # type: ignore
-                )
-            ),
-            'mem_seg_headers' / MemSegmentHeader[self.core_src.header.segs_num],  # type: ignore
+        reader = EspCoreDumpBinReader(
+            self.core_src.data,  # type: ignore
+            self.header.task_num,  # type: ignore
+            self.header.tcbsz,  # type: ignore
+            self.header.get('segs_num', 0),  # type: ignore
         )
         core_elf = ESPCoreDumpElfFile(e_machine=e_machine)
-        notes = b''
-        core_dump_info_notes = b''
-        task_info_notes = b''
+        notes = []  # type: list[bytes]
+        core_dump_info_notes = []  # type: list[bytes]
+        task_info_notes = []  # type: list[bytes]
 
-        coredump_data = coredump_data_struct.parse(self.core_src.data)  # type: ignore
-        for i, task in enumerate(coredump_data.tasks):
-            stack_len_aligned = self._get_aligned_size(abs(task.task_header.stack_top - task.task_header.stack_end))
+        for i, task in enumerate(reader.tasks()):
+            stack_len_aligned = self._get_aligned_size(len(task.stack))
             task_status_kwargs = {
                 'task_index': i,
                 'task_flags': TASK_STATUS_CORRECT,
-                'task_tcb_addr': task.task_header.tcb_addr,
-                'task_stack_start': min(task.task_header.stack_top, task.task_header.stack_end),
-                'task_stack_end': max(task.task_header.stack_top, task.task_header.stack_end),
+                'task_tcb_addr': task.tcb_addr,
+                'task_stack_start': min(task.stack_top, task.stack_end),
+                'task_stack_end': max(task.stack_top, task.stack_end),
                 'task_stack_len': stack_len_aligned,
-                'task_name': Padding(16).build({}),  # currently we don't have task_name, keep it as padding
+                'task_name': bytes(16),  # currently we don't have task_name, keep it as padding
             }
 
             # Write TCB
             try:
                 if self.target_methods.tcb_is_sane(
-                    task.task_header.tcb_addr,
+                    task.tcb_addr,
                     self.header.tcbsz,  # type: ignore
                 ):
                     core_elf.add_segment(
-                        task.task_header.tcb_addr,
+                        task.tcb_addr,
                         task.tcb,
                         ElfFile.PT_LOAD,
                         ElfSegment.PF_R | ElfSegment.PF_W,
                     )
-                elif task.task_header.tcb_addr and self.target_methods.addr_is_fake(task.task_header.tcb_addr):
+                elif task.tcb_addr and self.target_methods.addr_is_fake(task.tcb_addr):
                     task_status_kwargs['task_flags'] |= TASK_STATUS_TCB_CORRUPTED
             except ESPCoreDumpLoaderError as e:
                 logging.warning(
                     f'Skip TCB {self.header.tcbsz} bytes '  # type: ignore
-                    f'@ 0x{task.task_header.tcb_addr:x}. (Reason: {e})'
+                    f'@ 0x{task.tcb_addr:x}. (Reason: {e})'
                 )
 
             # Write stack
@@ -557,29 +773,29 @@ class EspCoreDumpLoader(EspCoreDumpVersion):
                 )
 
             try:
-                logging.debug(f'Stack start_end: 0x{task.task_header.stack_top:x} @ 0x{task.task_header.stack_end:x}')
-                task_regs, extra_regs = self.target_methods.get_registers_from_stack(task.stack, task.task_header.stack_end > task.task_header.stack_top)
+                logging.debug(f'Stack start_end: 0x{task.stack_top:x} @ 0x{task.stack_end:x}')
+                task_regs, extra_regs = self.target_methods.get_registers_from_stack(task.stack, task.stack_end > task.stack_top)
             except Exception as e:
                 raise ESPCoreDumpLoaderError(str(e))
 
-            task_info_notes += self._build_note_section(
+            task_info_notes += self._build_note_section_parts(
                 'TASK_INFO',
                 ESPCoreDumpElfFile.PT_ESP_TASK_INFO,
                 EspTaskStatus.build(task_status_kwargs),
             )
-            notes += self._build_note_section(
+            notes += self._build_note_section_parts(
                 'CORE',
                 ElfFile.PT_LOAD,
-                self.target_methods.build_prstatus_data(task.task_header.tcb_addr, task_regs),
+                self.target_methods.build_prstatus_data(task.tcb_addr, task_regs),
             )
 
             if len(core_dump_info_notes) == 0:  # the first task is the crashed task
-                core_dump_info_notes += self._build_note_section(
+                core_dump_info_notes += self._build_note_section_parts(
                     'ESP_CORE_DUMP_INFO',
                     ESPCoreDumpElfFile.PT_ESP_INFO,
-                    Int32ul.build(self.header.ver),  # type: ignore
+                    UINT32.pack(self.header.ver),  # type: ignore
                 )
-                _regs = [task.task_header.tcb_addr]
+                _regs = [task.tcb_addr]
 
                 # For xtensa, we need to put the exception registers into the extra
                 # info as well
@@ -587,49 +803,44 @@ class EspCoreDumpLoader(EspCoreDumpVersion):
                     for reg_id in extra_regs:
                         _regs.extend([reg_id, extra_regs[reg_id]])
 
-                core_dump_info_notes += self._build_note_section(
+                core_dump_info_notes += self._build_note_section_parts(
                     'EXTRA_INFO',
                     ESPCoreDumpElfFile.PT_ESP_EXTRA_INFO,
-                    Int32ul[len(_regs)].build(_regs),
+                    build_uint32_array(_regs),
                 )
 
         if self.dump_ver == self.BIN_V2:
-            for header in coredump_data.mem_seg_headers:
-                logging.debug(f'Read memory segment {header.mem_sz} bytes @ 0x{header.mem_start:x}')
+            for mem_seg in reader.mem_segments():
+                logging.debug(f'Read memory segment {mem_seg.mem_sz} bytes @ 0x{mem_seg.mem_start:x}')
                 core_elf.add_segment(
-                    header.mem_start,
-                    header.data,
+                    mem_seg.mem_start,
+                    mem_seg.data,
                     ElfFile.PT_LOAD,
                     ElfSegment.PF_R | ElfSegment.PF_W,
                 )
 
         # add notes
-        try:
-            core_elf.add_segment(0, notes, ElfFile.PT_NOTE, 0)
-        except ESPCoreDumpLoaderError as e:
-            logging.warning(f'Skip NOTES segment {len(notes)} bytes @ 0x0. (Reason: {e})')
-        # add core dump info notes
-        try:
-            core_elf.add_segment(0, core_dump_info_notes, ElfFile.PT_NOTE, 0)
-        except ESPCoreDumpLoaderError as e:
-            logging.warning(f'Skip core dump info NOTES segment {len(core_dump_info_notes)} bytes @ 0x0. (Reason: {e})')
-        try:
-            core_elf.add_segment(0, task_info_notes, ElfFile.PT_NOTE, 0)
-        except ESPCoreDumpLoaderError as e:
-            logging.warning(f'Skip failed tasks info NOTES segment {len(task_info_notes)} bytes @ 0x0. (Reason: {e})')
-        # dump core ELF
+        for notes_name, notes_data in [
+            ('NOTES', b''.join(notes)),
+            ('core dump info NOTES', b''.join(core_dump_info_notes)),
+            ('failed tasks info NOTES', b''.join(task_info_notes)),
+        ]:
+            try:
+                core_elf.add_segment(0, notes_data, ElfFile.PT_NOTE, 0)
+            except ESPCoreDumpLoaderError as e:
+                logging.warning(f'Skip {notes_name} segment {len(notes_data)} bytes @ 0x0. (Reason: {e})')
         core_elf.e_type = ElfFile.ET_CORE
-        core_elf.dump(self.core_elf_file)  # type: ignore
+        self.core_elf = core_elf
 
 
 class ESPCoreDumpFlashLoader(EspCoreDumpLoader):
     ESP_COREDUMP_PART_TABLE_OFF = 0x8000
 
-    def __init__(self, offset, target=None, port=None, baud=None, part_table_offset=0x8000):
-        # type: (Optional[int], Optional[str], Optional[str], Optional[int], Optional[int]) -> None
+    def __init__(self, offset, target=None, port=None, baud=None, part_table_offset=0x8000, trusted_source=False, optimize_layout=False):
+        # type: (Optional[int], Optional[str], Optional[str], Optional[int], Optional[int], bool, bool) -> None
         # TODO in next major release drop offset argument and use just parttool to find
         # offset of coredump partition
-        super().__init__()
+        super().__init__(trusted_source, optimize_layout)
         self.port = port
         self.baud = baud
         self.part_table_offset = part_table_offset
@@ -756,27 +967,37 @@ class ESPCoreDumpFlashLoader(EspCoreDumpLoader):
 
 
 class ESPCoreDumpFileLoader(EspCoreDumpLoader):
-    def __init__(self, path, is_b64=False):  # type: (str, bool) -> None
-        super().__init__()
+    def __init__(self, path, is_b64=False, trusted_source=False, optimize_layout=False):
+        # type: (Union[str, bytes, BinaryIO, EspCoreDumpSource], bool, bool, bool) -> None
+        """
+        :param path: core dump file path (``-`` for stdin), bytes-like object with the core dump, readable binary file object
+                     or already opened ``EspCoreDumpSource``
+        :param is_b64: core dump is base64-encoded
+        :param trusted_source: validate the checksum in the background, see ``EspCoreDumpLoader``
+        :param optimize_layout: write load segments sorted, coalesced and page-aligned, see ``EspCoreDumpLoader``
+        """
+        super().__init__(trusted_source, optimize_layout)
         self.is_b64 = is_b64
 
         self._get_core_src(path)
         self.target = self._load_core_src()
 
-    def _get_core_src(self, path):  # type: (str) -> None
+    def _get_core_src(self, path):  # type: (Union[str, bytes, BinaryIO, EspCoreDumpSource]) -> None
         """
-        Loads core dump from (raw binary or base64-encoded) file
+        Loads core dump from (raw binary or base64-encoded, optionally compressed) file
         """
-        logging.debug('Load core dump from "%s", %s format', path, 'b64' if self.is_b64 else 'raw')
-        if not self.is_b64:
-            self.core_src_file = path
-        else:
-            self.core_src_file = self._create_temp_file()
-            with open(self.core_src_file, 'wb') as fw:
-                with open(path, 'rb') as fb64:
-                    while True:
-                        line = fb64.readline()
-                        if len(line) == 0:
-                            break
-                        data = base64.standard_b64decode(line.rstrip(b'\r\n'))
-                        fw.write(data)  # type: ignore
+        logging.debug('Load core dump from "%s", %s format', path if isinstance(path, str) else type(path).__name__, 'b64' if self.is_b64 else 'raw')
+        if isinstance(path, (bytes, bytearray, memoryview)):
+            if not get_compression(bytes(path[:COMPRESSION_MAGIC_SIZE])):
+                self.core_src_data = decode_b64_stream(io.BytesIO(path)) if self.is_b64 else path  # type: ignore
+                return
+            path = io.BytesIO(path)
+        source = path if isinstance(path, EspCoreDumpSource) else EspCoreDumpSource(path, 'b64' if self.is_b64 else 'raw')  # type: ignore
+        try:
+            if source.path and not source.compression and not self.is_b64:
+                # no need to read the file, it is mapped
+                self.core_src_file = source.path
+            else:
+                self.core_src_data = source.decode_b64() if self.is_b64 else source.read()  # type: ignore
+        finally:
+            source.close()
@@ -6,9 +6,8 @@
 
 from typing import Any, Optional, Tuple  # noqa: F401
 
-from construct import Int16ul, Int32ul, Padding, Struct
-
 from . import BaseArchMethodsMixin, BaseTargetMethods, ESPCoreDumpLoaderError
+from .codec import StructCodec
 
 RISCV_GP_REGS_COUNT = 32
 PRSTATUS_SIZE = 204
@@ -17,22 +16,27 @@ PRSTATUS_OFFSET_PR_PID = 24
 PRSTATUS_OFFSET_PR_REG = 72
 ELF_GREGSET_T_SIZE = 128
 
-PrStruct = Struct(
-    Padding(PRSTATUS_OFFSET_PR_CURSIG),
-    'pr_cursig' / Int16ul,
-    Padding(PRSTATUS_OFFSET_PR_PID - PRSTATUS_OFFSET_PR_CURSIG - Int16ul.sizeof()),
-    'pr_pid' / Int32ul,
-    Padding(PRSTATUS_OFFSET_PR_REG - PRSTATUS_OFFSET_PR_PID - Int32ul.sizeof()),
-    'regs' / Int32ul[RISCV_GP_REGS_COUNT],
-    Padding(PRSTATUS_SIZE - PRSTATUS_OFFSET_PR_REG - ELF_GREGSET_T_SIZE),
+PrStruct = StructCodec(
+    'PrStruct',
+    [
+        (None, f'{PRSTATUS_OFFSET_PR_CURSIG}x'),
+        ('pr_cursig', 'H'),
+        (None, f'{PRSTATUS_OFFSET_PR_PID - PRSTATUS_OFFSET_PR_CURSIG - 2}x'),
+        ('pr_pid', 'I'),
+        (None, f'{PRSTATUS_OFFSET_PR_REG - PRSTATUS_OFFSET_PR_PID - 4}x'),
+        ('regs', f'{RISCV_GP_REGS_COUNT}I'),
+        (None, f'{PRSTATUS_SIZE - PRSTATUS_OFFSET_PR_REG - ELF_GREGSET_T_SIZE}x'),
+    ],
 )
 
+GpRegs = StructCodec('GpRegs', [('regs', f'{RISCV_GP_REGS_COUNT}I')])
+
 
 class RiscvMethodsMixin(BaseArchMethodsMixin):
     @staticmethod
     def get_registers_from_stack(data, grows_down):
         # type: (bytes, bool) -> Tuple[list[int], Optional[dict[int, int]]]
-        regs = Int32ul[RISCV_GP_REGS_COUNT].parse(data)
+        regs = list(GpRegs.unpack_from(data))
         if not grows_down:
             raise ESPCoreDumpLoaderError('Growing up stacks are not supported for now!')
         return regs, None
@@ -0,0 +1,260 @@
+#
+# SPDX-FileCopyrightText: 2026 Espressif Systems (Shanghai) CO LTD
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+import binascii
+import bz2
+import gzip
+import io
+import lzma
+import re
+import sys
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Optional, Union  # noqa: F401
+
+from . import ESPCoreDumpLoaderError
+
+# Core file path which stands for the standard input
+STDIN_PATH = '-'
+
+B64_CHUNK_SIZE = 64 * 1024
+
+# Magic numbers of the supported compressed containers
+GZIP_MAGIC = b'\x1f\x8b'
+XZ_MAGIC = b'\xfd7zXZ\x00'
+BZ2_MAGIC = b'BZh'
+# "BZh" followed by the block size digit and the block magic (BCD of pi), base64 text may start with "BZh" too
+BZ2_BLOCK_MAGIC = b'\x31\x41\x59\x26\x53\x59'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+COMPRESSION_MAGIC_SIZE = 10
+
+# Markers printed by ESP-IDF around the base64-encoded core dump
+CORE_DUMP_START_MARKER = b'CORE DUMP START'
+CORE_DUMP_END_MARKER = b'CORE DUMP END'
+
+# log prefixes which are ignored before the base64 data: ANSI colors, timestamps of the monitor ("[12:00:01.123]",
+# "2024-01-01 12:00:01") and ESP-IDF log headers ("I (339) tag: ")
+B64_LOG_PREFIX_RE = re.compile(rb'(?:\x1b\[[0-9;]*m|\[[0-9:.]+\] ?|\d{4}-\d\d-\d\d \d\d:\d\d:\d\d(?:\.\d+)? ?|[EWIDV] \(\d+\) [^:\s]+: )*')
+# base64 data of a line after the log prefix, followed by ANSI color reset at most
+B64_LINE_DATA_RE = re.compile(rb'((?:[A-Za-z0-9+/]+={0,2})?)(?:\x1b\[[0-9;]*m)*')
+B64_CHARS_RE = re.compile(rb'[A-Za-z0-9+/]*')
+# control characters which never appear in a text log, except for tab, CR, LF and ESC (ANSI colors)
+B64_NON_TEXT_RE = re.compile(rb'[\x00-\x08\x0b\x0c\x0e-\x1a\x1c-\x1f]')
+
+
+def get_b64_line_data(line):  # type: (Union[bytes, bytearray]) -> Optional[Union[bytes, bytearray]]
+    """
+    Base64 data of the line (without the line ending), None if the line has anything else than a known log prefix and the data,
+    empty if it has only the prefix
+    """
+    match = B64_LINE_DATA_RE.fullmatch(line, B64_LOG_PREFIX_RE.match(line).end())  # type: ignore
+    return match.group(1) if match else None
+
+
+def looks_like_b64(text):  # type: (bytes) -> bool
+    """
+    Cheap check whether the beginning of a file is base64-encoded core dump (or log with it), nothing is decoded
+    """
+    if B64_NON_TEXT_RE.search(text):
+        return False
+    if CORE_DUMP_START_MARKER in text:
+        return True
+    # the last line may be incomplete
+    lines = text.splitlines()[:-1] or [text]
+    for line in lines:
+        data = get_b64_line_data(line.rstrip())
+        if data and len(data) % 4 == 0:
+            return True
+    return False
+
+
+def open_core_file(core_file):  # type: (str) -> BinaryIO
+    """
+    Open core file for binary reading, ``-`` stands for the standard input
+    """
+    if core_file == STDIN_PATH:
+        return sys.stdin.buffer
+    return open(core_file, 'rb')
+
+
+def get_compression(prefix):  # type: (bytes) -> Optional[str]
+    """
+    Detect compressed container from the first ``COMPRESSION_MAGIC_SIZE`` bytes of a file.
+    :return: ``gzip``, ``xz``, ``bz2``, ``zstd`` or None if the data are not compressed
+    """
+    if prefix.startswith(GZIP_MAGIC):
+        return 'gzip'
+    if prefix.startswith(XZ_MAGIC):
+        return 'xz'
+    if prefix.startswith(BZ2_MAGIC) and prefix[3:4].isdigit() and prefix[4:10] == BZ2_BLOCK_MAGIC:
+        return 'bz2'
+    if prefix.startswith(ZSTD_MAGIC):
+        return 'zstd'
+    return None
+
+
+class PrefixedStream(io.RawIOBase):
+    """
+    Non-seekable binary stream with its already read beginning put back
+    """
+
+    def __init__(self, prefix, stream):  # type: (bytes, BinaryIO) -> None
+        super().__init__()
+        self._prefix = memoryview(prefix)
+        self._stream = stream
+
+    def readable(self):  # type: () -> bool
+        return True
+
+    def readinto(self, b):  # type: ignore
+        if self._prefix:
+            size = min(len(b), len(self._prefix))
+            b[:size] = self._prefix[:size]
+            self._prefix = self._prefix[size:]
+            return size
+        data = self._stream.read(len(b))
+        b[: len(data)] = data
+        return len(data)
+
+
+def decompress_stream(stream, compression):  # type: (BinaryIO, str) -> BinaryIO
+    """
+    Wrap the stream with decompressor of the given container, see ``get_compression``.
+    Data are decompressed on the fly, closing the returned stream doesn't close the wrapped one.
+    """
+    if compression == 'gzip':
+        return gzip.GzipFile(fileobj=stream, mode='rb')  # type: ignore
+    if compression == 'xz':
+        return lzma.LZMAFile(stream)  # type: ignore
+    if compression == 'bz2':
+        return bz2.BZ2File(stream)  # type: ignore
+    try:
+        import zstandard
+    except ImportError:
+        raise ESPCoreDumpLoaderError(
+            'Reading of zstd compressed files requires the "zstandard" package, please install it by running "python -m pip install zstandard"'
+        )
+    return zstandard.ZstdDecompressor().stream_reader(stream, closefd=False)  # type: ignore
+
+
+def is_compressed_file(path):  # type: (str) -> bool
+    with open(path, 'rb') as f:
+        return get_compression(f.read(COMPRESSION_MAGIC_SIZE)) is not None
+
+
+@contextmanager
+def open_decompressed(path):  # type: (str) -> Iterator[BinaryIO]
+    """
+    Open file for binary reading, compressed files are transparently decompressed
+    """
+    with open(path, 'rb') as f:
+        compression = get_compression(f.read(COMPRESSION_MAGIC_SIZE))
+        f.seek(0)
+        if not compression:
+            yield f
+            return
+        with decompress_stream(f, compression) as fd:
+            yield fd
+
+
+class B64Decoder:
+    """
+    Single pass base64 decoder of core dumps, fed with chunks of text in any size.
+
+    Every line is decoded separately, as ESP-IDF pads every printed line.
+    Known log prefixes before the base64 data (see ``B64_LOG_PREFIX_RE``), empty lines and CRLF line endings are ignored,
+    any other line is an error.
+    If the text contains ``CORE DUMP START`` marker, only lines between it and ``CORE DUMP END`` are decoded.
+    """
+
+    def __init__(self):  # type: () -> None
+        self.data = bytearray()
+        self.done = False
+        # decoding errors are reported in ``close``, log lines before the start marker may be not decodable
+        self.error = None  # type: Optional[str]
+        self._pending = bytearray()
+        self._line_num = 0
+        # a long line which is decoded in pieces, so its data started already
+        self._in_long_line = False
+
+    def feed(self, chunk):  # type: (bytes) -> None
+        if self.done:
+            return
+        self._pending += chunk
+        start = 0
+        while not self.done:
+            end = self._pending.find(b'\n', start)
+            if end == -1:
+                break
+            self._decode_line(self._pending[start:end])
+            start = end + 1
+        del self._pending[:start]
+        if not self.done and len(self._pending) > B64_CHUNK_SIZE:
+            self._decode_long_line_part()
+
+    def close(self):  # type: () -> bytearray
+        if self._pending and not self.done:
+            self._decode_line(self._pending)
+        self._pending = bytearray()
+        self.done = True
+        if self.error:
+            raise ESPCoreDumpLoaderError(self.error)
+        return self.data
+
+    def _decode_long_line_part(self):  # type: () -> None
+        """
+        Decode the beginning of an unfinished long line, the rest of it is kept pending
+        """
+        if self._in_long_line:
+            data_start = 0
+        else:
+            data_start = B64_LOG_PREFIX_RE.match(self._pending).end()  # type: ignore
+        data_end = B64_CHARS_RE.match(self._pending, data_start).end()  # type: ignore
+        if data_end == data_start or data_end != len(self._pending):
+            return  # padding or other characters, wait for the end of line
+        data_end -= (data_end - data_start) % 4
+        self._decode(self._pending[data_start:data_end], self._line_num + 1)
+        del self._pending[:data_end]
+        self._in_long_line = True
+
+    def _decode_line(self, line):  # type: (bytearray) -> None
+        self._line_num += 1
+        line = line.rstrip()
+        in_long_line, self._in_long_line = self._in_long_line, False
+        if in_long_line:
+            self._decode(line, self._line_num)
+        elif CORE_DUMP_START_MARKER in line:
+            # everything before the marker is not a part of the core dump
+            self.data = bytearray()
+            self.error = None
+        elif CORE_DUMP_END_MARKER in line:
+            self.done = True
+        elif line:
+            data = get_b64_line_data(line)
+            if data is not None:
+                self._decode(data, self._line_num)
+            elif not self.error:
+                self.error = f'Invalid base64-encoded core dump at line {self._line_num}: unexpected characters'
+
+    def _decode(self, b64_data, line_num):  # type: (Union[bytes, bytearray], int) -> None
+        try:
+            self.data += binascii.a2b_base64(b64_data)
+        except binascii.Error as e:
+            if not self.error:
+                self.error = f'Invalid base64-encoded core dump at line {line_num}: {e}'
+
+
+def decode_b64_stream(stream, chunk_size=B64_CHUNK_SIZE, decoder=None):  # type: (BinaryIO, int, Optional[B64Decoder]) -> bytearray
+    """
+    Decode base64-encoded core dump from the binary stream in one pass
+    :param decoder: decoder already fed with the beginning of the stream
+    """
+    decoder = decoder or B64Decoder()
+    while not decoder.done:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        decoder.feed(chunk)
+    return decoder.close()
@@ -0,0 +1,220 @@
+#
+# SPDX-FileCopyrightText: 2026 Espressif Systems (Shanghai) CO LTD
+#
+# SPDX-License-Identifier: Apache-2.0
+#
+
+import logging
+import os
+import re
+import struct
+import sys
+import tempfile
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+from typing import Iterable, Optional  # noqa: F401
+
+from .cache import get_cache_dir, get_elf_file, get_elf_sha256
+from .codec import StructCodec
+from .elf import ElfFile  # noqa: F401
+
+# Following structs are based on spec
+# https://refspecs.linuxfoundation.org/elf/elf.pdf
+
+SymbolEntry = StructCodec(
+    'SymbolEntry',
+    [
+        ('st_name', 'I'),
+        ('st_value', 'I'),
+        ('st_size', 'I'),
+        ('st_info', 'B'),
+        ('st_other', 'B'),
+        ('st_shndx', 'H'),
+    ],
+)
+
+STT_NOTYPE = 0
+STT_OBJECT = 1
+STT_FUNC = 2
+
+SHN_UNDEF = 0
+SHN_ABS = 0xFFF1
+
+# symbol containing an address, ``offset`` is the distance of the address from the symbol start
+Symbol = namedtuple('Symbol', ['name', 'addr', 'size', 'offset'])
+
+ADDRESS_RE = re.compile(r'0x[0-9a-fA-F]{1,8}\b')
+
+
+class SymbolTable:
+    """
+    Function and data symbols of ELF files in sorted ``array`` columns, looked up with a binary search.
+
+    Sized symbols contain the addresses within their size. Symbols without size (e.g. the ROM functions
+    defined in linker scripts) contain all addresses up to the next symbol.
+    """
+
+    # cache file: magic, symbol count, size of the names, then addresses, sizes, name offsets and NUL-terminated names
+    CACHE_MAGIC = b'ESPSYM01'
+    CACHE_HEADER = struct.Struct('<8sII')
+
+    def __init__(self):  # type: () -> None
+        self.addrs = array('I')
+        self.sizes = array('I')
+        self.name_offsets = array('I')
+        self.names = b''
+
+    @classmethod
+    def from_elf(cls, elf, symtab_name='.symtab', strtab_name='.strtab'):  # type: (ElfFile, str, str) -> SymbolTable
+        """
+        Parse ``.symtab`` and ``.strtab`` sections of the ELF file
+        """
+        symtab = elf.get_section(symtab_name)
+        strtab = elf.get_section(strtab_name)
+        if symtab is None or strtab is None:
+            return cls()
+        names = bytes(strtab.data)
+        # address -> (priority, size, name offset), a function with size wins over objects and labels at the same address
+        best = {}  # type: dict[int, tuple[int, int, int]]
+        for sym in SymbolEntry.iter_parse(symtab.data):
+            sym_type = sym.st_info & 0xF
+            # absolute symbols and symbols at 0 are constants (e.g. sizes defined in linker scripts) rather than addresses
+            if sym_type not in (STT_NOTYPE, STT_OBJECT, STT_FUNC) or sym.st_shndx in (SHN_UNDEF, SHN_ABS) or not sym.st_name or not sym.st_value:
+                continue
+            if sym_type == STT_NOTYPE and not sym.st_size and names[sym.st_name : sym.st_name + 1] in (b'$', b'.'):
+                # local labels ($a, .L...) of the assembler
+                continue
+            rank = (sym_type == STT_FUNC) * 4 + (sym.st_size != 0) * 2 + (sym_type == STT_OBJECT)
+            if sym.st_value not in best or rank > best[sym.st_value][0]:
+                best[sym.st_value] = (rank, sym.st_size, sym.st_name)
+        return cls._from_entries(sorted((addr, size, name) for addr, (_, size, name) in best.items()), names)
+
+    @classmethod
+    def _from_entries(cls, entries, names):  # type: (list[tuple[int, int, int]], bytes) -> SymbolTable
+        table = cls()
+        table.addrs = array('I', (e[0] for e in entries))
+        table.sizes = array('I', (e[1] for e in entries))
+        table.name_offsets = array('I', (e[2] for e in entries))
+        table.names = names
+        return table
+
+    @classmethod
+    def combine(cls, tables):  # type: (Iterable[SymbolTable]) -> SymbolTable
+        """
+        Join symbol tables, e.g. of the app and the ROM
+        """
+        entries = []  # type: list[tuple[int, int, int]]
+        names = b''
+        for table in tables:
+            entries += zip(table.addrs, table.sizes, (offset + len(names) for offset in table.name_offsets))
+            names += table.names
+        entries.sort()
+        return cls._from_entries(entries, names)
+
+    def __len__(self):  # type: () -> int
+        return len(self.addrs)
+
+    def _name(self, i):  # type: (int) -> str
+        offset = self.name_offsets[i]
+        return self.names[offset : self.names.index(b'\x00', offset)].decode('utf-8', 'replace')
+
+    def _symbol(self, i, addr):  # type: (int, int) -> Optional[Symbol]
+        if i < 0:
+            return None
+        start = self.addrs[i]
+        size = self.sizes[i]
+        if size and addr >= start + size:
+            return None
+        return Symbol(self._name(i), start, size, addr - start)
+
+    def lookup(self, addr):  # type: (int) -> Optional[Symbol]
+        return self._symbol(bisect_right(self.addrs, addr) - 1, addr)
+
+    def symbolize(self, addrs):  # type: (Iterable[int]) -> list[Optional[Symbol]]
+        """
+        Look up many addresses at once, they are sorted and matched in a single pass over the table
+        """
+        addrs = list(addrs)
+        result = [None] * len(addrs)  # type: list[Optional[Symbol]]
+        i = -1
+        for pos in sorted(range(len(addrs)), key=addrs.__getitem__):
+            addr = addrs[pos]
+            while i + 1 < len(self.addrs) and self.addrs[i + 1] <= addr:
+                i += 1
+            result[pos] = self._symbol(i, addr)
+        return result
+
+    def save(self, path):  # type: (str) -> None
+        """
+        Store the table into a cache file, the file is replaced atomically
+        """
+        columns = [self.addrs, self.sizes, self.name_offsets]
+        if sys.byteorder == 'big':
+            columns = [array('I', column) for column in columns]
+            for column in columns:
+                column.byteswap()
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path) or '.', delete=False) as f:
+            try:
+                f.write(self.CACHE_HEADER.pack(self.CACHE_MAGIC, len(self), len(self.names)))
+                for column in columns:
+                    column.tofile(f)
+                f.write(self.names)
+            except BaseException:
+                f.close()
+                os.remove(f.name)
+                raise
+        os.replace(f.name, path)
+
+    @classmethod
+    def load(cls, path):  # type: (str) -> SymbolTable
+        """
+        :raises ValueError: if the file is not a valid symbol table cache
+        """
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < cls.CACHE_HEADER.size:
+            raise ValueError('Invalid symbol table cache')
+        magic, count, names_size = cls.CACHE_HEADER.unpack_from(data)
+        if magic != cls.CACHE_MAGIC or len(data) != cls.CACHE_HEADER.size + count * 12 + names_size:
+            raise ValueError('Invalid symbol table cache')
+        table = cls()
+        offset = cls.CACHE_HEADER.size
+        for column in (table.addrs, table.sizes, table.name_offsets):
+            column.frombytes(data[offset : offset + count * 4])
+            if sys.byteorder == 'big':
+                column.byteswap()
+            offset += count * 4
+        table.names = data[offset:]
+        return table
+
+
+def get_symbol_table(elf_path):  # type: (str) -> SymbolTable
+    """
+    Symbol table of the ELF file, it is stored in ``get_cache_dir()`` by the SHA256 of the file and loaded from there next time
+    """
+    cache_path = os.path.join(get_cache_dir(), 'symbols', f'{get_elf_sha256(elf_path).hex()}.sym')
+    try:
+        return SymbolTable.load(cache_path)
+    except (OSError, ValueError):
+        pass
+    table = SymbolTable.from_elf(get_elf_file(elf_path))
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        table.save(cache_path)
+    except OSError as e:
+        logging.debug(f'Failed to store symbol table of "{elf_path}": {e}')
+    return table
+
+
+def parse_addresses(text):  # type: (str) -> list[int]
+    """
+    Hexadecimal addresses in the text, e.g. in a backtrace ``0x400d1234:0x3ffb5e10 0x400d5678:0x3ffb5e30``
+    """
+    return [int(match, 16) for match in ADDRESS_RE.findall(text)]
+
+
+def format_symbol(addr, symbol):  # type: (int, Optional[Symbol]) -> str
+    if symbol is None:
+        return f'0x{addr:08x}: ??'
+    return f'0x{addr:08x}: {symbol.name}+0x{symbol.offset:x}'
@@ -8,9 +8,8 @@ from __future__ import annotations
 
 from typing import Any, Optional, Tuple  # noqa: F401
 
-from construct import Int16ul, Int32ul, Int64ul, Struct
-
 from . import BaseArchMethodsMixin, BaseTargetMethods, ESPCoreDumpLoaderError
+from .codec import StructCodec, build_uint32_array
 
 INVALID_CAUSE_VALUE = 0xFFFF
 XCHAL_EXCCAUSE_NUM = 64
@@ -91,22 +90,25 @@ class ExceptionRegisters:
 
 # Following structs are based on source code
 # IDF_PATH/components/espcoredump/src/core_dump_port.c
-PrStatus = Struct(
-    'si_signo' / Int32ul,
-    'si_code' / Int32ul,
-    'si_errno' / Int32ul,
-    'pr_cursig' / Int16ul,
-    'pr_pad0' / Int16ul,
-    'pr_sigpend' / Int32ul,
-    'pr_sighold' / Int32ul,
-    'pr_pid' / Int32ul,
-    'pr_ppid' / Int32ul,
-    'pr_pgrp' / Int32ul,
-    'pr_sid' / Int32ul,
-    'pr_utime' / Int64ul,
-    'pr_stime' / Int64ul,
-    'pr_cutime' / Int64ul,
-    'pr_cstime' / Int64ul,
+PrStatus = StructCodec(
+    'PrStatus',
+    [
+        ('si_signo', 'I'),
+        ('si_code', 'I'),
+        ('si_errno', 'I'),
+        ('pr_cursig', 'H'),
+        ('pr_pad0', 'H'),
+        ('pr_sigpend', 'I'),
+        ('pr_sighold', 'I'),
+        ('pr_pid', 'I'),
+        ('pr_ppid', 'I'),
+        ('pr_pgrp', 'I'),
+        ('pr_sid', 'I'),
+        ('pr_utime', 'Q'),
+        ('pr_stime', 'Q'),
+        ('pr_cutime', 'Q'),
+        ('pr_cstime', 'Q'),
+    ],
 )
 
 
@@ -189,6 +191,8 @@ XT_STK_LEND = 23
 XT_STK_LCOUNT = 24
 XT_STK_FRMSZ = 25
 
+XtStackFrame = StructCodec('XtStackFrame', [('stack', f'{XT_STK_FRMSZ}I')])
+
 
 class XtensaMethodsMixin(BaseArchMethodsMixin):
     @staticmethod
@@ -199,11 +203,10 @@ class XtensaMethodsMixin(BaseArchMethodsMixin):
         # TODO: support for growing up stacks
         if not grows_down:
             raise ESPCoreDumpLoaderError('Growing up stacks are not supported for now!')
-        ex_struct = Struct('stack' / Int32ul[XT_STK_FRMSZ])
-        if len(data) < ex_struct.sizeof():
+        if len(data) < XtStackFrame.sizeof():
             raise ESPCoreDumpLoaderError(f'Too small stack to keep frame: {len(data)} bytes!')
 
-        stack = ex_struct.parse(data).stack
+        stack = XtStackFrame.unpack_from(data)
         # Stack frame type indicator is always the first item
         rc = stack[XT_STK_EXIT]
         if rc != 0:
@@ -252,7 +255,7 @@ class XtensaMethodsMixin(BaseArchMethodsMixin):
                 'pr_cutime': 0,
                 'pr_cstime': 0,
             }
-        ) + Int32ul[len(task_regs)].build(task_regs)
+        ) + build_uint32_array(task_regs)
 
 
 class Esp32Methods(BaseTargetMethods, XtensaMethodsMixin):
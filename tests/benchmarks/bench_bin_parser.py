@@ -0,0 +1,53 @@
+# SPDX-FileCopyrightText: 2026 Espressif Systems (Shanghai) CO LTD
+# SPDX-License-Identifier: Apache-2.0
+"""
+Conversion time of binary (v0.1 - v0.3) core dumps depending on the number of tasks.
+
+Run from the repository root: python -m tests.benchmarks.bench_bin_parser
+"""
+
+import io
+import time
+
+from construct import AlignedStruct, Bytes, GreedyRange, Int32ul, Struct, abs_, this
+
+from esp_coredump.corefile.loader import EspCoreDumpBinReader, ESPCoreDumpFileLoader
+
+from .synthetic import TCB_SIZE, build_bin_coredump
+
+TASK_NUMS = [10, 100, 1000, 2000, 4000]
+
+
+def _best_of(func, repeat=3):  # type: (callable, int) -> float
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():  # type: () -> None
+    # the task walker used before EspCoreDumpBinReader
+    construct_tasks = GreedyRange(
+        AlignedStruct(
+            4,
+            'task_header' / Struct('tcb_addr' / Int32ul, 'stack_top' / Int32ul, 'stack_end' / Int32ul),
+            'tcb' / Bytes(TCB_SIZE),
+            'stack' / Bytes(abs_(this.task_header.stack_top - this.task_header.stack_end)),
+        )
+    )
+
+    print(f'{"tasks":>6} {"walk (construct)":>18} {"walk (struct)":>14} {"convert":>10} {"convert/task":>13}')
+    for task_num in TASK_NUMS:
+        core = build_bin_coredump(task_num)
+        data = memoryview(core)[20:-4]
+
+        t_construct = _best_of(lambda: construct_tasks.parse(data), repeat=1)
+        t_walk = _best_of(lambda: sum(1 for _ in EspCoreDumpBinReader(data, task_num, TCB_SIZE).tasks()))
+        t_convert = _best_of(lambda: ESPCoreDumpFileLoader(core).create_corefile(output=io.BytesIO()))
+        print(f'{task_num:>6} {t_construct * 1e3:>15.2f} ms {t_walk * 1e3:>11.2f} ms {t_convert * 1e3:>7.2f} ms {t_convert / task_num * 1e6:>10.2f} us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+# SPDX-FileCopyrightText: 2026 Espressif Systems (Shanghai) CO LTD
+# SPDX-License-Identifier: Apache-2.0
+"""
+Per-note and per-task time of the precompiled codecs compared to the construct structs they replaced.
+
+Run from the repository root: python -m tests.benchmarks.bench_codec
+"""
+
+import timeit
+
+from construct import AlignedStruct, Bytes, GreedyRange, Int16ul, Int32ul, Int64ul, Struct, this
+
+from esp_coredump.corefile.codec import EspTaskStatus, ProgramHeader, iter_notes
+from esp_coredump.corefile.elf import ESPCoreDumpElfFile
+from esp_coredump.corefile.loader import ESPCoreDumpFileLoader
+from esp_coredump.corefile.xtensa import XT_STK_FRMSZ, PrStatus, XtStackFrame
+
+from .synthetic import build_bin_coredump
+
+TASK_NUM = 100
+
+# the construct structs used before the codec module
+ConstructNoteSection = AlignedStruct(
+    4,
+    'namesz' / Int32ul,
+    'descsz' / Int32ul,
+    'type' / Int32ul,
+    'name' / Bytes(this.namesz),
+    'desc' / Bytes(this.descsz),
+)
+ConstructEspTaskStatus = Struct(
+    'task_index' / Int32ul,
+    'task_flags' / Int32ul,
+    'task_tcb_addr' / Int32ul,
+    'task_stack_start' / Int32ul,
+    'task_stack_len' / Int32ul,
+    'task_name' / Bytes(16),
+)
+ConstructProgramHeader = Struct(
+    'p_type' / Int32ul,
+    'p_offset' / Int32ul,
+    'p_vaddr' / Int32ul,
+    'p_paddr' / Int32ul,
+    'p_filesz' / Int32ul,
+    'p_memsz' / Int32ul,
+    'p_flags' / Int32ul,
+    'p_align' / Int32ul,
+)
+ConstructPrStatus = Struct(
+    'si_signo' / Int32ul,
+    'si_code' / Int32ul,
+    'si_errno' / Int32ul,
+    'pr_cursig' / Int16ul,
+    'pr_pad0' / Int16ul,
+    'pr_sigpend' / Int32ul,
+    'pr_sighold' / Int32ul,
+    'pr_pid' / Int32ul,
+    'pr_ppid' / Int32ul,
+    'pr_pgrp' / Int32ul,
+    'pr_sid' / Int32ul,
+    'pr_utime' / Int64ul,
+    'pr_stime' / Int64ul,
+    'pr_cutime' / Int64ul,
+    'pr_cstime' / Int64ul,
+)
+
+
+def _per_item(func, items, number=20):  # type: (callable, int, int) -> float
+    return min(timeit.repeat(func, number=number, repeat=3)) / number / items
+
+
+def _report(name, construct_time, codec_time):  # type: (str, float, float) -> None
+    print(f'{name:<28} {construct_time * 1e6:>10.2f} us {codec_time * 1e6:>10.2f} us {construct_time / codec_time:>8.1f}x')
+
+
+def main():  # type: () -> None
+    core_elf = ESPCoreDumpElfFile()
+    core_elf.read_elf_bytes(ESPCoreDumpFileLoader(build_bin_coredump(TASK_NUM)).get_corefile_bytes())
+    # the segment with PRSTATUS notes of all tasks
+    notes_data = max((seg.data for seg in core_elf.note_segments), key=len)
+    note_num = len(list(iter_notes(notes_data)))
+
+    task_status_fields = EspTaskStatus.parse(EspTaskStatus.build({'task_index': 1, 'task_tcb_addr': 0x3FFB0000, 'task_name': b'main'}))._asdict()
+    task_status = EspTaskStatus.build(task_status_fields)
+    phdr = ProgramHeader.build({'p_type': 1, 'p_vaddr': 0x3FFB0000, 'p_filesz': 0x400, 'p_memsz': 0x400})
+    stack = bytes(range(256)) * 4
+
+    print(f'{"":<28} {"construct":>13} {"codec":>13} {"speedup":>9}')
+    _report(
+        'note parse (per note)',
+        _per_item(lambda: GreedyRange(ConstructNoteSection).parse(notes_data), note_num),
+        _per_item(lambda: list(iter_notes(notes_data)), note_num),
+    )
+    _report(
+        'task status parse',
+        _per_item(lambda: ConstructEspTaskStatus.parse(task_status), 1, 10000),
+        _per_item(lambda: EspTaskStatus.parse(task_status), 1, 10000),
+    )
+    _report(
+        'task status build',
+        _per_item(lambda: ConstructEspTaskStatus.build(task_status_fields), 1, 10000),
+        _per_item(lambda: EspTaskStatus.build(task_status_fields), 1, 10000),
+    )
+    _report(
+        'program header parse',
+        _per_item(lambda: ConstructProgramHeader.parse(phdr), 1, 10000),
+        _per_item(lambda: ProgramHeader.parse(phdr), 1, 10000),
+    )
+    _report(
+        'prstatus build (per task)',
+        _per_item(lambda: ConstructPrStatus.build({k: 0 for k in PrStatus.names}), 1, 10000),
+        _per_item(lambda: PrStatus.build({}), 1, 10000),
+    )
+    _report(
+        'xtensa stack frame parse',
+        _per_item(lambda: Struct('stack' / Int32ul[XT_STK_FRMSZ]).parse(stack).stack, 1, 2000),
+        _per_item(lambda: XtStackFrame.unpack_from(stack), 1, 2000),
+    )
+
+
+if __name__ == '__main__':
+    main()
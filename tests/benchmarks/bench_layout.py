@@ -0,0 +1,55 @@
+# SPDX-FileCopyrightText: 2026 Espressif Systems (Shanghai) CO LTD
+# SPDX-License-Identifier: Apache-2.0
+"""
+Number of program headers, size and GDB load time of core ELF files with the default and the optimized layout
+(``--optimize-layout``) depending on the number of tasks.
+
+GDB load time is measured only if ``xtensa-esp32-elf-gdb`` (or GDB given by the ``ESP_COREDUMP_BENCH_GDB``
+environment variable) is found.
+
+Run from the repository root: python -m tests.benchmarks.bench_layout
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+from esp_coredump.corefile.codec import ElfHeader
+from esp_coredump.corefile.loader import ESPCoreDumpFileLoader
+
+from .synthetic import build_bin_coredump
+
+TASK_NUMS = [10, 100, 500, 1000]
+
+
+def _gdb_load_time(gdb, core_path):  # type: (str, str) -> float
+    best = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        subprocess.run([gdb, '--batch', '-nx', '-ex', f'core-file {core_path}', '-ex', 'info threads'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():  # type: () -> None
+    gdb = shutil.which(os.environ.get('ESP_COREDUMP_BENCH_GDB', 'xtensa-esp32-elf-gdb'))
+    print(f'{"tasks":>6} {"layout":>10} {"phnum":>7} {"size":>10} {"GDB load":>10}')
+    for task_num in TASK_NUMS:
+        core = build_bin_coredump(task_num)
+        for name, optimize_layout in [('default', False), ('optimized', True)]:
+            data = ESPCoreDumpFileLoader(core, optimize_layout=optimize_layout).get_corefile_bytes()
+            load_time = 'n/a'
+            if gdb:
+                with tempfile.NamedTemporaryFile(suffix='.elf', delete=False) as fw:
+                    fw.write(data)
+                try:
+                    load_time = f'{_gdb_load_time(gdb, fw.name) * 1e3:.1f} ms'
+                finally:
+                    os.remove(fw.name)
+            print(f'{task_num:>6} {name:>10} {ElfHeader.parse(data).e_phnum:>7} {len(data) // 1024:>8} K {load_time:>10}')
+
+
+if __name__ == '__main__':
+    main()
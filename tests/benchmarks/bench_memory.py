@@ -0,0 +1,85 @@
+# SPDX-FileCopyrightText: 2026 Espressif Systems (Shanghai) CO LTD
+# SPDX-License-Identifier: Apache-2.0
+"""
+Memory held by the segment, note and task status model of a core ELF depending on the number of tasks,
+compared to the previous model: plain objects with a copy of the segment data and construct containers.
+
+Run from the repository root: python -m tests.benchmarks.bench_memory
+"""
+
+import tracemalloc
+
+from construct import Bytes, Int32ul, Struct
+
+from esp_coredump.corefile.codec import ElfHeader, ProgramHeader, iter_notes
+from esp_coredump.corefile.elf import ESPCoreDumpElfFile
+from esp_coredump.corefile.loader import ESPCoreDumpFileLoader
+
+from .synthetic import build_bin_coredump
+
+TASK_NUMS = [100, 1000, 4000]
+
+ConstructEspTaskStatus = Struct(
+    'task_index' / Int32ul,
+    'task_flags' / Int32ul,
+    'task_tcb_addr' / Int32ul,
+    'task_stack_start' / Int32ul,
+    'task_stack_len' / Int32ul,
+    'task_name' / Bytes(16),
+)
+
+
+class LegacySegment:
+    """Segment as it was stored before: a ``__dict__`` based object owning a copy of its data"""
+
+    def __init__(self, addr, data, flags, seg_type):  # type: (int, bytes, int, int) -> None
+        self.addr = addr
+        self.data = data
+        self.flags = flags
+        self.type = seg_type
+        self.note_secs = []  # type: list
+
+
+def load_legacy(data):  # type: (bytes) -> tuple
+    ehdr = ElfHeader.parse(data)
+    segments = []
+    task_info = []
+    for i in range(ehdr.e_phnum):
+        phdr = ProgramHeader.parse(data, ehdr.e_phoff + i * ProgramHeader.size)
+        seg = LegacySegment(phdr.p_vaddr, data[phdr.p_offset : phdr.p_offset + phdr.p_filesz], phdr.p_flags, phdr.p_type)
+        if phdr.p_type == ESPCoreDumpElfFile.PT_NOTE:
+            seg.note_secs = list(iter_notes(seg.data))
+            task_info += [ConstructEspTaskStatus.parse(n.desc) for n in seg.note_secs if n.type == ESPCoreDumpElfFile.PT_ESP_TASK_INFO]
+        segments.append(seg)
+    return segments, task_info
+
+
+def load_current(data):  # type: (bytes) -> ESPCoreDumpElfFile
+    core_elf = ESPCoreDumpElfFile()
+    core_elf.read_elf_bytes(data)
+    for seg in core_elf.note_segments:
+        seg.note_secs
+    core_elf.task_info
+    return core_elf
+
+
+def _allocated(func, data):  # type: (callable, bytes) -> int
+    tracemalloc.start()
+    try:
+        result = func(data)  # noqa: F841
+        return tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+
+def main():  # type: () -> None
+    print(f'{"tasks":>6} {"core ELF":>10} {"legacy":>10} {"current":>10} {"ratio":>7}')
+    for task_num in TASK_NUMS:
+        data = ESPCoreDumpFileLoader(build_bin_coredump(task_num)).get_corefile_bytes()
+        legacy = _allocated(load_legacy, data)
+        current = _allocated(load_current, data)
+        print(f'{task_num:>6} {len(data) // 1024:>8} K {legacy // 1024:>8} K {current // 1024:>8} K {legacy / current:>6.1f}x')
+
+
+if __name__ == '__main__':
+    main()
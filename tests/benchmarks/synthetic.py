@@ -0,0 +1,38 @@
+# SPDX-FileCopyrightText: 2026 Espressif Systems (Shanghai) CO LTD
+# SPDX-License-Identifier: Apache-2.0
+"""Synthetic core dumps for the benchmarks"""
+
+import binascii
+import struct
+
+from esp_coredump.corefile.loader import EspCoreDumpLoader, EspCoreDumpVersion
+
+# part of esp32 DRAM, see soc_headers/esp32.py
+DRAM_START = 0x3FFB0000
+DRAM_SIZE = 0x40000
+TCB_SIZE = 0x154
+STACK_SIZE = 0x400
+XT_STK_FRMSZ = 25
+
+
+def build_bin_coredump(task_num, tcb_size=TCB_SIZE, stack_size=STACK_SIZE):  # type: (int, int, int) -> bytes
+    """
+    Build esp32 binary (v0.2) core dump with ``task_num`` tasks.
+    All tasks have sane TCBs and stacks with a solicited stack frame,
+    they wrap around within DRAM if there are too many of them.
+    """
+    header_size = 5 * 4
+    task_size = ((tcb_size + 0xF) & ~0xF) + stack_size
+    body = bytearray()
+    for i in range(task_num):
+        tcb_addr = DRAM_START + (i * task_size) % (DRAM_SIZE - task_size)
+        stack_start = (tcb_addr + tcb_size + 0xF) & ~0xF
+        stack_end = stack_start + stack_size
+        body += struct.pack('<3I', tcb_addr, stack_start, stack_end)
+        body += bytes([i & 0xFF]) * tcb_size + bytes(-tcb_size % 4)
+        frame = [0, 0x400D0000 + i, 0x60020] + [i] * (XT_STK_FRMSZ - 3)
+        body += struct.pack(f'<{XT_STK_FRMSZ}I', *frame) + bytes(stack_size - XT_STK_FRMSZ * 4)
+    ver = (EspCoreDumpVersion.ESP32 << 16) | EspCoreDumpLoader.BIN_V2
+    header = struct.pack('<5I', header_size + len(body) + 4, ver, task_num, tcb_size, 0)
+    crc = binascii.crc32(header + body) & 0xFFFFFFFF
+    return header + bytes(body) + struct.pack('<I', crc)
@@ -0,0 +1,53 @@
+# SPDX-FileCopyrightText: 2026 Espressif Systems (Shanghai) CO LTD
+# SPDX-License-Identifier: Apache-2.0
+"""
+GDB stand-in answering the MI commands of EspGDB with canned records, for the tests of the MI command engine.
+The threads are given by the TCB addresses in FAKE_GDB_TCBS (comma separated hexadecimal numbers).
+The console command "sleep <sec>" delays the output of the command, "bt" prints a frame of the selected thread.
+"""
+
+import os
+import re
+import sys
+import time
+
+TCBS = [int(tcb, 16) for tcb in os.getenv('FAKE_GDB_TCBS', '3ffb0000,3ffb1000').split(',')]
+THREADS = '[' + ','.join(f'{{id="{i}",target-id="process {tcb}"}}' for i, tcb in enumerate(TCBS, 1)) + ']'
+selected_thread = '1'
+
+
+def reply(token, cmd):  # type: (str, str) -> list[str]
+    global selected_thread
+    console = re.match(r'-interpreter-exec console "(.*)"$', cmd)
+    if console:
+        command = console.group(1)
+        if command.startswith('sleep '):
+            time.sleep(float(command.split()[1]))
+        if command == 'bt':
+            return [f'~"#0  0x40000000 in thread_{selected_thread} ()\\n"', f'{token}^done']
+        return [f'~"{command}\\n"', f'{token}^done']
+    if cmd.startswith('-data-list-register-values'):
+        return [f'{token}^done,register-values=[{{number="0",value="0x40000000"}}]']
+    if cmd == '-thread-info':
+        return [f'{token}^done,threads={THREADS},current-thread-id="1"']
+    if cmd.startswith('-thread-select '):
+        selected_thread = cmd.split()[1]
+        return [f'{token}^done,new-thread-id="{selected_thread}"']
+    evaluate = re.match(r'-data-evaluate-expression "\(char\*\)\(\(TCB_t \*\)(0x[0-9a-f]+)\)->pcTaskName"$', cmd)
+    if evaluate:
+        return [f'{token}^done,value="{evaluate.group(1)} \\"task_{evaluate.group(1)}\\""']
+    return [f'{token}^error,msg="Undefined command: \\"{cmd}\\""']
+
+
+def main():  # type: () -> None
+    print('=thread-group-added,id="i1"\n(gdb) ', flush=True)
+    for line in sys.stdin:
+        match = re.match(r'(\d*)(.*)$', line.strip())
+        if not match or not match.group(2):
+            continue
+        records = reply(*match.groups())
+        print('\n'.join(records + ['(gdb) ']), flush=True)
+
+
+if __name__ == '__main__':
+    main()
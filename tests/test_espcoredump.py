@@ -1,23 +1,52 @@
 # SPDX-FileCopyrightText: 2022-2024 Espressif Systems (Shanghai) CO LTD
 # SPDX-License-Identifier: Apache-2.0
 import base64
+import binascii
+import bz2
 import contextlib
+import gzip
+import hashlib
 import io
+import lzma
 import os
+import re
+import shutil
 import subprocess
 import sys
+import threading
 import time
+from concurrent.futures import Future
 
 import pytest
+from construct import AlignedStruct, Bytes, GreedyRange, Int32ul, this
 
 try:
     from esp_coredump import CoreDump
     from esp_coredump.corefile import ESPCoreDumpLoaderError
-    from esp_coredump.corefile.elf import ESPCoreDumpElfFile
-    from esp_coredump.corefile.loader import ESPCoreDumpFileLoader
+    from esp_coredump.corefile.address_space import AddressSpace
+    from esp_coredump.corefile.bundle import get_bundle_info, get_rom_symbol_table
+    from esp_coredump.corefile.cache import (
+        SHA256_XATTR,
+        ElfFileCache,
+        _store_sha256,
+        elf_file_cache,
+        get_elf_cache_dir,
+        get_elf_sha256,
+    )
+    from esp_coredump.corefile.codec import ElfHeader, EspTaskStatus, ProgramHeader, iter_notes
+    from esp_coredump.corefile.dwarf import DW_AT_stmt_list, DwarfInfo, LineTable, SourceLocation, StructLayout, StructMember, get_dwarf_info
+    from esp_coredump.corefile.elf import ElfFile, ElfSection, ElfSegment, ESPCoreDumpElfFile, TaskTable
+    from esp_coredump.corefile.gdb import ADAPTIVE_TIMEOUT_FACTOR, EspGDB, EspGDBPool
+    from esp_coredump.corefile.gdb_index import evict_gdb_indexes, get_indexed_elf_path, needs_gdb_index, store_gdb_index
+    from esp_coredump.corefile.loader import ESPCoreDumpFileLoader, EspCoreDumpLoader, EspCoreDumpSource
+    from esp_coredump.corefile.riscv import PRSTATUS_SIZE, RISCV_GP_REGS_COUNT, PrStruct
+    from esp_coredump.corefile.streams import decode_b64_stream
+    from esp_coredump.corefile.symbols import SymbolTable, format_symbol, get_symbol_table, parse_addresses
 except ImportError:
     raise ModuleNotFoundError('No module named "esp_coredump" please install esp_coredump by running "python -m pip install esp-coredump"')
 
+from tests.benchmarks.synthetic import build_bin_coredump
+
 SUPPORTED_TARGET = ['esp32', 'esp32c3', 'esp32p4', 'esp32c6']
 COREDUMP_FILE_NAME = 'coredump'
 COREDUMP_BIN_FILE_NAME = 'coredump_bin'
@@ -26,6 +55,13 @@ TEST_DIR_ABS_PATH = os.path.dirname(__file__)
 ESP_PROG_DIR = os.path.join(TEST_DIR_ABS_PATH, 'test_apps', 'built_apps')
 
 
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Persistent caches are kept in the temporary directory of the test, not in the cache of the user or in the test files"""
+    monkeypatch.setenv('ESP_COREDUMP_CACHE_DIR', str(tmp_path))
+    return tmp_path
+
+
 @pytest.fixture(scope='session')
 def coverage_run():
     """Run with coverage reporting if available"""
@@ -162,6 +198,25 @@ class TestESPCoreDumpDecode:
         expected_output = get_expected_output(target)
         assert expected_output == output
 
+    @pytest.mark.parametrize('target', ['esp32', 'esp32c3'])
+    def test_coredump_decode_with_gdb_pool(self, target):
+        expected_output = get_expected_output(target)
+        with EspGDBPool() as pool:
+            for _ in range(2):
+                coredump = CoreDump(gdb_pool=pool, **get_coredump_kwargs(core_ext='b64', target=target))
+                with io.StringIO() as buffer, contextlib.redirect_stdout(buffer):
+                    coredump.info_corefile()
+                    assert expected_output == buffer.getvalue()
+            # the second core dump is decoded by the GDB session of the first one
+            assert len(pool) == 1
+
+    @pytest.mark.parametrize('target', ['esp32', 'esp32c3'])
+    def test_coredump_decode_with_jobs(self, target):
+        coredump = CoreDump(jobs=3, **get_coredump_kwargs(core_ext='b64', target=target))
+        with io.StringIO() as buffer, contextlib.redirect_stdout(buffer):
+            coredump.info_corefile()
+            assert get_expected_output(target) == buffer.getvalue()
+
 
 class TestESPCoreDumpElfFile:
     @pytest.mark.parametrize('target', SUPPORTED_TARGET)
@@ -180,6 +235,29 @@ class TestESPCoreDumpFileLoader:
                 is_b64=False,
             )
 
+    @pytest.mark.parametrize('target', SUPPORTED_TARGET)
+    def test_load_truncated_core_bin(self, target, tmp_path):
+        decode_from_b64_to_bin(target)
+        with open(os.path.join(TEST_DIR_ABS_PATH, target, f'{COREDUMP_FILE_NAME}.bin'), 'rb') as f:
+            core_bytes = f.read()
+        truncated_core = tmp_path / 'truncated.bin'
+        truncated_core.write_bytes(core_bytes[: len(core_bytes) // 2])
+        with pytest.raises(ESPCoreDumpLoaderError):
+            ESPCoreDumpFileLoader(path=str(truncated_core), is_b64=False)
+
+    @pytest.mark.parametrize('trusted_source', [False, True])
+    @pytest.mark.parametrize('target', SUPPORTED_TARGET)
+    def test_create_corefile_wrong_checksum(self, target, trusted_source, tmp_path):
+        decode_from_b64_to_bin(target)
+        with open(os.path.join(TEST_DIR_ABS_PATH, target, f'{COREDUMP_FILE_NAME}.bin'), 'rb') as f:
+            core_bytes = bytearray(f.read())
+        core_bytes[-40] ^= 0xFF  # corrupt the data right before the checksum
+        corrupted_core = tmp_path / 'corrupted.bin'
+        corrupted_core.write_bytes(core_bytes)
+        loader = ESPCoreDumpFileLoader(path=str(corrupted_core), is_b64=False, trusted_source=trusted_source)
+        with pytest.raises(ESPCoreDumpLoaderError, match='Invalid core dump'):
+            loader.create_corefile()
+
     @pytest.mark.parametrize('target', SUPPORTED_TARGET)
     def test_create_corefile(self, target):
         loader = ESPCoreDumpFileLoader(
@@ -189,6 +267,803 @@ class TestESPCoreDumpFileLoader:
         loader.create_corefile()
         assert os.path.exists(loader.core_elf_file)
 
+    @pytest.mark.parametrize('target', SUPPORTED_TARGET)
+    def test_create_corefile_in_memory(self, target):
+        b64_path = os.path.join(TEST_DIR_ABS_PATH, target, f'{COREDUMP_FILE_NAME}.b64')
+        loader = ESPCoreDumpFileLoader(path=b64_path, is_b64=True)
+        loader.create_corefile()
+        with open(loader.core_elf_file, 'rb') as f:
+            core_elf_bytes = f.read()
+
+        with open(b64_path, 'rb') as f:
+            loader = ESPCoreDumpFileLoader(path=f.read(), is_b64=True)
+        assert loader.get_corefile_bytes() == core_elf_bytes
+        assert not loader.temp_files
+
+
+class TestB64Decoder:
+    @pytest.mark.parametrize('target', SUPPORTED_TARGET)
+    def test_decode_monitor_log(self, target):
+        b64_path = os.path.join(TEST_DIR_ABS_PATH, target, f'{COREDUMP_FILE_NAME}.b64')
+        with open(b64_path, 'rb') as f:
+            b64_lines = f.read().splitlines()
+            f.seek(0)
+            expected = decode_b64_stream(f)
+        log = b'\r\n'.join(
+            [b'I (339) cpu_start: Starting scheduler.', b'Rebooting', b'================= CORE DUMP START =================']
+            + [b'[12:00:01.123] ' + line for line in b64_lines]
+            + [b'================= CORE DUMP END =================', b'I (1339) esp_core_dump_uart: Done']
+        )
+        # small chunks split lines at random places
+        assert decode_b64_stream(io.BytesIO(log), chunk_size=7) == expected
+
+    def test_decode_long_line(self):
+        data = os.urandom(300 * 1024)
+        assert decode_b64_stream(io.BytesIO(base64.b64encode(data)), chunk_size=1000) == data
+
+    def test_decode_invalid(self):
+        with pytest.raises(ESPCoreDumpLoaderError):
+            decode_b64_stream(io.BytesIO(b'f0VMRgEBAQ==\nf0VMRgEBA\n'))
+
+    def test_decode_log_prefixes(self):
+        data = os.urandom(96)
+        b64 = base64.b64encode(data)
+        log = b'\n'.join(
+            [
+                b'I (339) cpu_start: Starting scheduler.',
+                b'================= CORE DUMP START =================',
+                b'\x1b[0;32mI (1000) esp_core_dump: ' + b64[:64] + b'\x1b[0m',
+                b'2024-01-01 12:00:01.123 ' + b64[64:],
+                b'',
+                b'================= CORE DUMP END =================',
+            ]
+        )
+        assert decode_b64_stream(io.BytesIO(log)) == data
+        # the last word of a log line is not taken for base64 data
+        with pytest.raises(ESPCoreDumpLoaderError, match='line 2'):
+            decode_b64_stream(io.BytesIO(b64[:64] + b'\nW (10) wifi: connection lost AAAA\n' + b64[64:]))
+
+
+class PipeStream:
+    """Non-seekable stream returning short reads, like a pipe"""
+
+    def __init__(self, data):
+        self._stream = io.BytesIO(data)
+
+    def read(self, size=-1):
+        return self._stream.read(min(size, 100) if size >= 0 else size)
+
+
+class TestEspCoreDumpSource:
+    @pytest.mark.parametrize(
+        'file_name, core_format',
+        [
+            (f'esp32/{COREDUMP_FILE_NAME}.b64', 'b64'),
+            (f'esp32/{COREDUMP_BIN_FILE_NAME}.b64', 'b64'),
+            (f'esp32c3/{COREDUMP_FILE_NAME}.b64', 'b64'),
+        ],
+    )
+    def test_detect_from_pipe(self, file_name, core_format):
+        with open(os.path.join(TEST_DIR_ABS_PATH, file_name), 'rb') as f:
+            data = f.read()
+        source = EspCoreDumpSource(PipeStream(data))
+        assert source.format == core_format
+        assert len(source.prefix) == EspCoreDumpSource.SNIFF_SIZE
+        # the prefix is decoded only once and the loader continues the decoding
+        loader = ESPCoreDumpFileLoader(source, is_b64=True)
+        assert loader.core_src_data == decode_b64_stream(io.BytesIO(data))
+
+    def test_detect_raw_and_elf(self):
+        raw_core = build_bin_coredump(2)
+        assert EspCoreDumpSource(PipeStream(raw_core)).format == 'raw'
+        loader = ESPCoreDumpFileLoader(path=raw_core)
+        source = EspCoreDumpSource(PipeStream(loader.get_corefile_bytes()))
+        assert source.format == 'elf'
+        assert source.read() == loader.get_corefile_bytes()
+
+    def test_detect_unknown(self):
+        with pytest.raises(SystemExit):
+            EspCoreDumpSource(PipeStream(bytes(range(256)) * 20))
+
+    def test_core_file_opened_by_command(self, tmp_path, monkeypatch):
+        kwargs = get_coredump_kwargs(core_ext='b64', target='esp32', auto_format=True)
+
+        def info_corefile(coredump):
+            with io.StringIO() as buffer, contextlib.redirect_stdout(buffer):
+                coredump.info_corefile()
+                return buffer.getvalue()
+
+        # the core file is opened by each command, not by the constructor
+        coredump = CoreDump(no_gdb=True, **dict(kwargs, core=str(tmp_path / 'core.b64')))
+        shutil.copyfile(kwargs['core'], tmp_path / 'core.b64')
+        output = info_corefile(coredump)
+        assert output == info_corefile(coredump)
+        # the standard input can be read only once
+        with open(kwargs['core'], 'rb') as f:
+            monkeypatch.setattr(sys, 'stdin', io.TextIOWrapper(io.BytesIO(f.read())))
+        coredump = CoreDump(no_gdb=True, **dict(kwargs, core='-'))
+        assert info_corefile(coredump) == output
+        with pytest.raises(SystemExit), contextlib.redirect_stderr(io.StringIO()) as stderr:
+            info_corefile(coredump)
+        assert 'already read from the standard input' in stderr.getvalue()
+
+
+COMPRESSORS = {'gzip': gzip.compress, 'xz': lzma.compress, 'bz2': bz2.compress}
+
+
+class TestCompressedCoreFile:
+    @pytest.mark.parametrize('compression', COMPRESSORS)
+    @pytest.mark.parametrize('file_name', [f'esp32/{COREDUMP_FILE_NAME}.b64', f'esp32/{COREDUMP_BIN_FILE_NAME}.b64'])
+    def test_load_compressed(self, tmp_path, compression, file_name):
+        file_path = os.path.join(TEST_DIR_ABS_PATH, file_name)
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        compressed_path = str(tmp_path / f'core.{compression}')
+        with open(compressed_path, 'wb') as fw:
+            fw.write(COMPRESSORS[compression](data))
+
+        source = EspCoreDumpSource(compressed_path)
+        assert (source.compression, source.format) == (compression, 'b64')
+        source.close()
+        expected = ESPCoreDumpFileLoader(file_path, is_b64=True).get_corefile_bytes()
+        assert ESPCoreDumpFileLoader(compressed_path, is_b64=True).get_corefile_bytes() == expected
+        # the same through a pipe
+        assert ESPCoreDumpFileLoader(PipeStream(COMPRESSORS[compression](data)), is_b64=True).get_corefile_bytes() == expected
+
+    def test_load_compressed_raw(self):
+        raw_core = build_bin_coredump(4)
+        expected = ESPCoreDumpFileLoader(path=raw_core).get_corefile_bytes()
+        assert ESPCoreDumpFileLoader(path=gzip.compress(raw_core)).get_corefile_bytes() == expected
+
+    def test_read_compressed_elf(self, tmp_path):
+        elf_path = os.path.join(ESP_PROG_DIR, 'esp32.elf')
+        with open(elf_path, 'rb') as f:
+            compressed_path = str(tmp_path / 'esp32.elf.xz')
+            with open(compressed_path, 'wb') as fw:
+                fw.write(lzma.compress(f.read()))
+        assert ElfFile(compressed_path).sha256 == ElfFile(elf_path).sha256
+        temp_files = []  # type: list[str]
+        uncompressed_path = CoreDump.get_uncompressed_elf_path(compressed_path, temp_files)
+        assert temp_files == [uncompressed_path]
+        with open(uncompressed_path, 'rb') as fu, open(elf_path, 'rb') as f:
+            assert fu.read() == f.read()
+        os.remove(uncompressed_path)
+        # GDB is given the uncompressed copy of the command, the compressed file stays the program ELF file for the next ones
+        coredump = CoreDump(no_gdb=True, **dict(get_coredump_kwargs(core_ext='b64', target='esp32'), prog=compressed_path, gdb='gdb'))
+        assert coredump.get_gdb_args('esp32', 'core.elf', None, prog=uncompressed_path)[-1] == uncompressed_path
+        for _ in range(2):
+            with contextlib.redirect_stdout(io.StringIO()):
+                temp_files = coredump.info_corefile()
+            assert coredump.prog == compressed_path
+            for temp_file in temp_files:
+                os.remove(temp_file)
+
+    def test_load_zstd(self):
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            with pytest.raises(ESPCoreDumpLoaderError, match='zstandard'):
+                ESPCoreDumpFileLoader(path=b'\x28\xb5\x2f\xfd' + bytes(16))
+        else:
+            raw_core = build_bin_coredump(4)
+            compressed = zstandard.ZstdCompressor().compress(raw_core)
+            assert ESPCoreDumpFileLoader(path=compressed).core_src_data == raw_core
+
+
+class TestElfFile:
+    def test_lazy_sections(self):
+        elf_path = os.path.join(ESP_PROG_DIR, 'esp32.elf')
+        elf = ElfFile(elf_path)
+        text = elf.get_section('.flash.text')
+        assert text is elf.get_section('.flash.text')
+        assert text in elf.sections
+        # data are sliced from the mapped file on first access
+        assert text._data is None
+        assert isinstance(text.data, memoryview)
+        with open(elf_path, 'rb') as f:
+            elf_bytes = f.read()
+        assert bytes(text.data) in elf_bytes
+        assert len(text.data) == text.size
+        # sections without address are found by name too, but they are not in ``sections``
+        debug_line = elf.get_section('.debug_line')
+        assert debug_line is not None and debug_line.addr == 0 and debug_line.size
+        assert debug_line not in elf.sections
+        assert elf.get_section('.no_such_section') is None
+        assert elf.sha256 == hashlib.sha256(elf_bytes).digest()
+
+    def test_dump_streams_segments(self):
+        class ChunkWriter:
+            def __init__(self):
+                self.chunks = []
+
+            def write(self, chunk):
+                self.chunks.append(bytes(chunk))
+
+        loader = ESPCoreDumpFileLoader(path=build_bin_coredump(20))
+        expected = loader.get_corefile_bytes()
+        writer = ChunkWriter()
+        loader.core_elf.dump(writer)
+        assert b''.join(writer.chunks) == expected
+        segments = loader.core_elf.load_segments + loader.core_elf.note_segments
+        # ELF header, program header table and every segment written separately
+        assert len(writer.chunks) == 2 + len(segments)
+        assert max(len(chunk) for chunk in writer.chunks[2:]) == max(seg.size for seg in segments)
+
+    def test_close_unmaps_core_file(self, tmp_path, caplog):
+        caplog.set_level('DEBUG')
+        core_path = tmp_path / 'core.bin'
+        core_path.write_bytes(build_bin_coredump(4))
+        with ESPCoreDumpFileLoader(path=str(core_path)) as loader:
+            expected = loader.get_corefile_bytes()
+            assert loader._core_src_mmap is not None
+        # the data sliced from the mapped file are released before it is unmapped
+        assert loader._core_src_mmap is None and 'still referenced' not in caplog.text
+        # the core dump which was already in memory is kept
+        with ESPCoreDumpFileLoader(path=core_path.read_bytes()) as loader:
+            pass
+        assert loader.get_corefile_bytes() == expected
+
+    def test_note_index(self):
+        task_num = 20
+        loader = ESPCoreDumpFileLoader(path=build_bin_coredump(task_num))
+        core_elf = ESPCoreDumpElfFile()
+        core_elf.read_elf_bytes(loader.get_corefile_bytes())
+        assert [task.task_index for task in core_elf.task_info] == list(range(task_num))
+        assert len(core_elf.prstatus_notes) == task_num
+        assert core_elf.core_dump_info_note.name == b'ESP_CORE_DUMP_INFO'
+        assert core_elf.extra_info_note.desc[:4] == core_elf.task_info[0].task_tcb_addr.to_bytes(4, 'little')
+        assert core_elf.panic_details_note is None
+        assert core_elf.chip_rev is None
+        # the index is rebuilt when a note segment is added
+        core_elf.add_segment(0, EspCoreDumpLoader._build_note_section('ESP_CHIP_REV', ESPCoreDumpElfFile.PT_ESP_INFO, bytes([3, 0, 0, 0])), ElfFile.PT_NOTE, 0)
+        assert core_elf.chip_rev == 3
+        assert core_elf.get_note(ESPCoreDumpElfFile.PT_ESP_INFO) is core_elf.core_dump_info_note
+
+    def test_optimize_layout(self):
+        core = build_bin_coredump(50)
+        default_elf = ESPCoreDumpElfFile()
+        default_elf.read_elf_bytes(ESPCoreDumpFileLoader(path=core).get_corefile_bytes())
+        data = ESPCoreDumpFileLoader(path=core, optimize_layout=True).get_corefile_bytes()
+        optimized_elf = ESPCoreDumpElfFile()
+        optimized_elf.read_elf_bytes(data)
+        segments = optimized_elf.load_segments
+        assert len(segments) < len(default_elf.load_segments)
+        assert all(prev.addr + prev.size < seg.addr or prev.flags != seg.flags for prev, seg in zip(segments, segments[1:]))
+        for i in range(ElfHeader.parse(data).e_phnum):
+            phdr = ProgramHeader.parse(data, ElfHeader.size + i * ProgramHeader.size)
+            if phdr.p_type == ElfFile.PT_LOAD:
+                assert phdr.p_align == ESPCoreDumpElfFile.PAGE_SIZE
+                assert phdr.p_offset % phdr.p_align == phdr.p_vaddr % phdr.p_align
+        # memory contents are kept
+        memory = {seg.addr + i: b for seg in default_elf.load_segments for i, b in enumerate(bytes(seg.data))}
+        assert {seg.addr + i: b for seg in segments for i, b in enumerate(bytes(seg.data))} == memory
+        assert [task.task_tcb_addr for task in optimized_elf.task_info] == [task.task_tcb_addr for task in default_elf.task_info]
+        # duplicates are dropped, overlapping segments keep data of the lower one, different flags are not merged
+        core_elf = ESPCoreDumpElfFile()
+        rw, rx = ElfSegment.PF_R | ElfSegment.PF_W, ElfSegment.PF_R | ElfSegment.PF_X
+        for addr, seg_data, flags in [(0x20, b'cccc', rw), (0x10, b'aaaa', rw), (0x12, b'bbbb', rw), (0x10, b'aaaa', rw), (0x16, b'dd', rx)]:
+            core_elf.add_segment(addr, seg_data, ElfFile.PT_LOAD, flags)
+        core_elf.coalesce_load_segments()
+        assert [(seg.addr, bytes(seg.data), seg.flags) for seg in core_elf.load_segments] == [(0x10, b'aaaabb', rw), (0x16, b'dd', rx), (0x20, b'cccc', rw)]
+
+    def test_task_table(self):
+        records = [
+            EspTaskStatus.build({'task_index': i, 'task_flags': i & 1, 'task_tcb_addr': 0x3FFB0000 + i, 'task_stack_len': 0x400, 'task_name': b'task%d' % i})
+            for i in range(5)
+        ]
+        table = TaskTable.from_bytes(b''.join(records))
+        assert len(table) == 5
+        assert list(table) == [EspTaskStatus.parse(record) for record in records]
+        assert table[-1].task_name.rstrip(b'\x00') == b'task4'
+        assert table.task_tcb_addr[3] == 0x3FFB0003
+        # segment data are views into the core ELF data
+        core_elf = ESPCoreDumpElfFile()
+        core_elf.read_elf_bytes(ESPCoreDumpFileLoader(path=build_bin_coredump(3)).get_corefile_bytes())
+        assert all(isinstance(seg.data, memoryview) for seg in core_elf.load_segments)
+        assert not hasattr(core_elf.load_segments[0], '__dict__')
+
+
+class TestAddressSpace:
+    def test_queries(self):
+        loader = ESPCoreDumpFileLoader(path=build_bin_coredump(3))
+        core_elf = ESPCoreDumpElfFile()
+        core_elf.read_elf_bytes(loader.get_corefile_bytes())
+        exe_elf = ElfFile()
+        exe_elf.sections = [ElfSection('.flash.rodata', 0x3F400000, bytes(range(16)), ElfSection.SHF_ALLOC)]
+        address_space = AddressSpace(core_elf, exe_elf)
+
+        task = core_elf.task_info[1]
+        stack = address_space.owner(task.task_stack_start + 4)
+        assert (stack.kind, stack.name, stack.obj) == (AddressSpace.TASK_STACK, 'task #1 stack', task)
+        assert [r.kind for r in address_space.regions_at(task.task_stack_start)] == [AddressSpace.TASK_STACK, AddressSpace.SEGMENT]
+        assert address_space.owner(0x3F400008).name == '.flash.rodata'
+        assert address_space.owner(0x3F400010) is None
+        seg = core_elf.load_segments[0]
+        assert address_space.read(seg.addr + 4, 8) == bytes(seg.data[4:12])
+        assert address_space.read(0x3F40000C, 4) == bytes(range(12, 16))
+        with pytest.raises(ValueError):
+            address_space.read(0x3F40000C, 8)
+
+    def test_memory_regions(self):
+        core_elf = ESPCoreDumpElfFile()
+        rw, rx = ElfSegment.PF_R | ElfSegment.PF_W, ElfSegment.PF_R | ElfSegment.PF_X
+        for addr, size, flags in [(0x3FFB0000, 0x100, rw), (0x3FFB0080, 0x200, rw), (0x3FFC0000, 0x10, rw), (0x40000000, 0x20, rx)]:
+            core_elf.add_segment(addr, bytes(size), ElfFile.PT_LOAD, flags)
+        exe_elf = ElfFile()
+        exe_elf.sections = [
+            ElfSection('.dram0.data', 0x3FFB0040, bytes(0x40), ElfSection.SHF_ALLOC | ElfSection.SHF_WRITE),
+            ElfSection('.flash.text', 0x400D0000, bytes(0x20), ElfSection.SHF_ALLOC | ElfSection.SHF_EXECINSTR),
+        ]
+        assert AddressSpace(core_elf, exe_elf).memory_regions() == [
+            ('.dram0.data', 0x3FFB0000, 0x100, 'RW A'),
+            ('.dram0.data', 0x3FFB0040, 0x240, 'RW A'),
+            ('.flash.text', 0x400D0000, 0x20, 'R XA'),
+            ('.coredump.tasks.data', 0x3FFC0000, 0x10, 'RW '),
+            ('.coredump.rom.text', 0x40000000, 0x20, 'R E'),
+        ]
+
+
+class TestSymbolTable:
+    def test_lookup(self, tmp_path):
+        elf_path = os.path.join(ESP_PROG_DIR, 'esp32.elf')
+        table = get_symbol_table(elf_path)
+        assert list(table.addrs) == sorted(table.addrs)
+        symbol = table.lookup(table.addrs[10] + 1)
+        assert symbol.addr == table.addrs[10] and symbol.offset == 1
+        # the table is loaded from the cache next time
+        assert os.listdir(str(tmp_path / 'symbols')) == [f'{get_elf_sha256(elf_path).hex()}.sym']
+        cached = get_symbol_table(elf_path)
+        assert (cached.addrs, cached.sizes, cached.name_offsets, cached.names) == (table.addrs, table.sizes, table.name_offsets, table.names)
+
+        addrs = parse_addresses('Backtrace: 0x400d1234:0x3ffb5e10 0x40081000:0x3ffb5e30 |<-CORRUPTED 0x12345678')
+        assert addrs == [0x400D1234, 0x3FFB5E10, 0x40081000, 0x3FFB5E30, 0x12345678]
+        assert table.symbolize(addrs) == [table.lookup(addr) for addr in addrs]
+        assert format_symbol(0x400D1234, table.lookup(0x400D1234)) == '0x400d1234: esp_cache_err_int_init+0x38'
+        assert table.lookup(0x12345678) is None
+
+    def test_combine(self):
+        rom = SymbolTable._from_entries([(0x40000000, 0, 0), (0x40000100, 0x10, 4)], b'foo\x00bar\x00')
+        app = SymbolTable._from_entries([(0x400D0000, 0x20, 0)], b'app_main\x00')
+        table = SymbolTable.combine([app, rom])
+        addrs = [0x40000080, 0x40000104, 0x40000110, 0x400D0004]
+        assert [format_symbol(addr, symbol) for addr, symbol in zip(addrs, table.symbolize(addrs))] == [
+            '0x40000080: foo+0x80',
+            '0x40000104: bar+0x4',
+            '0x40000110: ??',
+            '0x400d0004: app_main+0x4',
+        ]
+
+
+class TestDwarf:
+    def test_lookup(self, tmp_path):
+        elf_path = os.path.join(ESP_PROG_DIR, 'esp32.elf')
+        # same as "addr2line -f -i -e esp32.elf <addr>"
+        assert get_dwarf_info(elf_path).lookup(0x400D1234) == [
+            SourceLocation('esp_cache_err_int_init', '/builds/espressif/esp-idf/components/esp_system/port/soc/esp32/cache_err_int.c', 51)
+        ]
+        portmacro_path = '/builds/espressif/esp-idf/components/freertos/FreeRTOS-Kernel/portable/xtensa/include/freertos/portmacro.h'
+        assert get_dwarf_info(elf_path).lookup(0x400D266C) == [
+            SourceLocation('xPortEnterCriticalTimeoutSafe', portmacro_path, 582),
+            SourceLocation('vPortEnterCriticalSafe', portmacro_path, 592),
+            SourceLocation('esp_rtc_get_time_us', '/builds/espressif/esp-idf/components/esp_hw_support/esp_clk.c', 107),
+        ]
+        assert get_dwarf_info(elf_path).lookup(0x12345678) == []
+        # the decoded information lives as long as the ELF file is cached
+        dwarf_info = get_dwarf_info(elf_path)
+        # the debug sections are read from the mapped file, they are not copied
+        assert isinstance(dwarf_info._section('.debug_info'), memoryview)
+        assert get_dwarf_info(elf_path) is dwarf_info
+        elf_file_cache.discard(elf_path)
+        assert get_dwarf_info(elf_path) is not dwarf_info
+
+        # decoded line tables are cached on disk and loaded by a new decoder
+        cache_dir = tmp_path / 'dwarf' / hashlib.sha1(os.path.realpath(elf_path).encode()).hexdigest()
+        assert sorted(os.listdir(str(cache_dir)))[-1] == 'identity' and len(os.listdir(str(cache_dir))) == 3
+        dwarf_info = DwarfInfo(ElfFile(elf_path), str(cache_dir))
+        unit = dwarf_info.find_unit(0x400D1234)
+        table = dwarf_info.line_table(unit)
+        with open(str(cache_dir / f'{unit.root[DW_AT_stmt_list][1]:x}.lines'), 'rb') as f:
+            cached = LineTable.from_bytes(f.read())
+        assert (cached.addrs, cached.lines, cached.files, cached.file_names) == (table.addrs, table.lines, table.files, table.file_names)
+
+    def test_dwarf5(self):
+        # newlib in the esp32 app is built with DWARF 5
+        elf_path = os.path.join(ESP_PROG_DIR, 'esp32.elf')
+        dwarf_info = DwarfInfo(ElfFile(elf_path))
+        assert dwarf_info.find_unit(0x400DF428).version == 5
+        localeconv_path = '/builds/idf/crosstool-NG/.build/HOST-x86_64-apple-darwin21.1/xtensa-esp-elf/src/newlib/newlib/libc/locale/localeconv.c'
+        assert dwarf_info.lookup(0x400DF428) == [
+            SourceLocation('__localeconv_l', localeconv_path, 8),
+            SourceLocation('_localeconv_r', localeconv_path, 59),
+        ]
+
+    def test_struct_layouts(self, tmp_path, monkeypatch):
+        elf_path = os.path.join(ESP_PROG_DIR, 'esp32.elf')
+        layouts = DwarfInfo(ElfFile(elf_path), str(tmp_path)).struct_layouts(['TCB_t', 'List_t', 'multi_heap_info', 'NoSuchType_t'])
+        tcb = layouts['TCB_t']
+        assert tcb.size == 340
+        assert tcb.members['pxTopOfStack'] == StructMember('pxTopOfStack', 0, 4, 'volatile StackType_t *', StructLayout.POINTER)
+        assert tcb.members['xStateListItem'] == StructMember('xStateListItem', 4, 20, 'ListItem_t', StructLayout.STRUCT)
+        assert tcb.members['pcTaskName'] == StructMember('pcTaskName', 52, 16, 'char [16]', StructLayout.ARRAY)
+        assert tcb.members['xCoreID'].kind == StructLayout.SIGNED
+        assert list(layouts['List_t'].members) == ['uxNumberOfItems', 'pxIndex', 'xListEnd']
+        assert layouts['multi_heap_info'].size == 20
+        assert layouts['NoSuchType_t'] is None
+
+        # layouts are cached, a new decoder does not search the DWARF info again
+        dwarf_info = DwarfInfo(ElfFile(elf_path), str(tmp_path))
+        monkeypatch.setattr(dwarf_info, '_find_struct_layouts', None)
+        cached = dwarf_info.struct_layouts(['TCB_t', 'NoSuchType_t'])
+        assert cached['TCB_t'].members == tcb.members and cached['NoSuchType_t'] is None
+
+        # TCB fields are read from the core dump, the values are the same as GDB prints in the threads info
+        coredump = CoreDump(no_gdb=True, **get_coredump_kwargs(core_ext='b64', target='esp32'))
+        with contextlib.redirect_stdout(io.StringIO()):
+            coredump.info_corefile()
+        fields = coredump.read_struct('TCB_t', 0x3FFAFA08, ['uxPriority', 'uxBasePriority', 'pxStack', 'pxTopOfStack', 'pxEndOfStack'])
+        assert (fields['uxPriority'], fields['uxBasePriority']) == (22, 22)
+        assert (abs(fields['pxEndOfStack'] - fields['pxTopOfStack']), abs(fields['pxStack'] - fields['pxTopOfStack'])) == (432, 3648)
+        assert coredump.get_freertos_task_name(0x3FFAFA08) == 'esp_timer'
+        assert coredump.read_struct('TCB_t', 0x3FFAFA08, ['noSuchField']) is None
+
+    @pytest.mark.parametrize('target', SUPPORTED_TARGET)
+    def test_info_corefile_no_gdb(self, target):
+        kwargs = get_coredump_kwargs(core_ext='b64', target=target)
+        coredump = CoreDump(no_gdb=True, **kwargs)
+        with io.StringIO() as buffer, contextlib.redirect_stdout(buffer):
+            coredump.info_corefile()
+            output = buffer.getvalue()
+        assert 'ALL MEMORY REGIONS' in output and output.endswith('Done!\n')
+        # the crashed task is in panic_abort called by esp_system_abort, like in the backtrace from GDB
+        stack = output.split('CURRENT THREAD STACK')[1].splitlines()
+        assert stack[1].startswith('PC 0x') and ': panic_abort at ' in stack[1] and '/esp_system/panic.c:' in stack[1]
+        assert stack[2].startswith('RA 0x') and ': esp_system_abort at ' in stack[2]
+
+
+class TestBundle:
+    def test_bundle(self, tmp_path):
+        elf_path = os.path.join(ESP_PROG_DIR, 'esp32.elf')
+        # any ELF file with symbols can stand in for the ROM ELF
+        rom_elf_path = os.path.join(ESP_PROG_DIR, 'esp32c3.elf')
+        bundle_path = CoreDump(prog=elf_path, rom_elf=rom_elf_path).create_bundle(str(tmp_path / 'esp32.bundle'))
+        assert os.path.getsize(bundle_path) < os.path.getsize(elf_path) / 2
+
+        elf = ESPCoreDumpElfFile(elf_path)
+        bundle = ESPCoreDumpElfFile(bundle_path)
+        assert get_bundle_info(bundle).app_sha256 == get_elf_sha256(bundle_path) == get_elf_sha256(elf_path)
+        assert get_bundle_info(elf) is None
+        assert bundle.e_machine == elf.e_machine
+        assert [(s.name, s.addr, s.flags, bytes(s.data)) for s in bundle.sections] == [(s.name, s.addr, s.flags, bytes(s.data)) for s in elf.sections]
+        # debug sections are compressed in the bundle
+        assert bundle._section_headers['.debug_info'].sh_flags & ElfSection.SHF_COMPRESSED
+        assert bytes(bundle.get_section('.debug_info').data) == bytes(elf.get_section('.debug_info').data)
+        assert DwarfInfo(bundle).lookup(0x400D266C) == DwarfInfo(elf).lookup(0x400D266C)
+        assert bytes(get_rom_symbol_table(bundle).addrs) == bytes(SymbolTable.from_elf(ElfFile(rom_elf_path)).addrs)
+
+        # the report is the same with the bundle in place of the program ELF file
+        outputs = []
+        for prog in (elf_path, bundle_path):
+            kwargs = dict(get_coredump_kwargs(core_ext='b64', target='esp32'), prog=prog)
+            with io.StringIO() as buffer, contextlib.redirect_stdout(buffer):
+                CoreDump(no_gdb=True, **kwargs).info_corefile()
+                outputs.append(buffer.getvalue())
+        assert outputs[0] == outputs[1]
+
+
+class TestGdbIndex:
+    def test_gdb_index_cache(self, tmp_path, monkeypatch):
+        elf_path = str(tmp_path / 'esp32.elf')
+        shutil.copyfile(os.path.join(ESP_PROG_DIR, 'esp32.elf'), elf_path)
+        index_path = tmp_path / 'esp32.elf.gdb-index'
+        index_path.write_bytes(b'index data')
+        assert needs_gdb_index(elf_path)
+        assert get_indexed_elf_path(elf_path) is None
+        # a copy of the ELF file with the index is stored
+        indexed_path = store_gdb_index(elf_path, str(index_path))
+        assert get_indexed_elf_path(elf_path) == indexed_path and not needs_gdb_index(elf_path)
+        # and given to GDB, also by the next commands
+        gdb_args = CoreDump(prog=elf_path, gdb='gdb').get_gdb_args('esp32', 'core.elf', None)
+        assert gdb_args[-1] == indexed_path and not needs_gdb_index(indexed_path)
+        assert CoreDump(prog=elf_path, gdb='gdb').get_gdb_args('esp32', 'core.elf', None)[-1] == indexed_path
+
+        # the data of the ELF file stays at the same offsets in the copy, the index section is added
+        with open(elf_path, 'rb') as f, open(indexed_path, 'rb') as f_indexed:
+            elf_data = f.read()
+            assert f_indexed.read()[ElfHeader.size : len(elf_data)] == elf_data[ElfHeader.size :]
+        elf = ElfFile(elf_path)
+        indexed = ElfFile(indexed_path)
+        assert [(s.name, s.addr, bytes(s.data)) for s in indexed.sections] == [(s.name, s.addr, bytes(s.data)) for s in elf.sections]
+        assert [(s.addr, bytes(s.data)) for s in indexed.load_segments] == [(s.addr, bytes(s.data)) for s in elf.load_segments]
+        assert bytes(indexed.get_section('.gdb_index').data) == b'index data'
+        elf.close()
+        indexed.close()
+
+        # the index belongs to the file it was created from, not to its copies or to a modified file
+        copy_path = str(tmp_path / 'copy.elf')
+        shutil.copyfile(elf_path, copy_path)
+        assert needs_gdb_index(copy_path)
+        stat = os.stat(elf_path)
+        os.utime(elf_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000))
+        elf_file_cache.discard(elf_path)
+        assert needs_gdb_index(elf_path)
+
+        # the least recently used indexes are removed first
+        store_gdb_index(elf_path, str(index_path))
+        other_indexed_path = store_gdb_index(copy_path, str(index_path))
+        os.utime(os.path.dirname(indexed_path), (0, 0))
+        evict_gdb_indexes(sum(e.stat().st_size for e in os.scandir(os.path.dirname(other_indexed_path))))
+        assert not os.path.exists(indexed_path) and os.path.exists(other_indexed_path)
+        # and GDB creates the index again
+        assert needs_gdb_index(elf_path)
+        # the cache is disabled with the size 0
+        monkeypatch.setenv('ESP_COREDUMP_GDB_INDEX_CACHE_SIZE', '0')
+        assert not needs_gdb_index(copy_path)
+
+
+class TestEspGDB:
+    def test_mi_commands(self):
+        gdb = EspGDB([sys.executable, os.path.join(TEST_DIR_ABS_PATH, 'fake_gdb.py'), '--interpreter=mi2'], timeout_sec=0.5)
+        # commands return as soon as GDB answers
+        start = time.time()
+        assert [gdb.run_cmd(f'echo {i}') for i in range(10)] == [f'echo {i}' for i in range(10)]
+        assert gdb.get_thread_info()[1] == '1'
+        assert gdb.get_freertos_task_name(0x3FFB0000) == 'task_0x3ffb0000'
+        # an error record finishes the command too
+        assert gdb.get_tcb_variable(0x3FFB0000, 'noSuchField') == ''
+        assert time.time() - start < 0.5
+
+        # GDB is waited for without polling
+        cpu_start = time.process_time()
+        assert gdb.run_cmd('sleep 0.2') == 'sleep 0.2'
+        assert time.process_time() - cpu_start < 0.1
+
+        # the late output of a command which timed out is not taken for the output of the next one
+        assert gdb.run_cmd('sleep 1') == ''
+        assert gdb.run_cmd('echo next') == 'echo next'
+        # and the command gets more time next time
+        assert gdb._latencies['-interpreter-exec'] * ADAPTIVE_TIMEOUT_FACTOR > 1
+        assert gdb.run_cmd('sleep 1') == 'sleep 1'
+
+    def test_threads_info(self, monkeypatch):
+        expected_output = get_expected_output('esp32')
+        rows = expected_output.split('---------- ---------------- -------- ----------------\n')[1].split('\n\n')[0]
+        monkeypatch.setenv('FAKE_GDB_TCBS', ','.join(re.findall(r'^ *(0x[0-9a-f]+) ', rows, re.M)))
+        coredump = CoreDump(no_gdb=True, **get_coredump_kwargs(core_ext='b64', target='esp32'))
+        with contextlib.redirect_stdout(io.StringIO()):
+            coredump.info_corefile()
+        coredump.no_gdb = False
+        coredump.gdb_esp = EspGDB([sys.executable, os.path.join(TEST_DIR_ABS_PATH, 'fake_gdb.py'), '--interpreter=mi2'])
+        writes = []
+        write = coredump.gdb_esp.p.write
+        monkeypatch.setattr(coredump.gdb_esp.p, 'write', lambda cmd, **kwargs: writes.append(cmd) or write(cmd, **kwargs))
+
+        def print_threads_info():
+            with io.StringIO() as buffer, contextlib.redirect_stdout(buffer):
+                coredump.print_threads_info(coredump.core_elf.task_info)
+                return buffer.getvalue()
+
+        # the TCBs are read from the core dump, the table is the same as with GDB
+        output = print_threads_info()
+        assert output.split('---------- ---------------- -------- ----------------\n')[1].split('\n\n')[0] == rows
+        # the backtraces of all threads are read in one batch and split by thread
+        assert '#0  0x40000000 in thread_3 ()' in output.split('THREAD 3 ')[1].split('THREAD 4 ')[0]
+        # "info threads", "-thread-info" and the batch of backtraces, independent of the number of threads
+        assert len(writes) == 3
+
+        # without the TCB layout GDB reads the TCBs, also in one batch of commands for the names and one for the stack fields
+        monkeypatch.setattr(coredump, 'get_struct_layout', lambda type_name: None)
+        writes.clear()
+        output = print_threads_info()
+        assert "(TCB: 0x3ffafba0, name: 'task_0x3ffafba0')" in output
+        assert len(writes) == 5
+
+        # the threads are split between GDB workers (--jobs), the output is the same
+        worker_writes = []  # type: list[str]
+        for _ in range(2):
+            worker = EspGDB([sys.executable, os.path.join(TEST_DIR_ABS_PATH, 'fake_gdb.py'), '--interpreter=mi2'])
+            monkeypatch.setattr(worker.p, 'write', lambda cmd, write=worker.p.write, **kwargs: worker_writes.append(cmd) or write(cmd, **kwargs))
+            coredump._gdb_workers.append(Future())
+            coredump._gdb_workers[-1].set_result(worker)
+        writes.clear()
+        assert print_threads_info() == output
+        # each worker gets a batch of task names, stack fields and backtraces
+        assert len(writes) == 5 and len(worker_writes) == 6
+
+    def test_session_pool(self):
+        gdb_args = [sys.executable, os.path.join(TEST_DIR_ABS_PATH, 'fake_gdb.py'), '--interpreter=mi2']
+        with EspGDBPool(max_sessions=2) as pool:
+            with pool.session('app1', gdb_args, 'core1') as gdb:
+                assert gdb.run_cmd('echo 1') == 'echo 1'
+            # the session is reused for the next core dump of the same app
+            with pool.session('app1', gdb_args, 'core2') as reused:
+                assert reused is gdb
+            with pool.session('app1', gdb_args, 'core3') as gdb1, pool.session('app1', gdb_args, 'core4') as gdb2:
+                assert gdb1 is gdb and gdb2 is not gdb
+            # an idle session of another app is closed to make room
+            with pool.session('app2', gdb_args, 'core5') as gdb3:
+                assert gdb3 is not gdb1 and gdb3 is not gdb2
+                assert len(pool) == 2
+            # a session which does not answer the health check is replaced
+            gdb3.p.gdb_process.kill()
+            gdb3.p.gdb_process.wait()
+            with pool.session('app2', gdb_args, 'core6') as gdb4:
+                assert gdb4 is not gdb3
+            # a session which failed while it was taken is closed
+            with pytest.raises(RuntimeError), pool.session('app2', gdb_args, 'core7') as gdb5:
+                raise RuntimeError('report failed')
+            assert gdb5 is gdb4 and gdb5.p.gdb_process is None
+            assert len(pool) == 1
+
+        with EspGDBPool(max_sessions=1, idle_timeout_sec=0) as pool:
+            taken, release, second_taken = threading.Event(), threading.Event(), threading.Event()
+
+            def take(key, taken_event):
+                with pool.session(key, gdb_args, 'core'):
+                    taken_event.set()
+                    release.wait()
+
+            threads = [threading.Thread(target=take, args=('app1', taken)), threading.Thread(target=take, args=('app2', second_taken))]
+            threads[0].start()
+            assert taken.wait(10)
+            # the number of sessions is limited, the second one waits for the first one
+            threads[1].start()
+            assert not second_taken.wait(0.2)
+            release.set()
+            assert second_taken.wait(10)
+            for thread in threads:
+                thread.join()
+            # idle sessions are closed after the idle timeout
+            assert pool.evict_idle() == 1
+            assert len(pool) == 0
+
+
+class TestElfFileCache:
+    def test_cache(self, tmp_path):
+        elf_path = str(tmp_path / 'app.elf')
+        shutil.copyfile(os.path.join(ESP_PROG_DIR, 'esp32.elf'), elf_path)
+        cache = ElfFileCache()
+        elf = cache.get(elf_path, ESPCoreDumpElfFile)
+        # an instance of the subclass is reused for the base class
+        assert cache.get(elf_path) is elf
+        assert cache.get(os.path.join(str(tmp_path), '.', 'app.elf'), ESPCoreDumpElfFile) is elf
+        assert (cache.hits, cache.misses) == (2, 1)
+        assert cache.size == os.path.getsize(elf_path)
+        # modified file is parsed again
+        stat = os.stat(elf_path)
+        os.utime(elf_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000))
+        text = elf.get_section('.iram0.text')
+        assert cache.get(elf_path) is not elf
+        assert len(cache) == 1
+        # the replaced file is still usable by its users
+        assert bytes(text.data)
+        # the least recently used file is evicted
+        other_path = str(tmp_path / 'other.elf')
+        shutil.copyfile(elf_path, other_path)
+        cache.max_bytes = cache.size
+        evicted = cache.get(elf_path)
+        other = cache.get(other_path)
+        assert len(cache) == 1 and cache.size == os.path.getsize(other_path)
+        assert evicted._elf_data is not None
+        cache.discard(other_path)
+        assert len(cache) == 0 and cache.size == 0
+        assert other._elf_data is not None
+        # missing files are not cached
+        assert not cache.get(str(tmp_path / 'missing.elf')).sections
+        assert len(cache) == 0
+
+    def test_evicted_during_report(self, tmp_path, monkeypatch):
+        # the core ELF file evicts the program ELF file, which is still used by the report
+        kwargs = get_coredump_kwargs(core_ext='b64', target='esp32')
+        core_path = str(tmp_path / 'core.elf')
+        ESPCoreDumpFileLoader(kwargs['core'], is_b64=True).create_corefile(output=core_path)
+
+        def info_corefile():
+            elf_file_cache.clear()
+            coredump = CoreDump(no_gdb=True, **dict(kwargs, core=core_path, core_format='elf'))
+            with io.StringIO() as buffer, contextlib.redirect_stdout(buffer):
+                coredump.info_corefile()
+                return buffer.getvalue()
+
+        expected = info_corefile()
+        monkeypatch.setattr(elf_file_cache, 'max_bytes', os.path.getsize(kwargs['prog']) + 100)
+        assert info_corefile() == expected
+        assert 'esp_timer' in expected
+
+    def test_elf_cache_dir(self, tmp_path):
+        elf_path = str(tmp_path / 'app.elf')
+        shutil.copyfile(os.path.join(ESP_PROG_DIR, 'esp32.elf'), elf_path)
+        cache_dir = get_elf_cache_dir('dwarf', elf_path)
+        open(os.path.join(cache_dir, 'data'), 'wb').close()
+        assert get_elf_cache_dir('dwarf', elf_path) == cache_dir
+        assert sorted(os.listdir(cache_dir)) == ['data', 'identity']
+        # the content cached for the previous version of a modified file is removed
+        stat = os.stat(elf_path)
+        os.utime(elf_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000))
+        assert get_elf_cache_dir('dwarf', elf_path) == cache_dir
+        assert os.listdir(cache_dir) == ['identity']
+        # a copy of the file has its own directory
+        copy_path = str(tmp_path / 'copy.elf')
+        shutil.copyfile(elf_path, copy_path)
+        assert get_elf_cache_dir('dwarf', copy_path) not in (None, cache_dir)
+        assert get_elf_cache_dir('dwarf', str(tmp_path / 'missing.elf')) is None
+
+    def test_elf_sha256(self, tmp_path, monkeypatch):
+        monkeypatch.setenv('ESP_COREDUMP_CACHE_DIR', str(tmp_path / 'cache'))
+        elf_path = str(tmp_path / 'app.elf')
+        shutil.copyfile(os.path.join(ESP_PROG_DIR, 'esp32.elf'), elf_path)
+        with open(elf_path, 'rb') as f:
+            elf_data = f.read()
+        assert get_elf_sha256(elf_path) == hashlib.sha256(elf_data).digest()
+        # the SHA256 is stored in the cache directory, not in the extended attributes of the file
+        assert len(os.listdir(str(tmp_path / 'cache' / 'sha256'))) == 1
+        if hasattr(os, 'listxattr'):
+            assert SHA256_XATTR not in os.listxattr(elf_path)
+        # stored SHA256 is used for the same size, modification time and inode
+        stat = os.stat(elf_path)
+        stamp = f'{len(elf_data)}:{stat.st_mtime_ns}:{stat.st_ino}'
+        fake_sha256 = bytes(range(32))
+        _store_sha256(os.path.realpath(elf_path), stamp, fake_sha256)
+        elf_file_cache.discard(elf_path)
+        assert get_elf_sha256(elf_path) == fake_sha256
+        # a file replaced by another one with the same size and modification time is hashed again
+        new_path = str(tmp_path / 'new.elf')
+        shutil.copy2(elf_path, new_path)
+        os.replace(new_path, elf_path)
+        elf_file_cache.discard(elf_path)
+        assert os.stat(elf_path).st_mtime_ns == stat.st_mtime_ns
+        assert get_elf_sha256(elf_path) == hashlib.sha256(elf_data).digest()
+
+
+class TestCodec:
+    def test_notes_match_construct(self):
+        note_section = AlignedStruct(4, 'namesz' / Int32ul, 'descsz' / Int32ul, 'type' / Int32ul, 'name' / Bytes(this.namesz), 'desc' / Bytes(this.descsz))
+        core_elf = ESPCoreDumpElfFile()
+        core_elf.read_elf_bytes(ESPCoreDumpFileLoader(os.path.join(TEST_DIR_ABS_PATH, 'esp32', f'{COREDUMP_BIN_FILE_NAME}.b64'), True).get_corefile_bytes())
+        for seg in core_elf.note_segments:
+            expected = GreedyRange(note_section).parse(seg.data)
+            assert [(n.type, n.name, n.desc) for n in seg.note_secs] == [(n.type, n.name.split(b'\x00')[0], n.desc) for n in expected]
+        # incomplete note at the end is skipped
+        assert len(list(iter_notes(bytes(seg.data) + b'\x05\x00\x00\x00'))) == len(seg.note_secs)
+
+    def test_build_parse(self):
+        task_status = {
+            'task_index': 1,
+            'task_flags': 2,
+            'task_tcb_addr': 0x3FFB0000,
+            'task_stack_start': 0x3FFB1000,
+            'task_stack_len': 0x400,
+            'task_name': b'main'.ljust(16, b'\x00'),
+        }
+        data = EspTaskStatus.build(task_status)
+        assert EspTaskStatus.parse(data)._asdict() == task_status
+        assert len(data) == EspTaskStatus.sizeof() == 36
+
+        regs = list(range(RISCV_GP_REGS_COUNT))
+        data = PrStruct.build({'pr_pid': 0x3FC80000, 'regs': regs})
+        assert len(data) == PRSTATUS_SIZE
+        parsed = PrStruct.parse(data)
+        assert (parsed.pr_cursig, parsed.pr_pid, parsed.regs) == (0, 0x3FC80000, regs)
+
+
+class TestESPCoreDumpBinFormat:
+    def test_convert_many_tasks(self):
+        task_num = 300
+        loader = ESPCoreDumpFileLoader(path=build_bin_coredump(task_num))
+        core_elf = ESPCoreDumpElfFile()
+        core_elf.read_elf_bytes(loader.get_corefile_bytes())
+        task_info_notes = [n for seg in core_elf.note_segments for n in seg.note_secs if n.type == ESPCoreDumpElfFile.PT_ESP_TASK_INFO]
+        assert len(task_info_notes) == task_num
+        assert len(core_elf.load_segments) == 2 * task_num  # TCB and stack of every task
+
+    def test_truncated_tasks(self):
+        # keep the header claiming 10 tasks, but drop the data of the last ones, the CRC is valid
+        truncated_core = bytearray(build_bin_coredump(10)[:-2000])
+        truncated_core[:4] = len(truncated_core).to_bytes(4, 'little')
+        truncated_core[-4:] = (binascii.crc32(truncated_core[:-4]) & 0xFFFFFFFF).to_bytes(4, 'little')
+        loader = ESPCoreDumpFileLoader(path=truncated_core)
+        with pytest.raises(ESPCoreDumpLoaderError, match='exceeds the core dump data'):
+            loader.create_corefile()
+
 
 class TestDebugCoredump:
     def test_dbg_corefile(self, coverage_run):